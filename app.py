@@ -2,39 +2,117 @@
 # 외부 LLM 연결 전용 - Pinehill 의존성 제거
 # 사용법: python app.py
 
-from fastapi import FastAPI, Request, Form, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, FastAPI, Request, Form, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+import anyio
+import copy
 import json
 import os
 import httpx
+from urllib.parse import quote
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, AsyncIterator, Tuple
 import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="Shimplex Lite", version="1.1.0")
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+import batch
+import metrics
+from session_store import create_session_store
+from response_cache import create_response_cache, make_cache_key
+from context_window import create_context_builder
+from limiter import ProviderLimiters, QueueFullError, QueueTimeoutError
+from resilience import CircuitBreakers, CircuitOpenError, create_retry_policy, is_retryable
+from providers import get_adapter, message_encoder
+from coalesce import SingleFlight
+from summarizer import SUMMARY_SESSION_ID, Compactor
+from ollama_pool import OllamaPool
+from semantic_cache import SemanticCache, create_semantic_cache
+from usage_meter import FIELDS as USAGE_FIELDS, GROUP_KEYS, QuotaExceededError, SessionQuotas, UsageMeter
+from usage_meter import create_session_quotas, create_usage_meter, today
+from static_assets import REVALIDATE, StaticAssets, render_page
 
-# 설정 파일 경로
-CONFIG_FILE = "config.json"
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup()
+    yield
+    await shutdown()
+
+# 엔드포인트는 라우터에 모아 두고 create_app()에서 앱에 붙인다
+router = APIRouter()
+
+# 설정 파일 경로 (여러 인스턴스를 띄울 때는 SHIMPLEX_CONFIG로 지정)
+CONFIG_FILE = os.environ.get("SHIMPLEX_CONFIG", "config.json")
+
+def merge_config(target: dict, changes: dict):
+    """중첩 dict를 재귀적으로 병합 (dict가 아닌 값은 덮어씀)"""
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_config(target[key], value)
+        else:
+            target[key] = value
 
 class Config:
-    """설정 관리"""
+    """설정 관리
+
+    data는 변경될 때마다 통째로 교체되는 스냅샷이라 읽는 쪽은 잠금 없이
+    일관된 설정을 본다. version은 스냅샷이 교체될 때마다 증가한다.
+    """
     def __init__(self):
+        self.version = 0
+        self._stamp = None
         self.data = self.load()
     
     def load(self) -> dict:
         if os.path.exists(CONFIG_FILE):
+            self._stamp = self._file_stamp()
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
                 return json.load(f)
         return self.default_config()
     
+    def _file_stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(CONFIG_FILE)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
     def save(self):
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+        """임시 파일에 쓴 뒤 rename으로 교체 (읽는 쪽이 쓰다 만 파일을 보지 않음)"""
+        tmp_file = f"{CONFIG_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(self.data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, CONFIG_FILE)
+        self._stamp = self._file_stamp()
+    
+    def update(self, changes: dict):
+        """여러 값을 한 번에 반영하고 파일은 한 번만 저장"""
+        data = copy.deepcopy(self.data)
+        merge_config(data, changes)
+        self.data = data
+        self.version += 1
+        self.save()
+    
+    def reload_if_changed(self) -> bool:
+        """UI 밖에서 config.json이 바뀌었으면 다시 읽음"""
+        stamp = self._file_stamp()
+        if stamp is None or stamp == self._stamp:
+            return False
+        try:
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # 편집 중이라 깨진 파일이면 다음 확인 때 다시 시도
+            return False
+        self._stamp = stamp
+        self.data = data
+        self.version += 1
+        return True
     
     def default_config(self) -> dict:
         return {
@@ -43,12 +121,108 @@ class Config:
                 "api_key": "",
                 "base_url": "",
                 "model": "gpt-4o-mini",
-                "temperature": 0.7
+                "temperature": 0.7,
+                "prompt_cache": True,
+                "fallback": []
             },
             "app": {
                 "host": "0.0.0.0",
                 "port": 8080,
-                "language": "ko"
+                "language": "ko",
+                "workers": 1,
+                "config_watch_interval": 2,
+                "warmup": True
+            },
+            "session": {
+                "backend": "sqlite",
+                "path": "sessions.db",
+                "max_messages": 50,
+                "cache_max_sessions": 1000,
+                "cache_max_bytes": 16777216,
+                "cache_ttl": 600,
+                "cache_check_interval": 1.0
+            },
+            "cache": {
+                "enabled": False,
+                "cache_nondeterministic": False,
+                "max_entries": 1000,
+                "max_bytes": 33554432,
+                "ttl": 3600,
+                "disk_path": "cache.db",
+                "disk_max_bytes": 268435456,
+                "coalesce": True
+            },
+            "semantic_cache": {
+                "enabled": False,
+                "threshold": 0.92,
+                "max_entries": 10000,
+                "ttl": 86400,
+                "path": "semantic_cache",
+                "embedder": {
+                    "provider": "ollama",
+                    "base_url": "",
+                    "model": "nomic-embed-text"
+                }
+            },
+            "usage": {
+                "enabled": True,
+                "path": "usage.db",
+                "flush_interval": 10
+            },
+            "quota": {
+                "enabled": False,
+                "tokens_per_day": 0,
+                "requests_per_minute": 0,
+                "mode": "reject",
+                "max_wait": 10,
+                "exempt": ["summary"],
+                "sessions": {}
+            },
+            "ppt": {
+                "workers": 2,
+                "template": "",
+                "max_slides": 50,
+                "max_decks": 100
+            },
+            "ollama": {
+                "keep_alive": "30m",
+                "preload": True,
+                "keep_warm_interval": 240,
+                "load_penalty": 2,
+                "load_timeout": 120
+            },
+            "summary": {
+                "enabled": False,
+                "threshold_tokens": 3000,
+                "keep_messages": 6,
+                "llm": {}
+            },
+            "context": {
+                "tokenizer": "approx",
+                "max_tokens": 8192,
+                "reserve_tokens": 1024,
+                "budgets": {},
+                "trim_chunk": 8
+            },
+            "limits": {
+                "max_concurrency": 8,
+                "max_queue": 100,
+                "max_session_queue": 20,
+                "batch_max_queue": 100,
+                "queue_timeout": 30,
+                "providers": {
+                    "ollama": {"max_concurrency": 2}
+                }
+            },
+            "resilience": {
+                "max_retries": 2,
+                "backoff_base": 0.5,
+                "backoff_max": 8,
+                "failure_threshold": 5,
+                "reset_timeout": 30
+            },
+            "metrics": {
+                "server_timing": False
             }
         }
     
@@ -63,186 +237,783 @@ class Config:
         return value
     
     def set(self, key: str, value):
-        keys = key.split('.')
-        target = self.data
-        for k in keys[:-1]:
-            if k not in target:
-                target[k] = {}
-            target = target[k]
-        target[keys[-1]] = value
-        self.save()
+        changes = value
+        for k in reversed(key.split('.')):
+            changes = {k: changes}
+        self.update(changes)
 
-config = Config()
+# 설정과 설정으로 만드는 서비스들은 create_app()에서 생성 (import만으로는 파일/DB를 열지 않음)
+config: Optional[Config] = None
 
-# LLM 클라이언트
-class LLMClient:
-    def __init__(self):
-        self.provider = config.get('llm.provider', 'openai')
-        self.api_key = config.get('llm.api_key', '')
-        self.base_url = config.get('llm.base_url', '')
-        self.model = config.get('llm.model', 'gpt-4o-mini')
-        self.temperature = config.get('llm.temperature', 0.7)
-    
-    async def chat(self, message: str, history: List[Dict] = None) -> str:
-        """LLM과 대화"""
-        if not self.api_key and self.provider != 'ollama':
-            return "❌ LLM API 키가 설정되지 않았습니다. 설정에서 API 키를 입력해주세요."
-        
+_http2_available: Optional[bool] = None
+
+def http2_available() -> bool:
+    """HTTP/2 지원 여부 (h2 패키지가 있을 때만, 첫 연결 풀 생성 시 확인)"""
+    global _http2_available
+    if _http2_available is None:
         try:
-            if self.provider == 'openai':
-                return await self._chat_openai(message, history)
-            elif self.provider == 'anthropic':
-                return await self._chat_anthropic(message, history)
-            elif self.provider == 'ollama':
-                return await self._chat_ollama(message, history)
-            else:
-                return await self._chat_custom(message, history)
-        except Exception as e:
-            return f"❌ LLM 오류: {str(e)}"
+            import h2  # noqa: F401
+            _http2_available = True
+        except ImportError:
+            _http2_available = False
+    return _http2_available
+
+class ConnectionPools:
+    """프로바이더별 장기 HTTP 연결 풀
+
+    매 요청마다 TCP/TLS 핸드셰이크를 새로 하지 않도록
+    (provider, base_url) 단위로 httpx.AsyncClient를 재사용한다.
+    """
+    def __init__(self):
+        self._clients: Dict[tuple, httpx.AsyncClient] = {}
+        # 사용 중인 요청 수 (id(client) -> count), 교체되어 닫힐 예정인 풀
+        self._inflight: Dict[int, int] = {}
+        self._retired: Dict[int, httpx.AsyncClient] = {}
     
-    async def _chat_openai(self, message: str, history: List[Dict] = None) -> str:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        messages = [{"role": "system", "content": self._get_system_prompt()}]
-        
-        if history:
-            for h in history[-10:]:  # 최근 10개만
-                messages.append({"role": h.get("role", "user"), "content": h.get("content", "")})
-        
-        messages.append({"role": "user", "content": message})
+    def get(self, provider: str, base_url: str = "") -> httpx.AsyncClient:
+        key = (provider, base_url or "")
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._create(provider)
+            self._clients[key] = client
+        return client
+    
+    def _create(self, provider: str) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=config.get('llm.max_connections', 20),
+            max_keepalive_connections=config.get('llm.max_keepalive_connections', 20),
+            keepalive_expiry=config.get('llm.keepalive_expiry', 30.0)
+        )
+        # HTTP/2는 ALPN으로 협상되므로 지원하지 않는 서버(Ollama 등)는 HTTP/1.1로 동작
+        http2 = http2_available() and bool(config.get('llm.http2', True))
         
-        data = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": self.temperature
-        }
+        async def on_request(request: httpx.Request):
+            size = request.headers.get('content-length')
+            if size:
+                metrics.UPSTREAM_REQUEST_BYTES.observe(int(size), provider)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=60.0
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result['choices'][0]['message']['content']
+        return httpx.AsyncClient(limits=limits, http2=http2, timeout=60.0,
+                                 event_hooks={'request': [on_request]})
     
-    async def _chat_anthropic(self, message: str, history: List[Dict] = None) -> str:
-        headers = {
-            "x-api-key": self.api_key,
-            "Content-Type": "application/json"
-        }
-        
-        system_prompt = self._get_system_prompt()
+    @asynccontextmanager
+    async def using(self, client: httpx.AsyncClient):
+        """업스트림 호출 동안 풀 사용 중으로 표시"""
+        key = id(client)
+        self._inflight[key] = self._inflight.get(key, 0) + 1
+        try:
+            yield client
+        finally:
+            self._inflight[key] -= 1
+            if not self._inflight[key]:
+                del self._inflight[key]
+                retired = self._retired.pop(key, None)
+                if retired is not None:
+                    await retired.aclose()
+    
+    async def retire(self, provider: str, base_url: str = ""):
+        """풀을 새 요청에서 제외하고, 진행 중인 요청이 모두 끝나면 닫음"""
+        client = self._clients.pop((provider, base_url or ""), None)
+        if client is None:
+            return
+        if self._inflight.get(id(client)):
+            self._retired[id(client)] = client
+        else:
+            await client.aclose()
+    
+    async def aclose(self):
+        clients = list(self._clients.values()) + list(self._retired.values())
+        self._clients.clear()
+        self._retired.clear()
+        for client in clients:
+            await client.aclose()
+
+http_pools = ConnectionPools()
+
+provider_limiters: Optional[ProviderLimiters] = None
+retry_policy = None
+circuit_breakers: Optional[CircuitBreakers] = None
+context_builder = None
+response_cache = None
+semantic_cache: Optional[SemanticCache] = None
+usage_meter: Optional[UsageMeter] = None
+session_quotas: Optional[SessionQuotas] = None
+session_store = None
+compactor: Optional[Compactor] = None
+ollama_pool: Optional[OllamaPool] = None
+
+# 동시에 들어온 같은 프롬프트를 업스트림 호출 하나로 합침
+chat_flights = SingleFlight(on_join=lambda: metrics.COALESCED.inc(1, "chat"))
+stream_flights = SingleFlight(on_join=lambda: metrics.COALESCED.inc(1, "stream"))
+
+class LLMError(Exception):
+    """업스트림 LLM 호출 실패 (재시도/대체 프로바이더까지 모두 실패)"""
+
+SYSTEM_PROMPT = """당신은 Shimplex AI 어시스턴트입니다. 사용자의 질문에 친절하고 정확하게 답변해주세요.
+
+응답은 간결하고 명확하게 한국어로 해주세요."""
+
+# LLM 클라이언트
+# llm 설정 항목별 허용 타입
+LLM_SETTING_TYPES = {
+    'provider': str, 'api_key': str, 'base_url': str, 'model': str,
+    'temperature': (int, float), 'prompt_cache': bool, 'instances': list, 'fallback': list
+}
+
+def check_llm_settings(settings: dict, fallback: bool = False):
+    """llm 설정(대체 프로바이더 포함) 형식 확인 (잘못되면 ValueError)"""
+    if not isinstance(settings, dict):
+        raise ValueError("대체 프로바이더는 객체여야 합니다" if fallback else "llm은 객체여야 합니다")
+    for key, expected in LLM_SETTING_TYPES.items():
+        value = settings.get(key)
+        # bool은 int의 하위 클래스라 temperature에서 따로 거른다
+        if value is not None and (not isinstance(value, expected) or (key == 'temperature' and isinstance(value, bool))):
+            raise ValueError(f"{key} 형식이 올바르지 않습니다")
+    if not all(isinstance(url, str) for url in settings.get('instances') or []):
+        raise ValueError("instances는 주소 문자열 목록이어야 합니다")
+    if not fallback:
+        for entry in settings.get('fallback') or []:
+            check_llm_settings(entry, fallback=True)
+
+class LLMClient:
+    def __init__(self, settings: dict = None, with_fallbacks: bool = True):
+        settings = settings if settings is not None else config.get('llm', {})
+        self.settings = settings
+        self.provider = settings.get('provider', 'openai')
+        self.adapter = get_adapter(self.provider)
+        self.api_key = settings.get('api_key', '')
+        self.base_url = settings.get('base_url', '')
+        self.model = settings.get('model', 'gpt-4o-mini')
+        self.temperature = settings.get('temperature', 0.7)
+        # 프로바이더 프롬프트 캐시 사용 (Anthropic은 캐시 구간 표시, OpenAI는 자동)
+        self.prompt_cache = settings.get('prompt_cache', True)
+        # Ollama: 모델을 메모리에 유지할 시간, 요청을 나눠 보낼 인스턴스 주소들
+        self.keep_alive = settings.get('keep_alive', config.get('ollama.keep_alive'))
+        self.instances = settings.get('instances') or []
+        self._routes: Dict[str, 'LLMClient'] = {}
+        self._http: Optional[httpx.AsyncClient] = None
         
-        # Anthropic은 history를 messages에 포함
-        messages = []
-        if history:
-            for h in history[-10:]:
-                role = "assistant" if h.get("role") == "ai" else "user"
-                messages.append({"role": role, "content": h.get("content", "")})
+        # 장애 시 순서대로 시도할 대체 프로바이더 (llm.fallback)
+        self.fallbacks = []
+        if with_fallbacks:
+            for fallback in settings.get('fallback', []):
+                merged = {'temperature': self.temperature}
+                merged.update(fallback)
+                self.fallbacks.append(LLMClient(merged, with_fallbacks=False))
+    
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """현재 프로바이더의 공유 연결 풀
+
+        처음 사용할 때 풀을 고정해 두므로, 설정이 바뀌어 풀이 교체되어도
+        이 클라이언트로 진행 중인 요청은 기존 풀에서 끝난다.
+        """
+        if self._http is None or self._http.is_closed:
+            self._http = http_pools.get(self.provider, self.base_url)
+        return self._http
+    
+    def ollama_urls(self) -> List[str]:
+        return [url.rstrip("/") for url in self.instances] or [self.adapter.base_url(self)]
+    
+    @asynccontextmanager
+    async def routed(self) -> AsyncIterator['LLMClient']:
+        """요청을 보낼 클라이언트
+
+        Ollama는 모델이 올라가 있고 덜 바쁜 인스턴스를 골라 그 주소의 클라이언트를 쓴다.
+        """
+        if self.provider != 'ollama' or ollama_pool is None:
+            yield self
+            return
+        async with ollama_pool.acquire(self.ollama_urls(), self.model) as base_url:
+            if base_url == self.adapter.base_url(self):
+                yield self
+                return
+            route = self._routes.get(base_url)
+            if route is None:
+                settings = dict(self.settings, base_url=base_url, instances=[], keep_alive=self.keep_alive)
+                route = self._routes[base_url] = LLMClient(settings, with_fallbacks=False)
+            yield route
+    
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key) or self.provider == 'ollama'
+    
+    def _chain(self) -> List['LLMClient']:
+        """시도할 클라이언트 순서 (API 키가 없는 프로바이더는 제외)"""
+        chain = [c for c in [self] + self.fallbacks if c.configured]
+        if not chain:
+            raise LLMError("LLM API 키가 설정되지 않았습니다. 설정에서 API 키를 입력해주세요.")
+        return chain
+    
+    async def chat(self, message: str, history: List[Dict] = None, session_id: str = "default",
+                   summary: str = "", usage_session: Optional[str] = None) -> str:
+        """LLM과 대화
+
+        일시적 오류(429/5xx/타임아웃)는 백오프 후 재시도하고, 그래도 실패하거나
+        서킷 브레이커가 열려 있으면 llm.fallback의 다음 프로바이더로 넘어간다.
+        모두 실패하면 LLMError.
         
-        messages.append({"role": "user", "content": message})
+        프로바이더 동시 요청 한도를 넘으면 대기열에서 기다리며,
+        대기열이 가득 차거나 대기 시간이 초과되면 QueueFullError/QueueTimeoutError.
         
-        data = {
-            "model": self.model or "claude-3-haiku-20240307",
-            "max_tokens": 4096,
-            "system": system_prompt,
-            "messages": messages,
-            "temperature": self.temperature
-        }
+        같은 프롬프트가 이미 업스트림에서 처리 중이면 새로 호출하지 않고 그 결과를 함께 받는다.
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=data,
-                timeout=60.0
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result['content'][0]['text']
-    
-    async def _chat_ollama(self, message: str, history: List[Dict] = None) -> str:
-        base_url = self.base_url or "http://localhost:11434"
+        캐시에 없어 업스트림으로 보내야 하면 먼저 세션 할당량을 확인한다 (초과 시 QuotaExceededError).
+        토큰 사용량은 usage_session(기본 session_id)에 기록한다 - 대화 요약은 요약한 세션의 사용량이다.
+        """
+        chain = self._chain()
+        prompt = self._prompt(message, history, summary)
         
-        messages = [{"role": "system", "content": self._get_system_prompt()}]
+        cache_key = self._cache_key(prompt)
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                metrics.record_timing("cache", 0.0)
+                return cached
         
-        if history:
-            for h in history[-10:]:
-                role = "assistant" if h.get("role") == "ai" else "user"
-                messages.append({"role": role, "content": h.get("content", "")})
+        cached, semantic = await self._semantic_lookup(prompt, message, session_id)
+        if cached is not None:
+            metrics.record_timing("cache", 0.0)
+            return cached
         
-        messages.append({"role": "user", "content": message})
+        if session_quotas is not None:
+            await session_quotas.admit(session_id)
         
-        data = {
-            "model": self.model or "llama3.1:8b",
-            "messages": messages,
-            "stream": False
-        }
+        return await chat_flights.call(
+            self._flight_key(prompt, cache_key),
+            lambda: self._chat_upstream(chain, prompt, message, history, summary, session_id, cache_key, semantic,
+                                        usage_session or session_id)
+        )
+    
+    async def _chat_upstream(self, chain: List['LLMClient'], prompt: tuple, message: str,
+                             history: Optional[List[Dict]], summary: str, session_id: str,
+                             cache_key: Optional[str], semantic: Optional[tuple] = None,
+                             usage_session: Optional[str] = None) -> str:
+        last_error = None
+        for client in chain:
+            breaker = circuit_breakers.get(client.provider)
+            if breaker.blocked:
+                last_error = CircuitOpenError(f"{client.provider} 일시 차단됨")
+                continue
+            
+            # 모델마다 토큰 예산이 다르므로 대체 프로바이더는 기록 범위를 다시 계산
+            client_prompt = prompt if client is self else client._prompt(message, history, summary)
+            limiter = provider_limiters.get(client.provider)
+            trial = None
+            error = None
+            try:
+                for attempt in range(retry_policy.max_retries + 1):
+                    async with limiter.slot(session_id) as wait:
+                        # 시험 요청(half-open)은 처음 슬롯을 잡은 뒤에 정한다 - 대기열 오류로 시험이 묶이지 않도록
+                        if trial is None:
+                            trial = breaker.state == "half-open"
+                            if not breaker.allow():
+                                error = CircuitOpenError(f"{client.provider} 일시 차단됨")
+                                break
+                        client._record_wait(wait)
+                        start = time.perf_counter()
+                        try:
+                            async with client.routed() as target, http_pools.using(target.http):
+                                response = await target._dispatch(client_prompt, usage_session or session_id)
+                        except Exception as e:
+                            client._record_upstream(start, "error")
+                            error = e
+                        else:
+                            client._record_upstream(start, "ok")
+                            breaker.record_success()
+                            # 대체 프로바이더의 응답은 다른 키로 캐시되지 않도록 주 프로바이더일 때만 저장
+                            if client is self:
+                                self._remember(cache_key, semantic, response)
+                            return response
+                    # 백오프 동안 동시 요청 슬롯을 잡고 있지 않도록 슬롯을 놓은 뒤 기다린다
+                    if not is_retryable(error) or attempt == retry_policy.max_retries:
+                        break
+                    await asyncio.sleep(retry_policy.delay(attempt, error))
+                # 잘못된 요청(400/413 등)이나 응답 파싱 오류는 프로바이더 장애로 세지 않는다
+                if is_retryable(error):
+                    breaker.record_failure()
+            finally:
+                if trial:
+                    # 취소 등으로 결과 없이 끝난 시험 요청은 다음 요청이 다시 시험하게 한다
+                    breaker.release_trial()
+            last_error = error
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{base_url}/api/chat",
-                json=data,
-                timeout=120.0
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result['message']['content']
+        raise LLMError(f"LLM 오류: {str(last_error)}")
     
-    async def _chat_custom(self, message: str, history: List[Dict] = None) -> str:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+    async def chat_stream(self, message: str, history: List[Dict] = None, session_id: str = "default",
+                          summary: str = "") -> AsyncIterator[str]:
+        """LLM과 대화 (토큰 스트리밍)
+
+        재시도와 대체 프로바이더 전환은 첫 토큰을 받기 전까지만 가능하며,
+        스트리밍 도중 끊기면 LLMError.
+        """
+        chain = self._chain()
+        prompt = self._prompt(message, history, summary)
         
-        messages = [{"role": "system", "content": self._get_system_prompt()}]
+        cache_key = self._cache_key(prompt)
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
         
-        if history:
-            for h in history[-10:]:
-                messages.append({"role": h.get("role", "user"), "content": h.get("content", "")})
+        cached, semantic = await self._semantic_lookup(prompt, message, session_id)
+        if cached is not None:
+            yield cached
+            return
         
-        messages.append({"role": "user", "content": message})
+        if session_quotas is not None:
+            await session_quotas.admit(session_id)
         
-        data = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": self.temperature
-        }
+        tokens = stream_flights.stream(
+            self._flight_key(prompt, cache_key),
+            lambda: self._stream_upstream(chain, prompt, message, history, summary, session_id, cache_key, semantic)
+        )
+        async for token in tokens:
+            yield token
+    
+    async def _stream_upstream(self, chain: List['LLMClient'], prompt: tuple, message: str,
+                               history: Optional[List[Dict]], summary: str, session_id: str,
+                               cache_key: Optional[str], semantic: Optional[tuple] = None) -> AsyncIterator[str]:
+        last_error = None
+        for client in chain:
+            breaker = circuit_breakers.get(client.provider)
+            if breaker.blocked:
+                last_error = CircuitOpenError(f"{client.provider} 일시 차단됨")
+                continue
+            
+            # 모델마다 토큰 예산이 다르므로 대체 프로바이더는 기록 범위를 다시 계산
+            client_prompt = prompt if client is self else client._prompt(message, history, summary)
+            limiter = provider_limiters.get(client.provider)
+            trial = None
+            error = None
+            try:
+                for attempt in range(retry_policy.max_retries + 1):
+                    async with limiter.slot(session_id) as wait:
+                        if trial is None:
+                            trial = breaker.state == "half-open"
+                            if not breaker.allow():
+                                error = CircuitOpenError(f"{client.provider} 일시 차단됨")
+                                break
+                        client._record_wait(wait)
+                        chunks = []
+                        start = time.perf_counter()
+                        try:
+                            async with client.routed() as target, http_pools.using(target.http):
+                                async for token in target._dispatch_stream(client_prompt, session_id):
+                                    if not chunks:
+                                        metrics.TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start, client.provider, client.model)
+                                    chunks.append(token)
+                                    yield token
+                        except Exception as e:
+                            client._record_upstream(start, "error")
+                            error = e
+                            if chunks:
+                                if is_retryable(e):
+                                    breaker.record_failure()
+                                raise LLMError(f"LLM 오류: {str(e)}")
+                        else:
+                            client._record_upstream(start, "ok")
+                            breaker.record_success()
+                            if client is self:
+                                self._remember(cache_key, semantic, "".join(chunks))
+                            return
+                    # 백오프 동안 동시 요청 슬롯을 잡고 있지 않도록 슬롯을 놓은 뒤 기다린다
+                    if not is_retryable(error) or attempt == retry_policy.max_retries:
+                        break
+                    await asyncio.sleep(retry_policy.delay(attempt, error))
+                # 잘못된 요청(400/413 등)이나 응답 파싱 오류는 프로바이더 장애로 세지 않는다
+                if is_retryable(error):
+                    breaker.record_failure()
+            finally:
+                # 클라이언트가 끊겨 스트림이 닫힌 경우(GeneratorExit) 포함
+                if trial:
+                    breaker.release_trial()
+            last_error = error
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=60.0
-            )
+        raise LLMError(f"LLM 오류: {str(last_error)}")
+    
+    async def warm_up(self) -> dict:
+        """연결 풀에 미리 연결해 첫 요청 전에 TCP/TLS 핸드셰이크를 끝낸다"""
+        url = self.adapter.warmup_url(self)
+        if not url:
+            return {"provider": self.provider, "status": "skipped"}
+        start = time.perf_counter()
+        try:
+            response = await self.http.get(url, headers=self.adapter.headers(self), timeout=5.0)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = f"error: {type(e).__name__}"
+        return {"provider": self.provider, "status": status, "seconds": round(time.perf_counter() - start, 3)}
+    
+    def _record_wait(self, wait: float):
+        metrics.QUEUE_WAIT.observe(wait, self.provider)
+        metrics.record_timing("queue", wait)
+    
+    def _record_upstream(self, start: float, outcome: str):
+        elapsed = time.perf_counter() - start
+        metrics.UPSTREAM_LATENCY.observe(elapsed, self.provider, self.model, outcome)
+        metrics.record_timing("upstream", elapsed)
+    
+    def _record_usage(self, usage: Dict[str, int], session_id: str = "default"):
+        """업스트림 호출 1건과 프로바이더가 보고한 토큰 사용량 기록 (prompt/completion/cache_read/cache_write)"""
+        for kind, tokens in usage.items():
+            metrics.TOKENS.inc(tokens, self.provider, self.model, kind)
+        if usage_meter is not None:
+            usage_meter.record(session_id, self.provider, self.model, usage)
+    
+    async def _dispatch(self, prompt: tuple, session_id: str = "default") -> str:
+        url, headers, data, timeout = self.adapter.request(self, *prompt)
+        response = await self.http.post(
+            url,
+            headers=headers,
+            content=message_encoder.encode(data),
+            timeout=timeout
+        )
+        response.raise_for_status()
+        text, usage = self.adapter.parse(response.json())
+        self._record_usage(usage, session_id)
+        return text
+    
+    async def _dispatch_stream(self, prompt: tuple, session_id: str = "default") -> AsyncIterator[str]:
+        url, headers, data, timeout = self.adapter.request(self, *prompt, stream=True)
+        async with self.http.stream("POST", url, headers=headers, content=message_encoder.encode(data),
+                                    timeout=timeout) as response:
             response.raise_for_status()
-            result = response.json()
-            return result['choices'][0]['message']['content']
+            if self.adapter.stream_format == "ndjson":
+                events = self._iter_ndjson(response)
+            else:
+                events = self._iter_sse(response)
+            # Anthropic은 입력/출력 토큰이 다른 이벤트로, 출력은 누적값으로 오므로 항목별 최댓값을 모은다
+            totals: Dict[str, int] = {}
+            try:
+                async for event in events:
+                    text, usage = self.adapter.parse_event(event)
+                    for kind, tokens in usage.items():
+                        totals[kind] = max(totals.get(kind, 0), tokens)
+                    if text:
+                        yield text
+            finally:
+                # 중간에 끊기거나 취소돼도 받은 데까지는 집계
+                self._record_usage(totals, session_id)
     
-    def _get_system_prompt(self) -> str:
-        return """당신은 Shimplex AI 어시스턴트입니다. 사용자의 질문에 친절하고 정확하게 답변해주세요.
+    def _prompt(self, message: str, history: List[Dict] = None, summary: str = "") -> tuple:
+        """(시스템 프롬프트, 메시지) - 모델별 토큰 예산 이내의 기록 + 새 메시지
 
-응답은 간결하고 명확하게 한국어로 해주세요."""
+        기록은 저장 시 역할이 정규화되어 있으므로 복사 없이 그대로 사용한다.
+        요약된 이전 대화는 시스템 프롬프트에 붙인다.
+        """
+        system_prompt = self._get_system_prompt(summary)
+        window = context_builder.window(self.model, system_prompt, message, history)
+        return system_prompt, window + [{"role": "user", "content": message}]
+    
+    def _cache_key(self, prompt: tuple) -> Optional[str]:
+        """응답 캐시 키 (캐시 대상이 아니면 None)"""
+        if not response_cache.cacheable(self.temperature):
+            return None
+        return make_cache_key(self.provider, self.model, self.temperature, *prompt)
+    
+    async def _semantic_lookup(self, prompt: tuple, message: str, session_id: str) -> tuple:
+        """의미 캐시 조회 -> (캐시된 응답 또는 None, 응답 저장용 (scope, 메시지, 벡터) 또는 None)
+
+        scope는 새 메시지를 뺀 나머지(프로바이더/모델/온도/시스템 프롬프트/이전 대화)라서
+        같은 맥락에서 표현만 다른 질문끼리만 응답을 공유한다.
+        대화 요약과 배치처럼 내부에서 부르는 요청은 비슷한 다른 입력의 응답을 받으면 안 되므로 건너뛴다.
+        """
+        if semantic_cache is None or session_id in (SUMMARY_SESSION_ID, batch.BATCH_SESSION_ID):
+            return None, None
+        system_prompt, messages = prompt
+        scope = make_cache_key(self.provider, self.model, self.temperature, system_prompt, messages[:-1])
+        cached, vector = await semantic_cache.lookup(scope, message)
+        if cached is not None or vector is None:
+            return cached, None
+        return None, (scope, message, vector)
+    
+    def _remember(self, cache_key: Optional[str], semantic: Optional[tuple], response: str):
+        """주 프로바이더 응답을 응답 캐시/의미 캐시에 저장 (저장 실패는 기록만 하고 응답은 그대로 돌려준다)"""
+        try:
+            if cache_key:
+                response_cache.set(cache_key, response)
+            if semantic is not None and response:
+                scope, message, vector = semantic
+                semantic_cache.add(scope, message, response, vector)
+        except Exception as e:
+            print(f"⚠️ 응답 캐시 저장 실패: {type(e).__name__}: {e}")
+    
+    def _flight_key(self, prompt: tuple, cache_key: Optional[str]) -> Optional[str]:
+        """동시 요청 합치기 키 (cache.coalesce가 꺼져 있으면 None)
 
-llm_client = LLMClient()
+        응답 캐시 대상이 아닌 온도에서도 동시에 들어온 같은 프롬프트끼리는 합친다.
+        """
+        if not config.get('cache.coalesce', True):
+            return None
+        return cache_key or make_cache_key(self.provider, self.model, self.temperature, *prompt)
+    
+    def build_request(self, message: str, history: List[Dict] = None, stream: bool = False) -> tuple:
+        """(url, headers, data, timeout) - 네이티브 배치 등 직접 호출용"""
+        return self.adapter.request(self, *self._prompt(message, history), stream=stream)
+    
+    @staticmethod
+    async def _iter_sse(response: httpx.Response) -> AsyncIterator[dict]:
+        """SSE 응답의 data 라인을 JSON으로 파싱"""
+        async for line in response.aiter_lines():
+            if not line.startswith('data:'):
+                continue
+            payload = line[5:].strip()
+            if not payload:
+                continue
+            if payload == '[DONE]':
+                # break 하지 않고 끝까지 읽어야 연결이 풀로 돌아간다
+                continue
+            yield json.loads(payload)
+    
+    @staticmethod
+    async def _iter_ndjson(response: httpx.Response) -> AsyncIterator[dict]:
+        """줄 단위 JSON 응답 파싱 (Ollama)"""
+        async for line in response.aiter_lines():
+            if line.strip():
+                yield json.loads(line)
+    
+    def _get_system_prompt(self, summary: str = "") -> str:
+        if summary:
+            return f"{SYSTEM_PROMPT}\n\n[이전 대화 요약]\n{summary}"
+        return SYSTEM_PROMPT
+
+def init_services():
+    """설정을 읽고 공유 서비스 생성"""
+    global config, provider_limiters, retry_policy, circuit_breakers, context_builder
+    global response_cache, semantic_cache, session_store, compactor, ollama_pool, _llm_client
+    global usage_meter, session_quotas
+    config = Config()
+    
+    # 프로바이더별 동시 요청 제한 + 대기열
+    provider_limiters = ProviderLimiters(config.get('limits', {}), {batch.BATCH_SESSION_ID: 'batch_max_queue'})
+    
+    # 재시도 정책 + 프로바이더별 서킷 브레이커
+    retry_policy = create_retry_policy(config.get('resilience', {}))
+    circuit_breakers = CircuitBreakers(config.get('resilience', {}))
+    
+    # 토큰 예산 기반 대화 기록 윈도우
+    context_builder = create_context_builder(config.get('context', {}))
+    
+    # 동일 프롬프트 응답 캐시 (config.json의 cache.enabled로 활성화)
+    response_cache = create_response_cache(config.get('cache', {}))
+    
+    # 표현만 다른 같은 질문의 응답 재사용 (config.json의 semantic_cache.enabled로 활성화, numpy 필요)
+    semantic_cache = create_semantic_cache(
+        config.get('semantic_cache', {}),
+        lambda base_url: http_pools.get('embedding', base_url)
+    )
+    
+    # 세션/프로바이더/모델별 토큰 사용량 집계와 세션 할당량 (config.json의 quota.enabled로 활성화)
+    usage_meter = create_usage_meter(config.get('usage', {}))
+    session_quotas = create_session_quotas(usage_meter, config.get('quota', {}))
+    
+    # 세션별 대화 저장소 (SQLite + LRU/TTL 캐시), 메시지 토큰 수는 저장할 때 한 번만 센다
+    session_store = create_session_store(config.get('session', {}), context_builder.counter.count)
+    
+    # 긴 대화를 백그라운드에서 요약해 오래된 기록을 대체 (config.json의 summary.enabled로 활성화)
+    compactor = Compactor(
+        session_store,
+        context_builder.counter.message,
+        threshold_tokens=config.get('summary.threshold_tokens', 3000),
+        keep_messages=config.get('summary.keep_messages', 6)
+    )
+    
+    # 로컬 Ollama 모델 미리 로드/keep-warm/인스턴스 라우팅
+    ollama_pool = OllamaPool(
+        lambda base_url: http_pools.get('ollama', base_url),
+        keep_warm_interval=config.get('ollama.keep_warm_interval', 240),
+        load_penalty=config.get('ollama.load_penalty', 2),
+        load_timeout=config.get('ollama.load_timeout', 120)
+    )
+    
+    _llm_client = None
+
+_llm_client: Optional[LLMClient] = None
+
+def get_llm_client() -> LLMClient:
+    """현재 설정의 LLM 클라이언트 (처음 사용할 때 생성)"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient()
+    return _llm_client
+
+def summary_client() -> LLMClient:
+    """요약에 쓸 클라이언트 (summary.llm에 더 저렴한 모델 등을 지정하면 llm 설정 위에 덮어씀)"""
+    overrides = config.get('summary.llm') or {}
+    if not overrides:
+        return get_llm_client()
+    settings = dict(config.get('llm', {}))
+    settings.update(overrides)
+    return LLMClient(settings, with_fallbacks=False)
 
-# 메모리 기반 대화 저장 (세션별)
-chat_histories = {}
+async def load_history(session_id: str) -> Tuple[List[Dict], str]:
+    """(대화 기록, 요약) - 저장소(SQLite) 조회가 이벤트 루프를 막지 않도록 스레드 풀에서 읽는다"""
+    return await run_in_threadpool(lambda: (session_store.get(session_id), session_store.summary(session_id)))
+
+async def save_turn(session_id: str, message: str, response: str):
+    """대화 기록 저장 (최근 max_messages개만 유지), 길어졌으면 요약 예약
+
+    연결이 끊겨 취소되는 중에 불려도 받은 응답은 저장되도록 저장하는 동안은 취소를 막는다.
+    """
+    with anyio.CancelScope(shield=True):
+        await run_in_threadpool(
+            session_store.append,
+            session_id,
+            [{"role": "user", "content": message}, {"role": "assistant", "content": response}],
+            config.get('session.max_messages', 50)
+        )
+    if config.get('summary.enabled', False):
+        compactor.schedule(session_id, summary_client())
+
+async def apply_config():
+    """현재 설정 스냅샷으로 LLM 클라이언트 교체
+
+    진행 중인 요청은 이전 클라이언트와 연결 풀로 끝까지 처리되고 새 요청부터
+    새 클라이언트를 쓴다. 연결 풀은 프로바이더나 base_url이 바뀐 경우에만 재생성한다.
+    """
+    global _llm_client
+    old_client = get_llm_client()
+    _llm_client = new_client = LLMClient()
+    
+    if (old_client.provider, old_client.base_url) != (new_client.provider, new_client.base_url):
+        await http_pools.retire(old_client.provider, old_client.base_url)
+        http_pools.get(new_client.provider, new_client.base_url)
+    
+    # 바뀐 Ollama 모델을 백그라운드에서 미리 로드
+    targets = ollama_targets()
+    if targets and targets != ollama_targets(old_client):
+        ollama_pool.schedule_preload(targets)
+
+async def watch_config():
+    """config.json 외부 변경 감시 (UI 밖에서 편집해도 재시작 없이 반영)"""
+    interval = config.get('app.config_watch_interval', 2)
+    if not interval:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        if config.reload_if_changed():
+            print(f"🔄 설정 다시 읽음: {CONFIG_FILE} (v{config.version})")
+            await apply_config()
+
+config_watcher: Optional[asyncio.Task] = None
+warmup_task: Optional[asyncio.Task] = None
+
+# /api/ready 응답 (연결 풀 준비가 끝나면 ready)
+readiness = {"ready": False, "warmup": []}
+
+def ollama_targets(client: Optional[LLMClient] = None) -> List[tuple]:
+    """미리 올려 둘 Ollama 모델 [(인스턴스 주소들, 모델, keep_alive)] - 주/대체/요약 클라이언트 중 Ollama"""
+    if not config.get('ollama.preload', True):
+        return []
+    client = client or get_llm_client()
+    clients = [client] + client.fallbacks
+    if config.get('summary.enabled', False):
+        clients.append(summary_client())
+    return [(c.ollama_urls(), c.model, c.keep_alive) for c in clients if c.provider == 'ollama']
+
+async def warm_up():
+    """주/대체 프로바이더 연결 풀에 미리 연결하고 Ollama 모델을 미리 로드
+
+    프로바이더 장애로 모든 인스턴스가 준비 안 됨 상태에 빠지지 않도록
+    연결/로드 실패도 결과만 기록하고 준비 완료로 본다.
+    """
+    results = []
+    if config.get('app.warmup', True):
+        client = get_llm_client()
+        targets = ollama_targets()
+        # 미리 로드하는 Ollama는 로드 요청이 연결 준비를 겸한다
+        clients = [c for c in [client] + client.fallbacks
+                   if c.configured and not (targets and c.provider == 'ollama')]
+        results = list(await asyncio.gather(*(c.warm_up() for c in clients)))
+        if targets:
+            results += await ollama_pool.preload(targets)
+    readiness["warmup"] = results
+    readiness["ready"] = True
+    ollama_pool.start()
+
+async def startup():
+    """연결 풀 준비(백그라운드)와 설정 파일 감시 시작"""
+    global config_watcher, warmup_task
+    readiness.update(ready=False, warmup=[])
+    warmup_task = asyncio.create_task(warm_up())
+    config_watcher = asyncio.create_task(watch_config())
+    if usage_meter is not None:
+        usage_meter.start()
+
+async def shutdown():
+    """설정 감시와 진행 중인 요약 중지, 연결 풀, PPT 렌더링 풀, 세션 저장소, 응답 캐시 정리, 남은 사용량 기록"""
+    for task in (warmup_task, config_watcher):
+        if task is not None:
+            task.cancel()
+    await compactor.aclose()
+    await ollama_pool.aclose()
+    await http_pools.aclose()
+    if deck_pool is not None:
+        deck_pool.shutdown()
+    if usage_meter is not None:
+        await usage_meter.aclose()
+    session_store.close()
+    response_cache.close()
+    if semantic_cache is not None:
+        semantic_cache.close()
+
+async def record_request_metrics(request: Request, call_next):
+    """요청 처리 시간 및 본문 크기 기록 (스트리밍 응답은 헤더 전송 시점까지)"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get('route')
+    path = getattr(route, 'path', 'other')
+    metrics.REQUEST_LATENCY.observe(time.perf_counter() - start, request.method, path, response.status_code)
+    if request.headers.get('content-length'):
+        metrics.REQUEST_BYTES.observe(int(request.headers['content-length']), path)
+    if response.headers.get('content-length'):
+        metrics.RESPONSE_BYTES.observe(int(response.headers['content-length']), path)
+    return response
+
+SESSIONS = metrics.registry.gauge("shimplex_sessions", "세션 수", ("state",))
+QUEUE_STATE = metrics.registry.gauge("shimplex_queue_requests", "프로바이더별 실행/대기 요청 수", ("provider", "state"))
+CIRCUIT_OPEN = metrics.registry.gauge("shimplex_circuit_open", "서킷 브레이커 열림 여부", ("provider",))
+OLLAMA_STATE = metrics.registry.gauge("shimplex_ollama_instance", "Ollama 인스턴스별 진행 중 요청/올라간 모델 수/정상 여부", ("instance", "state"))
+
+@metrics.registry.collector
+def collect_state_metrics():
+    """세션/대기열/서킷 상태를 게이지로 갱신"""
+    SESSIONS.set(session_store.count(), "stored")
+    if hasattr(session_store, 'cached_sessions'):
+        SESSIONS.set(session_store.cached_sessions(), "cached")
+    for provider, stats in provider_limiters.stats().items():
+        QUEUE_STATE.set(stats['active'], provider, "active")
+        QUEUE_STATE.set(stats['queued'], provider, "queued")
+    for provider, stats in circuit_breakers.stats().items():
+        CIRCUIT_OPEN.set(0 if stats['state'] == 'closed' else 1, provider)
+    for instance, stats in ollama_pool.stats().items():
+        OLLAMA_STATE.set(stats['active'], instance, "active")
+        OLLAMA_STATE.set(len(stats['loaded']), instance, "loaded")
+        OLLAMA_STATE.set(1 if stats['healthy'] else 0, instance, "healthy")
+
+static_assets: Optional[StaticAssets] = None
+_index_page = None
+
+def get_index_page():
+    """메인 페이지 (요청마다 달라지는 내용이 없어 첫 요청 때 한 번만 렌더링)"""
+    global _index_page
+    if _index_page is None:
+        _index_page = render_page("templates", "index.html", static_assets)
+    return _index_page
 
 # API 엔드포인트
-@app.get("/", response_class=HTMLResponse)
+@router.get("/", response_class=HTMLResponse)
 async def index(request: Request):
     """메인 페이지"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return get_index_page().response(request, REVALIDATE)
+
+@router.api_route("/static/{path:path}", methods=["GET", "HEAD"])
+async def static_file(request: Request, path: str):
+    """정적 파일 (해시 주소는 immutable 캐시, gzip/br 압축본, ETag/304)"""
+    return static_assets.response(request, path)
 
-@app.get("/api/config")
+@router.get("/api/config")
 async def get_config():
     """설정 조회 (API 키는 제외)"""
     safe_config = {
@@ -255,88 +1026,492 @@ async def get_config():
     }
     return safe_config
 
-@app.post("/api/config")
+@router.post("/api/config")
 async def update_config(data: dict):
-    """설정 업데이트"""
+    """설정 업데이트 (잘못된 값이면 저장하지 않고 400)"""
     if 'llm' in data:
-        for key, value in data['llm'].items():
-            config.set(f'llm.{key}', value)
+        # 합친 결과로 클라이언트를 먼저 만들어 보고, 문제가 없을 때만 파일에 저장
+        candidate = copy.deepcopy(config.data)
+        try:
+            if not isinstance(data['llm'], dict):
+                raise ValueError("llm은 객체여야 합니다")
+            merge_config(candidate, {'llm': data['llm']})
+            check_llm_settings(candidate['llm'])
+            LLMClient(candidate['llm'])
+        except (TypeError, ValueError, AttributeError) as e:
+            raise HTTPException(status_code=400, detail=f"잘못된 LLM 설정: {e}")
+        # 한 번에 반영하고 파일은 한 번만 저장
+        config.update({'llm': data['llm']})
     
-    # 설정 변경 후 클라이언트 재초기화
-    global llm_client
-    llm_client = LLMClient()
+    await apply_config()
     
-    return {"status": "ok"}
+    return {"status": "ok", "version": config.version}
 
 class ChatMessage(BaseModel):
     message: str
     session_id: str = "default"
 
-@app.post("/api/chat")
+@router.post("/api/chat")
 async def api_chat(chat: ChatMessage):
     """AI 채팅 API"""
     session_id = chat.session_id or "default"
+    timings = metrics.start_timing()
+    start = time.perf_counter()
     
     # 대화 기록 가져오기
-    if session_id not in chat_histories:
-        chat_histories[session_id] = []
-    
-    history = chat_histories[session_id]
-    
-    response = await llm_client.chat(chat.message, history)
+    history, summary = await load_history(session_id)
+    timings["history"] = time.perf_counter() - start
     
-    # 대화 기록 저장
-    history.append({"role": "user", "content": chat.message})
-    history.append({"role": "ai", "content": response})
+    try:
+        response = await get_llm_client().chat(chat.message, history, session_id, summary)
+    except (QueueFullError, QueueTimeoutError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+    except LLMError as e:
+        # 실패한 응답은 대화 기록에 남기지 않는다
+        raise HTTPException(status_code=502, detail=str(e))
     
-    # 최근 50개만 유지
-    if len(history) > 50:
-        chat_histories[session_id] = history[-50:]
+    await save_turn(session_id, chat.message, response)
     
-    return {
+    result = {
         "message": chat.message,
         "response": response,
         "timestamp": datetime.now().isoformat()
     }
+    if config.get('metrics.server_timing', False):
+        # 구간별 소요 시간을 Server-Timing 헤더로 노출
+        timings["total"] = time.perf_counter() - start
+        return JSONResponse(result, headers={"Server-Timing": metrics.server_timing_header(timings)})
+    return result
+
+@router.post("/api/chat/stream")
+async def api_chat_stream(chat: ChatMessage):
+    """AI 채팅 API (SSE 토큰 스트리밍)"""
+    session_id = chat.session_id or "default"
+    history, summary = await load_history(session_id)
+    client = get_llm_client()
+    
+    async def event_stream():
+        chunks = []
+        failed = False
+        try:
+            async for token in client.chat_stream(chat.message, history, session_id, summary):
+                chunks.append(token)
+                yield f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
+            done = {"response": "".join(chunks), "timestamp": datetime.now().isoformat()}
+            yield f"event: done\ndata: {json.dumps(done, ensure_ascii=False)}\n\n"
+        except (QueueFullError, QueueTimeoutError, QuotaExceededError, LLMError) as e:
+            failed = True
+            yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+        finally:
+            # 완료 또는 클라이언트 연결 종료(취소) 시점에 기록 저장 (실패한 응답은 제외)
+            if chunks and not failed:
+                await save_turn(session_id, chat.message, "".join(chunks))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def batch_concurrency(client: LLMClient, requested: int) -> int:
+    """배치 동시 요청 수 - 프로바이더 동시 실행 한도 이하"""
+    return max(1, min(requested, provider_limiters.get(client.provider).max_concurrency))
+
+@router.post("/api/chat/batch")
+async def api_chat_batch(request: Request, concurrency: int = Query(8, ge=1), native: bool = False):
+    """일괄 채팅 API
+
+    JSON 배열(문자열 또는 {"id", "message"}), JSONL 본문, 또는 multipart 파일(file)을 받아
+    완료되는 순서대로 NDJSON으로 결과를 스트리밍한다.
+    concurrency는 프로바이더 max_concurrency를 넘지 않게 줄인다 (넘는 만큼은 대기열만 차지한다).
+    """
+    content_type = request.headers.get('content-type', '')
+    try:
+        if content_type.startswith('multipart/form-data'):
+            form = await request.form()
+            upload = form.get('file')
+            if upload is None:
+                raise ValueError("file 필드가 필요합니다")
+            prompts = batch.parse_prompts((await upload.read()).decode('utf-8').splitlines())
+        elif content_type.startswith('application/json'):
+            body = await request.json()
+            if isinstance(body, dict):
+                body = body.get('prompts', [])
+            if not isinstance(body, list):
+                raise ValueError("prompts는 목록이어야 합니다")
+            prompts = batch.parse_prompts(body)
+        else:
+            prompts = batch.parse_prompts((await request.body()).decode('utf-8').splitlines())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    client = get_llm_client()
+    if native and client.provider not in ('openai', 'anthropic'):
+        raise HTTPException(status_code=400, detail=f"{client.provider}는 네이티브 배치를 지원하지 않습니다")
+    
+    async def result_stream():
+        if native:
+            results = batch.run_native_batch(client, prompts)
+        else:
+            results = batch.run_batch(client, prompts, batch_concurrency(client, concurrency))
+        try:
+            async for result in results:
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+# PPT 렌더링 프로세스 풀 (처음 사용할 때 생성)
+deck_pool = None
+
+def get_deck_pool():
+    """python-pptx가 없으면 None (create_ppt는 import가 무거워 처음 사용할 때 불러온다)"""
+    global deck_pool
+    if deck_pool is None:
+        import create_ppt
+        if create_ppt.Presentation is None:
+            return None
+        deck_pool = create_ppt.DeckPool(config.get('ppt.workers', 2), config.get('ppt.template', ''))
+    return deck_pool
+
+def attachment(filename: str) -> str:
+    """Content-Disposition (한글 파일 이름은 filename*로)"""
+    root, ext = os.path.splitext(filename)
+    fallback = (root.encode('ascii', 'ignore').decode().replace('"', '').strip() or "deck") + ext
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+PPTX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+@router.post("/api/ppt")
+async def api_ppt(request: Request):
+    """슬라이드 내용(JSON)으로 PPT 생성
+
+    덱 1개({"name", "slides"})면 .pptx를, {"decks": [...]}면 렌더링이 끝나는 순서대로
+    zip으로 스트리밍한다. 임시 파일은 만들지 않는다.
+    """
+    pool = get_deck_pool()
+    if pool is None:
+        raise HTTPException(status_code=503, detail="python-pptx가 필요합니다 (pip install python-pptx)")
+    import create_ppt
+    
+    try:
+        body = await request.json()
+        max_slides = config.get('ppt.max_slides', 50)
+        if isinstance(body, dict) and 'decks' in body:
+            decks = body['decks']
+            if not isinstance(decks, list) or not decks:
+                raise ValueError("decks 목록이 필요합니다")
+            if len(decks) > config.get('ppt.max_decks', 100):
+                raise ValueError(f"덱은 한 번에 최대 {config.get('ppt.max_decks', 100)}개입니다")
+            for deck in decks:
+                create_ppt.validate_deck(deck, max_slides)
+        else:
+            decks = None
+            create_ppt.validate_deck(body, max_slides)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if decks is not None:
+        return StreamingResponse(create_ppt.zip_decks(pool, decks), media_type="application/zip",
+                                 headers={"Content-Disposition": attachment("decks.zip")})
+    try:
+        data = await pool.render(body)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PPT 생성 실패: {e}")
+    return Response(data, media_type=PPTX_MEDIA_TYPE,
+                    headers={"Content-Disposition": attachment(create_ppt.deck_filename(body))})
+
+@router.get("/api/history/{session_id}")
+async def get_history(request: Request, session_id: str = "default",
+                      before: Optional[int] = Query(None, description="이 id보다 앞의 메시지 (이전 페이지)"),
+                      since: Optional[int] = Query(None, description="이 id 다음의 메시지 (새 메시지만)"),
+                      limit: int = Query(50, ge=1, le=200)):
+    """대화 기록 조회 (커서 페이지네이션)
+
+    next_before로 더 오래된 페이지를, next_since로 새 메시지를 이어서 받는다.
+    ETag는 저장소 epoch와 세션 version이라 바뀐 것이 없으면 304를 반환한다
+    (메모리 저장소가 재시작해 version이 다시 0부터 세어져도 이전 ETag와 겹치지 않는다).
+    """
+    # version을 먼저 읽어야 ETag가 본문보다 새것이 되지 않는다
+    etag = f'W/"{session_store.epoch}-{await run_in_threadpool(session_store.version, session_id)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    page = await run_in_threadpool(history_page, session_id, before, since, limit)
+    return JSONResponse(page, headers=headers)
+
+def history_page(session_id: str, before: Optional[int] = None, since: Optional[int] = None,
+                 limit: int = 50) -> dict:
+    """대화 기록 한 페이지 + 다음 커서 (HTTP/WebSocket 공용, 저장소를 읽으므로 스레드 풀에서 호출)"""
+    messages, has_more = session_store.page(session_id, before, since, limit)
+    next_before = next_since = None
+    if since is not None:
+        next_since = messages[-1]["id"] if messages else since
+    else:
+        if has_more:
+            next_before = messages[0]["id"]
+        if before is None:
+            next_since = messages[-1]["id"] if messages else 0
+    return {
+        "session_id": session_id,
+        "messages": messages,
+        "has_more": has_more,
+        "next_before": next_before,
+        "next_since": next_since
+    }
+
+WS_CONNECTIONS = metrics.registry.gauge("shimplex_websocket_connections", "열려 있는 채팅 WebSocket 수")
+CANCELLED = metrics.registry.counter("shimplex_cancelled_generations_total", "클라이언트가 취소한 응답 생성 수")
+
+@router.websocket("/ws/chat")
+async def ws_chat(websocket: WebSocket, session_id: str = "default"):
+    """채팅 WebSocket (브라우저 세션당 연결 하나)
 
-@app.get("/api/history/{session_id}")
-async def get_history(session_id: str = "default"):
-    """대화 기록 조회"""
-    return chat_histories.get(session_id, [])
+    클라이언트 → 서버 (JSON 텍스트 프레임):
+      {"type": "send", "id", "message"}, {"type": "cancel", "id"},
+      {"type": "history", "id", "before"?, "since"?, "limit"?}, {"type": "ping"}
+    서버 → 클라이언트: token / done / error / cancelled / history / pong (요청 id 포함)
 
-@app.delete("/api/history/{session_id}")
+    요청마다 태스크를 따로 띄우므로 생성 중에도 취소나 기록 조회를 보낼 수 있다.
+    취소하거나 연결이 끊기면 업스트림 호출도 취소된다 (같은 요청에 합류한 다른 구독자가 없을 때).
+    """
+    await websocket.accept()
+    WS_CONNECTIONS.inc()
+    send_lock = asyncio.Lock()
+    generations: Dict[str, asyncio.Task] = {}
+
+    async def send(frame: dict):
+        # 여러 생성 태스크가 한 연결에 번갈아 쓰므로 프레임 단위로 직렬화
+        async with send_lock:
+            await websocket.send_text(json.dumps(frame, ensure_ascii=False))
+
+    async def generate(request_id: str, message: str):
+        history, summary = await load_history(session_id)
+        chunks = []
+        failed = False
+        stream = get_llm_client().chat_stream(message, history, session_id, summary)
+        try:
+            async for token in stream:
+                chunks.append(token)
+                await send({"type": "token", "id": request_id, "token": token})
+            await send({"type": "done", "id": request_id, "response": "".join(chunks),
+                        "timestamp": datetime.now().isoformat()})
+        except (QueueFullError, QueueTimeoutError, QuotaExceededError, LLMError) as e:
+            failed = True
+            await send({"type": "error", "id": request_id, "error": str(e)})
+        except Exception as e:
+            # 연결이 끊겨 보내지 못한 경우 - 받은 데까지만 저장하고 끝낸다 (정리는 수신 루프가 한다)
+            print(f"⚠️ WebSocket 응답 중단 ({request_id}): {e}")
+        finally:
+            # 전송 중 취소돼도 업스트림 스트림을 바로 닫아 호출을 끊는다
+            await stream.aclose()
+            generations.pop(request_id, None)
+            # HTTP 스트리밍과 같이 완료 또는 취소 시점까지 받은 응답을 저장 (실패한 응답은 제외)
+            if chunks and not failed:
+                await save_turn(session_id, message, "".join(chunks))
+
+    async def cancel(request_id: str) -> bool:
+        task = generations.get(request_id)
+        if task is None:
+            return False
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        CANCELLED.inc()
+        return True
+
+    try:
+        while True:
+            try:
+                frame = json.loads(await websocket.receive_text())
+                kind = frame.get("type")
+                request_id = str(frame.get("id", ""))
+            except (ValueError, AttributeError):
+                await send({"type": "error", "id": None, "error": "잘못된 프레임"})
+                continue
+
+            if kind == "send":
+                message = frame.get("message")
+                if not isinstance(message, str) or not message.strip():
+                    await send({"type": "error", "id": request_id, "error": "message가 필요합니다"})
+                elif request_id in generations:
+                    await send({"type": "error", "id": request_id, "error": "이미 진행 중인 id입니다"})
+                else:
+                    generations[request_id] = asyncio.create_task(generate(request_id, message))
+            elif kind == "cancel":
+                if await cancel(request_id):
+                    await send({"type": "cancelled", "id": request_id})
+            elif kind == "history":
+                try:
+                    limit = min(max(int(frame.get("limit", 50)), 1), 200)
+                    before = frame.get("before")
+                    since = frame.get("since")
+                    before = None if before is None else int(before)
+                    since = None if since is None else int(since)
+                    page = await run_in_threadpool(history_page, session_id, before, since, limit)
+                except (TypeError, ValueError):
+                    await send({"type": "error", "id": request_id, "error": "잘못된 history 요청"})
+                    continue
+                await send({"type": "history", "id": request_id, **page})
+            elif kind == "ping":
+                await send({"type": "pong", "id": request_id})
+            else:
+                await send({"type": "error", "id": request_id, "error": f"알 수 없는 type: {kind}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        WS_CONNECTIONS.inc(-1)
+        # 연결이 끊기면 진행 중인 생성도 모두 취소
+        for request_id in list(generations):
+            await cancel(request_id)
+
+@router.delete("/api/history/{session_id}")
 async def clear_history(session_id: str = "default"):
     """대화 기록 삭제"""
-    if session_id in chat_histories:
-        chat_histories[session_id] = []
+    await run_in_threadpool(session_store.clear, session_id)
     return {"status": "ok"}
 
-@app.get("/api/health")
+@router.get("/api/usage")
+async def get_usage(session_id: Optional[str] = None, provider: Optional[str] = None,
+                    model: Optional[str] = None, days: int = Query(1, ge=1, le=366),
+                    group_by: str = "session_id,provider,model"):
+    """토큰 사용량 조회 (최근 days일, UTC 기준)
+
+    group_by: day/session_id/provider/model 중 쉼표로 구분 (빈 값이면 전체 합계만)
+    session_id를 주면 그 세션의 할당량 상태도 함께 반환한다.
+    """
+    if usage_meter is None:
+        raise HTTPException(status_code=404, detail="사용량 집계가 꺼져 있습니다 (usage.enabled)")
+    keys = tuple(key.strip() for key in group_by.split(",") if key.strip())
+    unknown = [key for key in keys if key not in GROUP_KEYS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"알 수 없는 group_by: {', '.join(unknown)}")
+    since = time.strftime("%Y-%m-%d", time.gmtime(time.time() - (days - 1) * 86400))
+    rows = usage_meter.report(since, session_id, provider, model, keys)
+    result = {
+        "since": since,
+        "until": today(),
+        "group_by": list(keys),
+        "rows": rows if keys else [],
+        "total": {field: sum(row[field] for row in rows) for field in USAGE_FIELDS}
+    }
+    if session_id is not None and session_quotas is not None:
+        result["quota"] = session_quotas.status(session_id)
+    return result
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 메트릭 (세션 수 게이지가 저장소를 읽으므로 스레드 풀에서 만든다)"""
+    return PlainTextResponse(await run_in_threadpool(metrics.registry.render), media_type="text/plain; version=0.0.4")
+
+@router.get("/api/ready")
+async def readiness_check():
+    """준비 상태 (로드밸런서/오케스트레이터용) - 연결 풀 준비 전에는 503
+
+    /api/health는 프로세스가 살아 있는지만 본다.
+    """
+    if not readiness["ready"]:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready", "warmup": readiness["warmup"]}
+
+@router.get("/api/health")
 async def health_check():
     """상태 확인"""
     return {
         "status": "ok",
         "llm_provider": config.get('llm.provider'),
         "llm_configured": bool(config.get('llm.api_key')),
+        "cache": response_cache.stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else {"enabled": False},
+        "queue": provider_limiters.stats(),
+        "circuits": circuit_breakers.stats(),
+        "coalesce": {"chat": chat_flights.stats(), "stream": stream_flights.stats()},
+        "summary": compactor.stats(),
+        "ollama": ollama_pool.stats(),
+        "usage": usage_meter.stats() if usage_meter is not None else {"enabled": False},
+        "quota": session_quotas.stats() if session_quotas is not None else {"enabled": False},
+        "ppt": deck_pool.stats() if deck_pool is not None else {"started": False},
+        "config_version": config.version,
+        "worker": os.getpid(),
         "version": "1.1.0"
     }
 
+def create_app() -> FastAPI:
+    """앱 생성 (uvicorn app:create_app --factory)
+
+    설정 읽기와 저장소 열기는 여기서 하고, LLM 클라이언트와 메인 페이지는 처음 사용할 때 만든다.
+    연결 풀 준비는 서버가 요청을 받기 시작한 뒤 백그라운드로 진행되며 /api/ready로 확인한다.
+    """
+    global static_assets, _index_page
+    init_services()
+    static_assets = StaticAssets("static")
+    _index_page = None
+    application = FastAPI(title="Shimplex Lite", version="1.1.0", lifespan=lifespan)
+    application.middleware("http")(record_request_metrics)
+    application.include_router(router)
+    return application
+
+def __getattr__(name: str):
+    """uvicorn app:app 호환 - app에 처음 접근할 때 생성"""
+    global app
+    if name == "app":
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
+    import sys
+    
+    # 일괄 처리: python app.py batch prompts.jsonl [--concurrency N] [--native]
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        init_services()
+        
+        async def run_batch_cli():
+            try:
+                client = get_llm_client()
+                return await batch.cli(sys.argv[2:], client, lambda n: batch_concurrency(client, n))
+            finally:
+                # 서버 종료와 마찬가지로 남은 사용량을 기록하고 저장소를 닫는다
+                await http_pools.aclose()
+                if usage_meter is not None:
+                    await usage_meter.aclose()
+                response_cache.close()
+                if semantic_cache is not None:
+                    semantic_cache.close()
+        sys.exit(asyncio.run(run_batch_cli()))
+    
+    import argparse
     import uvicorn
     
+    parser = argparse.ArgumentParser(description="Shimplex Lite")
+    parser.add_argument("--host", default=None, help="바인딩 주소 (기본: app.host)")
+    parser.add_argument("--port", type=int, default=None, help="포트 (기본: app.port)")
+    parser.add_argument("--workers", type=int, default=None, help="워커 프로세스 수 (기본: app.workers 또는 1)")
+    args = parser.parse_args()
+    
     # 설정 확인
+    config = Config()
     if not os.path.exists(CONFIG_FILE):
         config.save()
         print(f"✅ 기본 설정 생성: {CONFIG_FILE}")
     
-    host = config.get('app.host', '0.0.0.0')
-    port = config.get('app.port', 8080)
+    host = args.host or config.get('app.host', '0.0.0.0')
+    port = args.port or config.get('app.port', 8080)
+    workers = args.workers or config.get('app.workers', 1)
+    
+    # 여러 워커는 세션을 SQLite로 공유하고, 설정 변경은 각 워커가 config.json을 감시해 반영한다
+    if workers > 1 and config.get('session.backend', 'sqlite') == 'memory':
+        print("❌ 여러 워커를 쓰려면 session.backend가 sqlite여야 합니다.")
+        sys.exit(1)
     
     print(f"""
 🚀 Shimplex Lite 시작!
 🔗 http://{host}:{port}
 
 ⚙️ 설정 파일: {CONFIG_FILE}
+👷 워커: {workers}
 
 💡 처음 사용하시나요?
    1. 브라우저에서 http://localhost:{port} 접속
@@ -350,4 +1525,9 @@ if __name__ == "__main__":
    - Custom (OpenAI 호환 API)
 """)
     
-    uvicorn.run(app, host=host, port=port)
+    if workers > 1:
+        # 워커마다 app 모듈을 새로 import 해서 앱을 만들도록 팩토리 경로로 전달
+        uvicorn.run("app:create_app", factory=True, host=host, port=port, workers=workers,
+                    app_dir=os.path.dirname(os.path.abspath(__file__)))
+    else:
+        uvicorn.run(create_app(), host=host, port=port)
@@ -0,0 +1,211 @@
+# Shimplex - 대량 프롬프트 일괄 처리
+# JSONL/배열 입력 -> 제한된 동시성으로 LLMClient 호출 -> 완료 순서대로 결과 반환
+# OpenAI/Anthropic 네이티브 Batch API(저렴한 대량 처리)도 선택적으로 사용
+
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Union
+
+from providers import ANTHROPIC_API_BASE, OPENAI_API_BASE
+
+# 배치 요청은 한 세션으로 묶어 대화형 세션과 공정하게 대기열을 나눈다
+BATCH_SESSION_ID = "batch"
+
+
+def parse_prompts(items: Iterable[Union[str, dict]]) -> List[Dict]:
+    """입력을 [{"id", "message"}] 형태로 정규화
+
+    각 항목은 문자열 또는 {"id": ..., "message": ...} 객체.
+    JSONL 줄(문자열로 된 JSON)도 그대로 받는다.
+    """
+    if isinstance(items, (str, bytes, dict)):
+        # 문자열을 그대로 돌면 글자마다 프롬프트가 된다
+        raise ValueError("prompts는 목록이어야 합니다")
+    prompts = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            line = item.strip()
+            if not line:
+                continue
+            if line[0] in '{"':
+                item = json.loads(line)
+            else:
+                item = line
+        if isinstance(item, str):
+            item = {"message": item}
+        if not isinstance(item, dict) or not item.get("message"):
+            raise ValueError(f"{index + 1}번째 항목에 message가 없습니다")
+        if not isinstance(item["message"], str):
+            raise ValueError(f"{index + 1}번째 항목의 message는 문자열이어야 합니다")
+        prompts.append({"id": str(item.get("id", len(prompts))), "message": item["message"]})
+    return prompts
+
+
+async def run_batch(client, prompts: List[Dict], concurrency: int = 8) -> AsyncIterator[Dict]:
+    """워커 concurrency개로 병렬 처리하고 끝나는 순서대로 결과를 낸다"""
+    pending: asyncio.Queue = asyncio.Queue()
+    for prompt in prompts:
+        pending.put_nowait(prompt)
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                prompt = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                response = await client.chat(prompt["message"], None, BATCH_SESSION_ID)
+                await results.put({"id": prompt["id"], "response": response})
+            except Exception as e:
+                await results.put({"id": prompt["id"], "error": str(e)})
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(prompts))))]
+    try:
+        for _ in range(len(prompts)):
+            yield await results.get()
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def run_native_batch(client, prompts: List[Dict], api_base: str = None,
+                           poll_interval: float = 30.0) -> AsyncIterator[Dict]:
+    """프로바이더 네이티브 Batch API로 처리 (openai/anthropic)"""
+    if client.provider == 'openai':
+        runner = _openai_native_batch(client, prompts, api_base or OPENAI_API_BASE, poll_interval)
+    elif client.provider == 'anthropic':
+        runner = _anthropic_native_batch(client, prompts, api_base or ANTHROPIC_API_BASE, poll_interval)
+    else:
+        raise ValueError(f"{client.provider}는 네이티브 배치를 지원하지 않습니다")
+    async for result in runner:
+        yield result
+
+
+async def _openai_native_batch(client, prompts: List[Dict], api_base: str,
+                               poll_interval: float) -> AsyncIterator[Dict]:
+    headers = {"Authorization": f"Bearer {client.api_key}"}
+    lines = []
+    for prompt in prompts:
+        _, _, data, _ = client.build_request(prompt["message"])
+        lines.append(json.dumps({
+            "custom_id": prompt["id"],
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": data
+        }, ensure_ascii=False))
+    http = client.http
+
+    # 1) 입력 파일 업로드 2) 배치 생성 3) 완료까지 폴링 4) 결과 파일 다운로드
+    response = await http.post(
+        f"{api_base}/v1/files",
+        headers=headers,
+        data={"purpose": "batch"},
+        files={"file": ("batch.jsonl", "\n".join(lines).encode("utf-8"), "application/jsonl")}
+    )
+    response.raise_for_status()
+    file_id = response.json()["id"]
+
+    response = await http.post(
+        f"{api_base}/v1/batches",
+        headers=headers,
+        json={"input_file_id": file_id, "endpoint": "/v1/chat/completions", "completion_window": "24h"}
+    )
+    response.raise_for_status()
+    batch = response.json()
+
+    while batch["status"] not in ("completed", "failed", "expired", "cancelled"):
+        await asyncio.sleep(poll_interval)
+        response = await http.get(f"{api_base}/v1/batches/{batch['id']}", headers=headers)
+        response.raise_for_status()
+        batch = response.json()
+    if batch["status"] != "completed" or not batch.get("output_file_id"):
+        raise RuntimeError(f"OpenAI 배치 실패: {batch['status']}")
+
+    response = await http.get(f"{api_base}/v1/files/{batch['output_file_id']}/content", headers=headers)
+    response.raise_for_status()
+    for line in response.text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        body = (item.get("response") or {}).get("body") or {}
+        if item.get("error") or "choices" not in body:
+            yield {"id": item["custom_id"], "error": json.dumps(item.get("error") or body, ensure_ascii=False)}
+        else:
+            text, usage = client.adapter.parse(body)
+            client._record_usage(usage, BATCH_SESSION_ID)
+            yield {"id": item["custom_id"], "response": text}
+
+
+async def _anthropic_native_batch(client, prompts: List[Dict], api_base: str,
+                                  poll_interval: float) -> AsyncIterator[Dict]:
+    headers = client.adapter.headers(client)
+    requests = []
+    for prompt in prompts:
+        _, _, data, _ = client.build_request(prompt["message"])
+        requests.append({"custom_id": prompt["id"], "params": data})
+    http = client.http
+
+    response = await http.post(f"{api_base}/v1/messages/batches", headers=headers, json={"requests": requests})
+    response.raise_for_status()
+    batch = response.json()
+
+    while batch["processing_status"] != "ended":
+        await asyncio.sleep(poll_interval)
+        response = await http.get(f"{api_base}/v1/messages/batches/{batch['id']}", headers=headers)
+        response.raise_for_status()
+        batch = response.json()
+
+    results_url = batch.get("results_url") or f"{api_base}/v1/messages/batches/{batch['id']}/results"
+    async with http.stream("GET", results_url, headers=headers) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            result = item.get("result") or {}
+            if result.get("type") == "succeeded":
+                text, usage = client.adapter.parse(result["message"])
+                client._record_usage(usage, BATCH_SESSION_ID)
+                yield {"id": item["custom_id"], "response": text}
+            else:
+                yield {"id": item["custom_id"], "error": json.dumps(result, ensure_ascii=False)}
+
+
+async def cli(argv: List[str], client, limit_concurrency: Callable[[int], int] = lambda n: n) -> int:
+    """python app.py batch prompts.jsonl [--concurrency N] [--native] [--output FILE]"""
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(prog="python app.py batch", description="Shimplex 일괄 처리")
+    parser.add_argument("input", help="프롬프트 JSONL 파일 (- 는 표준 입력)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수 (기본 8)")
+    parser.add_argument("--native", action="store_true", help="OpenAI/Anthropic 네이티브 Batch API 사용")
+    parser.add_argument("--api-base", default=None, help="네이티브 배치 API 주소 (테스트용)")
+    parser.add_argument("--poll-interval", type=float, default=30.0, help="네이티브 배치 상태 확인 간격(초)")
+    parser.add_argument("--output", default="-", help="결과 NDJSON 파일 (기본 표준 출력)")
+    args = parser.parse_args(argv)
+
+    if args.input == "-":
+        prompts = parse_prompts(sys.stdin)
+    else:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            prompts = parse_prompts(f)
+
+    if args.native:
+        results = run_native_batch(client, prompts, args.api_base, args.poll_interval)
+    else:
+        results = run_batch(client, prompts, limit_concurrency(args.concurrency))
+
+    out = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    failed = 0
+    try:
+        async for result in results:
+            failed += "error" in result
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"✅ {len(prompts) - failed}/{len(prompts)}건 완료", file=sys.stderr)
+    return 1 if failed else 0
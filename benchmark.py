@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Shimplex 부하 테스트/벤치마크 (가짜 LLM 서버 사용)
+실행: python benchmark.py --mode chat --concurrency 64 --duration 10
+      python benchmark.py --mode stream --token-rate 200 --latency 0.05
+      python benchmark.py --workers 1,2,4            # 워커 수별 확장 효율
+      python benchmark.py --max-p95 0.5 --min-rps 100 # 기준 미달 시 종료 코드 1
+      python benchmark.py --mode startup --runs 5     # 시작 시간 + import 시간 분석
+      python benchmark.py --mode ppt --workers 1,2,4  # PPT 생성 처리량 (덱/초)
+
+지연 p50/p95/p99, RPS, 첫 토큰까지 시간(stream), 메모리 증가량,
+업스트림 연결 수를 출력한다.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0, interval: float = 0.2):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(interval)
+    raise RuntimeError(f"서버가 시작되지 않았습니다: {url}")
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """프로세스와 자식 프로세스(워커)의 RSS 합계 (Linux /proc 기반)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+        children = []
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children += [int(c) for c in f.read().split()]
+    except (OSError, StopIteration):
+        return None
+    return rss + sum(rss_bytes(child) or 0 for child in children)
+
+
+def start_mock(port: int, args) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "mock_llm.py"), "--port", str(port),
+         "--latency", str(args.latency), "--token-rate", str(args.token_rate),
+         "--error-rate", str(args.error_rate)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_ready(f"http://127.0.0.1:{port}/_stats")
+    return proc
+
+
+def write_config(port: int, mock_port: int, workdir: str, args) -> str:
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    config_file = os.path.join(workdir, f"config-{port}.json")
+    with open(config_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "llm": {"provider": args.provider, "api_key": "bench", "base_url": mock_url, "model": "mock"},
+            "app": {"host": "127.0.0.1", "port": port},
+            "session": {"backend": "sqlite", "path": os.path.join(workdir, f"sessions-{port}.db")},
+            "cache": {"disk_path": os.path.join(workdir, f"cache-{port}.db")},
+            "usage": {"path": os.path.join(workdir, f"usage-{port}.db")},
+            "semantic_cache": {"path": os.path.join(workdir, f"semantic_cache-{port}")},
+            "limits": {"max_concurrency": args.upstream_concurrency, "max_queue": 4096},
+            "resilience": {"max_retries": args.retries}
+        }, f)
+    return config_file
+
+
+def start_app(port: int, workers: int, mock_port: int, workdir: str, args) -> subprocess.Popen:
+    env = dict(os.environ, SHIMPLEX_CONFIG=write_config(port, mock_port, workdir, args))
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "app.py"), "--workers", str(workers)],
+        cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_ready(f"http://127.0.0.1:{port}/api/health")
+    return proc
+
+
+async def drive(base_url: str, args) -> dict:
+    """concurrency개의 가상 사용자가 duration초 동안 요청"""
+    latencies: List[float] = []
+    ttfts: List[float] = []
+    errors = 0
+    deadline = time.monotonic() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        async def chat(index: int, turn: int):
+            response = await client.post("/api/chat", json={
+                "message": f"질문 {turn}", "session_id": f"bench-{index}"
+            })
+            response.raise_for_status()
+
+        async def stream(index: int, turn: int, start: float):
+            payload = {"message": f"질문 {turn}", "session_id": f"bench-{index}"}
+            async with client.stream("POST", "/api/chat/stream", json=payload) as response:
+                response.raise_for_status()
+                first = True
+                async for line in response.aiter_lines():
+                    if line.startswith("event: error"):
+                        raise httpx.HTTPError("stream error")
+                    if first and line.startswith("data:"):
+                        ttfts.append(time.perf_counter() - start)
+                        first = False
+
+        async def run_batch(index: int, turn: int):
+            prompts = [{"id": f"{index}-{turn}-{i}", "message": f"질문 {i}"} for i in range(args.batch_size)]
+            response = await client.post("/api/chat/batch", json=prompts)
+            response.raise_for_status()
+            if any("error" in json.loads(line) for line in response.text.splitlines()):
+                raise httpx.HTTPError("batch item error")
+
+        async def user(index: int):
+            nonlocal errors
+            turn = 0
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    if args.mode == "stream":
+                        await stream(index, turn, start)
+                    elif args.mode == "batch":
+                        await run_batch(index, turn)
+                    else:
+                        await chat(index, turn)
+                    latencies.append(time.perf_counter() - start)
+                except httpx.HTTPError:
+                    errors += 1
+                turn += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "ttft_p50": percentile(ttfts, 50),
+        "ttft_p95": percentile(ttfts, 95)
+    }
+
+
+def run_one(workers: int, mock_port: int, workdir: str, args) -> dict:
+    port = free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    proc = start_app(port, workers, mock_port, workdir, args)
+    try:
+        # 워밍업 후 기준 메모리 측정
+        httpx.post(f"http://127.0.0.1:{port}/api/chat", json={"message": "warmup", "session_id": "warmup"},
+                   timeout=60.0)
+        httpx.post(f"{mock_url}/_reset")
+        rss_before = rss_bytes(proc.pid)
+        result = asyncio.run(drive(f"http://127.0.0.1:{port}", args))
+        rss_after = rss_bytes(proc.pid)
+        upstream = httpx.get(f"{mock_url}/_stats").json()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    result.update(
+        workers=workers,
+        rss_mb=(rss_after or 0) / 1048576,
+        rss_growth_mb=((rss_after or 0) - (rss_before or 0)) / 1048576,
+        upstream_requests=upstream["requests"],
+        upstream_errors=upstream["errors"],
+        upstream_connections=upstream["connections"]
+    )
+    return result
+
+
+def measure_startup(workers: int, mock_port: int, workdir: str, args) -> dict:
+    """프로세스 시작부터 /api/health(살아 있음), /api/ready(연결 풀 준비)까지 걸린 시간"""
+    lives, readies = [], []
+    for _ in range(args.runs):
+        port = free_port()
+        env = dict(os.environ, SHIMPLEX_CONFIG=write_config(port, mock_port, workdir, args))
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "app.py"), "--workers", str(workers)],
+            cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_ready(f"http://127.0.0.1:{port}/api/health", interval=0.01)
+            lives.append(time.perf_counter() - start)
+            wait_ready(f"http://127.0.0.1:{port}/api/ready", interval=0.01)
+            readies.append(time.perf_counter() - start)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    return {"workers": workers, "live": percentile(lives, 50), "ready": percentile(readies, 50)}
+
+
+def import_profile() -> List[tuple]:
+    """python -X importtime 결과를 최상위 패키지별 import 시간(초)으로 합산"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                          cwd=HERE, capture_output=True, text=True)
+    totals = {}
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].split(":")[1])
+        except ValueError:
+            continue  # 머리글 줄
+        package = parts[2].strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us / 1e6
+    return sorted(totals.items(), key=lambda item: -item[1])
+
+
+def measure_ppt(args) -> List[dict]:
+    """소개 자료 덱 args.decks개 생성 처리량
+
+    cold: 덱마다 템플릿 파싱과 스타일 준비부터 (예전 create_ppt.py 방식)
+    cached: 한 프로세스에서 템플릿/스타일을 재사용
+    pool: 프로세스 풀 (--workers 값별)
+    """
+    import create_ppt
+
+    if create_ppt.Presentation is None:
+        sys.exit("❌ python-pptx가 필요합니다 (pip install python-pptx)")
+    deck = create_ppt.INTRO_DECK
+    results = []
+
+    def record(mode: str, workers: int, decks: int, seconds: float, sizes: List[int]):
+        results.append({"mode": mode, "workers": workers, "decks": decks, "seconds": seconds,
+                        "decks_per_sec": decks / seconds, "kb": sum(sizes) / len(sizes) / 1024})
+
+    cold = max(1, min(args.decks, 50))
+    start = time.perf_counter()
+    sizes = [len(create_ppt.DeckRenderer().render(deck)) for _ in range(cold)]
+    record("cold", 1, cold, time.perf_counter() - start, sizes)
+
+    renderer = create_ppt.get_renderer()
+    start = time.perf_counter()
+    sizes = [len(renderer.render(deck)) for _ in range(args.decks)]
+    record("cached", 1, args.decks, time.perf_counter() - start, sizes)
+
+    async def run_pool(workers: int):
+        pool = create_ppt.DeckPool(workers)
+        try:
+            # 프로세스 시작과 템플릿 준비는 측정에서 뺀다
+            async for _ in pool.render_many([deck] * workers * 2):
+                pass
+            start = time.perf_counter()
+            sizes = [len(data) async for _, data, _ in pool.render_many([deck] * args.decks)]
+            record("pool", workers, args.decks, time.perf_counter() - start, sizes)
+        finally:
+            pool.shutdown()
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        asyncio.run(run_pool(workers))
+    return results
+
+
+def report_ppt(results: List[dict]):
+    print(f"PPT 생성 처리량, CPU 코어: {os.cpu_count()}")
+    print(f"{'mode':>7} {'workers':>7} {'decks':>6} {'seconds':>8} {'decks/s':>8} {'KB':>6} {'배율':>6}")
+    base = results[0]["decks_per_sec"]
+    for r in results:
+        print(f"{r['mode']:>7} {r['workers']:>7} {r['decks']:>6} {r['seconds']:>7.2f}s "
+              f"{r['decks_per_sec']:>8.1f} {r['kb']:>6.1f} {r['decks_per_sec'] / base:>5.1f}x")
+
+
+def report_startup(results: List[dict], profile: List[tuple], args):
+    print(f"시작 시간 (중앙값, {args.runs}회), CPU 코어: {os.cpu_count()}")
+    print(f"{'workers':>7} {'live':>8} {'ready':>8}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['live']:>7.2f}s {r['ready']:>7.2f}s")
+    total = sum(seconds for _, seconds in profile)
+    print(f"\nimport app: {total:.3f}s (패키지별 상위 10)")
+    for package, seconds in profile[:10]:
+        print(f"  {package:<24} {seconds * 1000:>7.1f}ms {seconds / total:>5.0%}")
+
+
+def report(results: List[dict], args):
+    print(f"모드: {args.mode}, 프로바이더: {args.provider}, CPU 코어: {os.cpu_count()}, "
+          f"동시 사용자: {args.concurrency}, 측정 시간: {args.duration}초")
+    print(f"가짜 LLM: 지연 {args.latency}초, 초당 토큰 {args.token_rate or '즉시'}, 오류율 {args.error_rate}")
+    header = (f"{'workers':>7} {'reqs':>6} {'errs':>5} {'rps':>8} {'p50':>7} {'p95':>7} {'p99':>7} "
+              f"{'ttft50':>7} {'ttft95':>7} {'rss MB':>7} {'+MB':>6} {'up.req':>7} {'up.conn':>7} {'효율':>5}")
+    print(header)
+    base = results[0]["rps"] / results[0]["workers"] if results and results[0]["rps"] else 0
+    for r in results:
+        efficiency = r["rps"] / (base * r["workers"]) if base else 0
+        print(f"{r['workers']:>7} {r['requests']:>6} {r['errors']:>5} {r['rps']:>8.1f} "
+              f"{r['p50'] * 1000:>6.0f}ms {r['p95'] * 1000:>6.0f}ms {r['p99'] * 1000:>6.0f}ms "
+              f"{r['ttft_p50'] * 1000:>6.0f}ms {r['ttft_p95'] * 1000:>6.0f}ms "
+              f"{r['rss_mb']:>7.1f} {r['rss_growth_mb']:>6.1f} {r['upstream_requests']:>7} "
+              f"{r['upstream_connections']:>7} {efficiency:>5.0%}")
+
+
+def check(results: List[dict], args) -> bool:
+    """회귀 기준 확인"""
+    ok = True
+    for r in results:
+        if "decks_per_sec" in r:
+            if args.min_rps is not None and r["mode"] == "pool" and r["decks_per_sec"] < args.min_rps:
+                print(f"❌ workers={r['workers']}: {r['decks_per_sec']:.1f} 덱/초 < {args.min_rps}")
+                ok = False
+            continue
+        if "ready" in r:
+            if args.max_ready is not None and r["ready"] > args.max_ready:
+                print(f"❌ workers={r['workers']}: 준비 시간 {r['ready']:.2f}s > {args.max_ready}s")
+                ok = False
+            continue
+        if args.max_p95 is not None and r["p95"] > args.max_p95:
+            print(f"❌ workers={r['workers']}: p95 {r['p95']:.3f}s > {args.max_p95}s")
+            ok = False
+        if args.min_rps is not None and r["rps"] < args.min_rps:
+            print(f"❌ workers={r['workers']}: rps {r['rps']:.1f} < {args.min_rps}")
+            ok = False
+        if args.max_error_rate is not None and r["requests"] + r["errors"]:
+            rate = r["errors"] / (r["requests"] + r["errors"])
+            if rate > args.max_error_rate:
+                print(f"❌ workers={r['workers']}: 오류율 {rate:.2%} > {args.max_error_rate:.2%}")
+                ok = False
+        if args.max_rss_growth is not None and r["rss_growth_mb"] > args.max_rss_growth:
+            print(f"❌ workers={r['workers']}: 메모리 증가 {r['rss_growth_mb']:.1f}MB > {args.max_rss_growth}MB")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shimplex 부하 테스트")
+    parser.add_argument("--mode", choices=("chat", "stream", "batch", "startup", "ppt"), default="chat",
+                        help="측정할 API (startup: 시작/준비 시간과 import 시간, ppt: PPT 생성 처리량)")
+    parser.add_argument("--provider", choices=("custom", "ollama"), default="custom",
+                        help="가짜 서버에 연결할 프로바이더 형식")
+    parser.add_argument("--workers", default="1", help="워커 수 목록 (쉼표 구분)")
+    parser.add_argument("--concurrency", type=int, default=64, help="동시 가상 사용자 수")
+    parser.add_argument("--duration", type=float, default=10.0, help="워커 수별 측정 시간(초)")
+    parser.add_argument("--batch-size", type=int, default=20, help="batch 모드 요청당 프롬프트 수")
+    parser.add_argument("--runs", type=int, default=3, help="startup 모드 반복 횟수")
+    parser.add_argument("--decks", type=int, default=200, help="ppt 모드 생성할 덱 수")
+    parser.add_argument("--upstream-concurrency", type=int, default=256, help="limits.max_concurrency")
+    parser.add_argument("--retries", type=int, default=0, help="resilience.max_retries")
+    parser.add_argument("--latency", type=float, default=0.0, help="가짜 LLM 첫 토큰 지연(초)")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="가짜 LLM 초당 토큰 수 (0이면 즉시)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="가짜 LLM 오류 응답 비율")
+    parser.add_argument("--max-p95", type=float, default=None, help="허용 p95 지연(초)")
+    parser.add_argument("--min-rps", type=float, default=None, help="최소 RPS (ppt 모드는 풀의 덱/초)")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="허용 오류율 (0~1)")
+    parser.add_argument("--max-rss-growth", type=float, default=None, help="허용 메모리 증가(MB)")
+    parser.add_argument("--max-ready", type=float, default=None, help="startup 모드 허용 준비 시간(초)")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = parser.parse_args()
+
+    if args.mode == "ppt":
+        # 서버 없이 렌더러와 프로세스 풀만 측정
+        results = measure_ppt(args)
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            report_ppt(results)
+        sys.exit(0 if check(results, args) else 1)
+
+    mock_port = free_port()
+    mock = start_mock(mock_port, args)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for workers in [int(w) for w in args.workers.split(",")]:
+                if args.mode == "startup":
+                    results.append(measure_startup(workers, mock_port, workdir, args))
+                else:
+                    results.append(run_one(workers, mock_port, workdir, args))
+    finally:
+        mock.terminate()
+        mock.wait(timeout=10)
+
+    if args.mode == "startup":
+        profile = import_profile()
+        if args.json:
+            print(json.dumps({"startup": results, "imports": dict(profile)}, indent=2))
+        else:
+            report_startup(results, profile, args)
+    elif args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results, args)
+    sys.exit(0 if check(results, args) else 1)
+
+
+if __name__ == "__main__":
+    main()
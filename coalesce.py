@@ -0,0 +1,101 @@
+# Shimplex - 동일 요청 합치기 (single-flight)
+# 같은 프롬프트가 동시에 여러 번 들어오면 업스트림 호출 하나의 결과를 함께 받는다
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class Flight:
+    """진행 중인 업스트림 호출 1건 - 받은 청크를 모아 두고 구독자에게 나눠 준다"""
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self) -> AsyncIterator[str]:
+        """처음부터 지금까지의 청크, 이후 새 청크를 차례로 전달 (늦게 합류해도 전체를 받는다)"""
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class SingleFlight:
+    """키가 같은 동시 요청을 업스트림 호출 하나로 합친다
+
+    호출은 별도 태스크에서 실행되므로 먼저 온 요청의 클라이언트가 끊겨도
+    나머지는 계속 받을 수 있고, 구독자가 모두 떠나면 호출을 취소한다.
+    on_join은 기존 호출에 합류할 때(업스트림 호출 1건 절약)마다 불린다.
+    """
+    def __init__(self, on_join: Optional[Callable[[], None]] = None):
+        self.on_join = on_join
+        self._flights: Dict[str, Flight] = {}
+        self.joined = 0
+
+    async def stream(self, key: Optional[str], factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """factory()의 스트림을 같은 key의 요청들과 공유 (key가 None이면 그대로 실행)"""
+        if key is None:
+            async for chunk in factory():
+                yield chunk
+            return
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, factory))
+        else:
+            self.joined += 1
+            if self.on_join:
+                self.on_join()
+
+        flight.subscribers += 1
+        try:
+            async for chunk in flight.follow():
+                yield chunk
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and not flight.done:
+                flight.task.cancel()
+                # 취소 중인 호출에 새 요청이 합류하지 않도록 바로 뺀다
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    async def call(self, key: Optional[str], factory: Callable[[], Awaitable[str]]) -> str:
+        """factory()의 결과를 같은 key의 요청들과 공유"""
+        async def single() -> AsyncIterator[str]:
+            yield await factory()
+
+        return "".join([chunk async for chunk in self.stream(key, single)])
+
+    async def _run(self, key: str, flight: Flight, factory: Callable[[], AsyncIterator[str]]):
+        try:
+            async for chunk in factory():
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            # 구독자가 모두 떠난 경우라 받을 사람이 없다
+            flight.error = asyncio.CancelledError()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.notify()
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "joined": self.joined}
@@ -0,0 +1,130 @@
+# Shimplex - 토큰 예산 기반 대화 기록 윈도우
+# 모델별 토큰 예산 안에 들어가는 최근 대화만 골라서 프로바이더에 보낸다
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+# 메시지 1개당 역할/구분자 등 부가 토큰
+MESSAGE_OVERHEAD = 4
+
+
+def approx_tokens(text: str) -> int:
+    """빠른 근사 토큰 수
+
+    영문/숫자는 약 4글자당 1토큰, 한글 등 비ASCII 문자는 글자당 약 1토큰.
+    UTF-8 바이트 길이 차이로 비ASCII 글자 수를 추정해 C 수준 연산만 사용한다.
+    """
+    if not text:
+        return 0
+    extra = len(text.encode("utf-8")) - len(text)
+    non_ascii = min(len(text), (extra + 1) // 2)
+    ascii_chars = len(text) - non_ascii
+    return (ascii_chars + 3) // 4 + non_ascii
+
+
+def get_tokenizer(name: str = "approx") -> Callable[[str], int]:
+    """토크나이저 선택 (tiktoken이 없으면 근사치로 대체)"""
+    if name and name != "approx":
+        try:
+            import tiktoken
+            try:
+                encoding = tiktoken.encoding_for_model(name)
+            except KeyError:
+                encoding = tiktoken.get_encoding(name if name in tiktoken.list_encoding_names() else "cl100k_base")
+            return lambda text: len(encoding.encode(text, disallowed_special=()))
+        except ImportError:
+            pass
+    return approx_tokens
+
+
+class TokenCounter:
+    """메시지별 토큰 수 캐시
+
+    키는 내용의 해시(16바이트)라 항목 크기가 일정하므로 max_entries가 곧 메모리 한도다.
+    근사 토크나이저는 해시 계산과 비용이 같아 캐시하지 않는다.
+    """
+    def __init__(self, tokenizer: Callable[[str], int] = approx_tokens, max_entries: int = 50000):
+        self.tokenizer = tokenizer
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._counts: "OrderedDict[bytes, int]" = OrderedDict()
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is approx_tokens or not text:
+            return self.tokenizer(text)
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            tokens = self._counts.get(key)
+            if tokens is not None:
+                self._counts.move_to_end(key)
+                return tokens
+        tokens = self.tokenizer(text)
+        with self._lock:
+            self._counts[key] = tokens
+            if len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return tokens
+
+    def message(self, m: Dict) -> int:
+        """메시지 토큰 수 (세션 저장소가 저장할 때 센 값이 있으면 그대로 쓴다)"""
+        tokens = getattr(m, "tokens", None)
+        if tokens is None:
+            tokens = self.count(m.get("content", ""))
+        return tokens + MESSAGE_OVERHEAD
+
+
+class ContextBuilder:
+    """모델별 토큰 예산에 맞춰 대화 기록을 자르는 빌더
+
+    예산을 넘으면 앞에서부터 trim_chunk개 단위로 잘라, 시작점이 몇 턴 동안 그대로 유지되게 한다.
+    한 메시지씩 밀어내면 턴마다 앞부분이 바뀌어 프로바이더 프롬프트 캐시를 읽지 못한다.
+    """
+    def __init__(self, counter: TokenCounter, max_tokens: int = 8192,
+                 reserve_tokens: int = 1024, budgets: Optional[Dict[str, int]] = None,
+                 trim_chunk: int = 8):
+        self.counter = counter
+        self.max_tokens = max_tokens
+        self.reserve_tokens = reserve_tokens
+        self.budgets = budgets or {}
+        self.trim_chunk = max(1, trim_chunk)
+
+    def budget(self, model: str) -> int:
+        return self.budgets.get(model, self.max_tokens)
+
+    def window(self, model: str, system_prompt: str, message: str,
+               history: List[Dict] = None) -> List[Dict]:
+        """시스템 프롬프트와 새 메시지를 뺀 남은 예산 안에서 최근 기록부터 채운다
+
+        기록의 토큰 수는 저장할 때 센 값을 더하기만 하므로 턴마다 기록 전체를 다시 세지 않는다.
+        """
+        if not history:
+            return []
+        remaining = (self.budget(model) - self.reserve_tokens
+                     - self.counter.count(system_prompt) - self.counter.count(message)
+                     - 2 * MESSAGE_OVERHEAD)
+        start = len(history)
+        for i in range(len(history) - 1, -1, -1):
+            remaining -= self.counter.message(history[i])
+            if remaining < 0:
+                break
+            start = i
+        if start:
+            # trim_chunk의 배수로 올려 잘라낸다 (남는 기록이 없어지면 필요한 만큼만)
+            chunked = -(-start // self.trim_chunk) * self.trim_chunk
+            if chunked < len(history):
+                start = chunked
+        return history[start:]
+
+
+def create_context_builder(settings: Optional[dict] = None) -> ContextBuilder:
+    """설정(config.json의 context)으로 빌더 생성"""
+    settings = settings or {}
+    return ContextBuilder(
+        TokenCounter(get_tokenizer(settings.get("tokenizer", "approx"))),
+        max_tokens=settings.get("max_tokens", 8192),
+        reserve_tokens=settings.get("reserve_tokens", 1024),
+        budgets=settings.get("budgets", {}),
+        trim_chunk=settings.get("trim_chunk", 8)
+    )
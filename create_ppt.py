@@ -1,249 +1,439 @@
 #!/usr/bin/env python3
 """
-Shimplex 소개용 PPT 생성 스크립트
-실행: python create_ppt.py
+Shimplex 소개용 PPT 생성
+실행: python create_ppt.py                          # 기본 소개 자료
+      python create_ppt.py deck.json --output 고객사.pptx
 출력: Shimplex_Introduction.pptx
+
+슬라이드 내용은 데이터(dict)로 받는다. 템플릿 파싱과 문단 스타일 XML은 프로세스마다
+한 번만 만들어 두고 덱마다 복사해 쓰며, 서버의 /api/ppt는 render_deck()을 프로세스 풀에서 실행한다.
 """
 
+import asyncio
+import copy
+import io
+import json
+import multiprocessing
+import re
+import sys
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
 try:
-    from pptx import Presentation
-    from pptx.util import Inches, Pt
-    from pptx.enum.text import PP_ALIGN
+    from pptx import Presentation  # 선택 의존성 (pip install python-pptx)
     from pptx.dml.color import RGBColor
+    from pptx.enum.text import PP_ALIGN
+    from pptx.text.text import _Paragraph
+    from pptx.util import Inches, Pt
 except ImportError:
-    print("❌ python-pptx 라이브러리 필요")
-    print("설치: pip install python-pptx")
-    exit(1)
-
-def create_shimplex_ppt():
-    prs = Presentation()
-    
-    # 색상 정의 (Shimplex 테마: 초록/파랑)
-    PRIMARY_GREEN = RGBColor(76, 175, 80)    # #4CAF50
-    DARK_GREEN = RGBColor(56, 142, 60)       # #388E3C
-    TEXT_DARK = RGBColor(33, 33, 33)         # #212121
-    TEXT_GRAY = RGBColor(97, 97, 97)         # #616161
-    
-    def add_title_slide():
-        """슬라이드 1: 타이틀"""
-        slide = prs.slides.add_slide(prs.slide_layouts[6])  # 빈 슬라이드
-        
-        # 메인 타이틀
-        title_box = slide.shapes.add_textbox(Inches(1), Inches(2.5), Inches(8), Inches(1.5))
-        tf = title_box.text_frame
-        p = tf.paragraphs[0]
-        p.text = "Shimplex"
-        p.font.size = Pt(54)
-        p.font.bold = True
-        p.font.color.rgb = PRIMARY_GREEN
-        p.alignment = PP_ALIGN.CENTER
-        
-        # 서브타이틀
-        subtitle_box = slide.shapes.add_textbox(Inches(1), Inches(4.2), Inches(8), Inches(1))
-        tf = subtitle_box.text_frame
-        p = tf.paragraphs[0]
-        p.text = "개인 AI 클라이언트 / Personal AI Plex"
-        p.font.size = Pt(28)
-        p.font.color.rgb = TEXT_GRAY
-        p.alignment = PP_ALIGN.CENTER
-        
-        # 설명
-        desc_box = slide.shapes.add_textbox(Inches(1), Inches(5.3), Inches(8), Inches(0.8))
-        tf = desc_box.text_frame
-        p = tf.paragraphs[0]
-        p.text = "어디서든 실행되는 경량 AI 채팅 솔루션"
-        p.font.size = Pt(18)
-        p.font.color.rgb = TEXT_GRAY
-        p.alignment = PP_ALIGN.CENTER
-        
-        # 푸터
-        footer = slide.shapes.add_textbox(Inches(1), Inches(6.8), Inches(8), Inches(0.5))
-        tf = footer.text_frame
-        p = tf.paragraphs[0]
-        p.text = "github.com/ryanshim10/shimplex | 2026.02"
-        p.font.size = Pt(12)
-        p.font.color.rgb = TEXT_GRAY
-        p.alignment = PP_ALIGN.CENTER
-        
-        return slide
-    
-    def add_problem_slide():
-        """슬라이드 2: 문제 제기"""
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
-        
-        # 타이틀
-        title = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1))
-        tf = title.text_frame
-        p = tf.paragraphs[0]
-        p.text = "왜 Shimplex인가?"
-        p.font.size = Pt(36)
-        p.font.bold = True
-        p.font.color.rgb = TEXT_DARK
-        
-        # 문제점들
-        problems = [
-            ("🔒 개인정보 유출 우려", "ChatGPT 등 외부 서비스 의존 시 민감 데이터 노출 위험"),
-            ("🔧 복잡한 설정", "Docker, CUDA, 의존성 설치... 진입장벽이 너무 높음"),
-            ("💻 플랫폼 종속", "Windows용, Mac용 따로 설치해야 하는 번거로움"),
-            ("💸 비용 부담", "로컬 AI는 고가 GPU 필요, 클라우드는 월 구독료 발생"),
-        ]
-        
-        y_pos = 1.8
-        for icon_title, desc in problems:
-            # 아이콘+제목
-            box = slide.shapes.add_textbox(Inches(0.8), Inches(y_pos), Inches(8.5), Inches(0.6))
-            tf = box.text_frame
-            p = tf.paragraphs[0]
-            p.text = icon_title
-            p.font.size = Pt(22)
-            p.font.bold = True
-            p.font.color.rgb = DARK_GREEN
-            
-            # 설명
-            desc_box = slide.shapes.add_textbox(Inches(1.2), Inches(y_pos + 0.6), Inches(8), Inches(0.5))
-            tf = desc_box.text_frame
-            p = tf.paragraphs[0]
-            p.text = desc
-            p.font.size = Pt(14)
-            p.font.color.rgb = TEXT_GRAY
-            
-            y_pos += 1.2
-        
-        return slide
-    
-    def add_solution_slide():
-        """슬라이드 3: 솔루션/특징"""
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
-        
-        # 타이틀
-        title = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1))
-        tf = title.text_frame
-        p = tf.paragraphs[0]
-        p.text = "Shimplex 특징"
-        p.font.size = Pt(36)
-        p.font.bold = True
-        p.font.color.rgb = TEXT_DARK
-        
-        # 4가지 특징 (2x2 그리드)
-        features = [
-            ("🌐", "범용성", "Python만 있으면 OK\nWindows/Mac/Linux 모두 지원", Inches(0.7), Inches(1.8)),
-            ("🔌", "유연성", "OpenAI, Claude, Ollama\n모든 주요 LLM 지원", Inches(4.8), Inches(1.8)),
-            ("🚀", "간편성", "Docker 없이 실행\n'python app.py' 한 줄로 시작", Inches(0.7), Inches(4.0)),
-            ("🛡️", "보안성", "API 키 로컬 관리\n외부 노출 최소화", Inches(4.8), Inches(4.0)),
-        ]
-        
-        for icon, title_text, desc, x, y in features:
-            # 카드 배경 (흰색 박스)
-            # 제목
-            title_box = slide.shapes.add_textbox(x, y, Inches(4), Inches(0.6))
-            tf = title_box.text_frame
-            p = tf.paragraphs[0]
-            p.text = f"{icon} {title_text}"
-            p.font.size = Pt(24)
-            p.font.bold = True
-            p.font.color.rgb = PRIMARY_GREEN
-            
-            # 설명
-            desc_box = slide.shapes.add_textbox(x + Inches(0.3), y + Inches(0.7), Inches(3.5), Inches(1))
-            tf = desc_box.text_frame
-            p = tf.paragraphs[0]
-            p.text = desc
-            p.font.size = Pt(14)
-            p.font.color.rgb = TEXT_DARK
-            p.line_spacing = 1.3
-        
-        return slide
-    
-    def add_architecture_slide():
-        """슬라이드 4: 구조 및 시작하기"""
-        slide = prs.slides.add_slide(prs.slide_layouts[6])
-        
-        # 타이틀
-        title = slide.shapes.add_textbox(Inches(0.5), Inches(0.5), Inches(9), Inches(1))
-        tf = title.text_frame
-        p = tf.paragraphs[0]
-        p.text = "구조 및 시작하기"
-        p.font.size = Pt(36)
-        p.font.bold = True
-        p.font.color.rgb = TEXT_DARK
-        
-        # 아키텍처 다이어그램 (텍스트로 표현)
-        arch_box = slide.shapes.add_textbox(Inches(0.8), Inches(1.5), Inches(8.5), Inches(2.2))
-        tf = arch_box.text_frame
-        tf.word_wrap = True
-        
-        p = tf.paragraphs[0]
-        p.text = "🏗️  아키텍처"
-        p.font.size = Pt(20)
-        p.font.bold = True
-        p.font.color.rgb = DARK_GREEN
-        
-        p = tf.add_paragraph()
-        p.text = "사용자 브라우저 → Shimplex 서버(FastAPI) → 외부 LLM API"
-        p.font.size = Pt(14)
-        p.space_before = Pt(8)
-        
-        p = tf.add_paragraph()
-        p.text = "설정: config.json 로컬 파일로 관리"
-        p.font.size = Pt(14)
-        p.space_before = Pt(4)
-        
-        # 설치 방법
-        install_box = slide.shapes.add_textbox(Inches(0.8), Inches(4.0), Inches(8.5), Inches(2.5))
-        tf = install_box.text_frame
-        
-        p = tf.paragraphs[0]
-        p.text = "⚡  빠른 시작"
-        p.font.size = Pt(20)
-        p.font.bold = True
-        p.font.color.rgb = DARK_GREEN
-        
-        p = tf.add_paragraph()
-        p.text = "$ git clone https://github.com/ryanshim10/shimplex.git"
-        p.font.size = Pt(13)
-        p.font.name = "Consolas"
-        p.space_before = Pt(8)
-        
-        p = tf.add_paragraph()
-        p.text = "$ cd shimplex && ./install.sh"
-        p.font.size = Pt(13)
-        p.font.name = "Consolas"
-        p.space_before = Pt(4)
-        
-        p = tf.add_paragraph()
-        p.text = "$ python app.py"
-        p.font.size = Pt(13)
-        p.font.name = "Consolas"
-        p.space_before = Pt(4)
-        
-        # CTA
-        cta = slide.shapes.add_textbox(Inches(0.8), Inches(6.5), Inches(8.5), Inches(0.8))
-        tf = cta.text_frame
-        p = tf.paragraphs[0]
-        p.text = "🎯  github.com/ryanshim10/shimplex"
-        p.font.size = Pt(16)
-        p.font.bold = True
-        p.font.color.rgb = PRIMARY_GREEN
-        p.alignment = PP_ALIGN.CENTER
-        
-        return slide
-    
-    # 4개 슬라이드 생성
-    add_title_slide()
-    add_problem_slide()
-    add_solution_slide()
-    add_architecture_slide()
-    
-    # 저장
-    output_file = "Shimplex_Introduction.pptx"
-    prs.save(output_file)
+    Presentation = None
+
+# 색상 (Shimplex 테마: 초록/파랑)
+PRIMARY_GREEN = "4CAF50"
+DARK_GREEN = "388E3C"
+TEXT_DARK = "212121"
+TEXT_GRAY = "616161"
+
+# 문단 스타일 (글자 크기, 굵게, 색, 정렬, 글꼴, 줄 간격, 앞 간격)
+STYLES = {
+    "hero": {"size": 54, "bold": True, "color": PRIMARY_GREEN, "align": "center"},
+    "subtitle": {"size": 28, "color": TEXT_GRAY, "align": "center"},
+    "tagline": {"size": 18, "color": TEXT_GRAY, "align": "center"},
+    "footer": {"size": 12, "color": TEXT_GRAY, "align": "center"},
+    "heading": {"size": 36, "bold": True, "color": TEXT_DARK},
+    "item": {"size": 22, "bold": True, "color": DARK_GREEN},
+    "item_text": {"size": 14, "color": TEXT_GRAY},
+    "card": {"size": 24, "bold": True, "color": PRIMARY_GREEN},
+    "card_text": {"size": 14, "color": TEXT_DARK, "line_spacing": 1.3},
+    "section": {"size": 20, "bold": True, "color": DARK_GREEN},
+    "body_first": {"size": 14, "space_before": 8},
+    "body": {"size": 14, "space_before": 4},
+    "code_first": {"size": 13, "font": "Consolas", "space_before": 8},
+    "code": {"size": 13, "font": "Consolas", "space_before": 4},
+    "cta": {"size": 16, "bold": True, "color": PRIMARY_GREEN, "align": "center"},
+}
+
+# 텍스트 상자 1개: (x, y, 너비, 높이 - 인치, 줄바꿈 여부, [(문단 스타일, 내용)])
+Box = Tuple[float, float, float, float, bool, List[Tuple[str, str]]]
+# 기본 템플릿(4:3) 슬라이드 높이 (인치)
+SLIDE_HEIGHT = 7.5
+
+
+def title_layout(slide: Dict) -> List[Box]:
+    """타이틀: title, subtitle, description, footer"""
+    return [
+        (1, 2.5, 8, 1.5, False, [("hero", slide.get("title", ""))]),
+        (1, 4.2, 8, 1, False, [("subtitle", slide.get("subtitle", ""))]),
+        (1, 5.3, 8, 0.8, False, [("tagline", slide.get("description", ""))]),
+        (1, 6.8, 8, 0.5, False, [("footer", slide.get("footer", ""))]),
+    ]
+
+
+def list_layout(slide: Dict) -> List[Box]:
+    """제목 + 항목 목록: items = [{"heading", "text"}]"""
+    boxes = [(0.5, 0.5, 9, 1, False, [("heading", slide.get("title", ""))])]
+    y = 1.8
+    for item in slide.get("items", []):
+        boxes.append((0.8, y, 8.5, 0.6, False, [("item", item.get("heading", ""))]))
+        boxes.append((1.2, y + 0.6, 8, 0.5, False, [("item_text", item.get("text", ""))]))
+        y += 1.2
+    return boxes
+
+
+def grid_layout(slide: Dict) -> List[Box]:
+    """제목 + 2열 카드: items = [{"icon", "heading", "text"}]"""
+    boxes = [(0.5, 0.5, 9, 1, False, [("heading", slide.get("title", ""))])]
+    for i, item in enumerate(slide.get("items", [])):
+        x, y = (0.7, 4.8)[i % 2], 1.8 + (i // 2) * 2.2
+        heading = f"{item.get('icon', '')} {item.get('heading', '')}".strip()
+        boxes.append((x, y, 4, 0.6, False, [("card", heading)]))
+        boxes.append((x + 0.3, y + 0.7, 3.5, 1, False, [("card_text", item.get("text", ""))]))
+    return boxes
+
+
+def sections_layout(slide: Dict) -> List[Box]:
+    """제목 + 구역: sections = [{"heading", "lines", "code", "height"}], footer"""
+    boxes = [(0.5, 0.5, 9, 1, False, [("heading", slide.get("title", ""))])]
+    y = 1.5
+    for section in slide.get("sections", []):
+        style = "code" if section.get("code") else "body"
+        paragraphs = [("section", section.get("heading", ""))]
+        paragraphs += [(style + "_first" if i == 0 else style, line)
+                       for i, line in enumerate(section.get("lines", []))]
+        height = section.get("height", 2.2)
+        # 명령어 줄은 줄바꿈하지 않는다
+        boxes.append((0.8, y, 8.5, height, not section.get("code"), paragraphs))
+        y += height + 0.3
+    if slide.get("footer"):
+        boxes.append((0.8, 6.5, 8.5, 0.8, False, [("cta", slide["footer"])]))
+    return boxes
+
+
+# 레이아웃이 텍스트로 쓰는 필드
+SLIDE_TEXT = ("title", "subtitle", "description", "footer")
+ITEM_TEXT = ("icon", "heading", "text")
+
+LAYOUTS = {
+    "title": title_layout,
+    "list": list_layout,
+    "grid": grid_layout,
+    "sections": sections_layout,
+}
+
+# 기본 소개 자료 (4장)
+INTRO_DECK = {
+    "name": "Shimplex_Introduction",
+    "slides": [
+        {
+            "layout": "title",
+            "title": "Shimplex",
+            "subtitle": "개인 AI 클라이언트 / Personal AI Plex",
+            "description": "어디서든 실행되는 경량 AI 채팅 솔루션",
+            "footer": "github.com/ryanshim10/shimplex | 2026.02"
+        },
+        {
+            "layout": "list",
+            "title": "왜 Shimplex인가?",
+            "items": [
+                {"heading": "🔒 개인정보 유출 우려", "text": "ChatGPT 등 외부 서비스 의존 시 민감 데이터 노출 위험"},
+                {"heading": "🔧 복잡한 설정", "text": "Docker, CUDA, 의존성 설치... 진입장벽이 너무 높음"},
+                {"heading": "💻 플랫폼 종속", "text": "Windows용, Mac용 따로 설치해야 하는 번거로움"},
+                {"heading": "💸 비용 부담", "text": "로컬 AI는 고가 GPU 필요, 클라우드는 월 구독료 발생"},
+            ]
+        },
+        {
+            "layout": "grid",
+            "title": "Shimplex 특징",
+            "items": [
+                {"icon": "🌐", "heading": "범용성", "text": "Python만 있으면 OK\nWindows/Mac/Linux 모두 지원"},
+                {"icon": "🔌", "heading": "유연성", "text": "OpenAI, Claude, Ollama\n모든 주요 LLM 지원"},
+                {"icon": "🚀", "heading": "간편성", "text": "Docker 없이 실행\n'python app.py' 한 줄로 시작"},
+                {"icon": "🛡️", "heading": "보안성", "text": "API 키 로컬 관리\n외부 노출 최소화"},
+            ]
+        },
+        {
+            "layout": "sections",
+            "title": "구조 및 시작하기",
+            "sections": [
+                {"heading": "🏗️  아키텍처", "lines": [
+                    "사용자 브라우저 → Shimplex 서버(FastAPI) → 외부 LLM API",
+                    "설정: config.json 로컬 파일로 관리"
+                ]},
+                {"heading": "⚡  빠른 시작", "code": True, "height": 2.5, "lines": [
+                    "$ git clone https://github.com/ryanshim10/shimplex.git",
+                    "$ cd shimplex && ./install.sh",
+                    "$ python app.py"
+                ]}
+            ],
+            "footer": "🎯  github.com/ryanshim10/shimplex"
+        }
+    ]
+}
+
+
+def validate_deck(deck: Dict, max_slides: int = 50):
+    """렌더링 전에 형식 확인 (잘못되면 ValueError)"""
+    if not isinstance(deck, dict) or not isinstance(deck.get("slides"), list) or not deck["slides"]:
+        raise ValueError("slides 목록이 필요합니다")
+    if len(deck["slides"]) > max_slides:
+        raise ValueError(f"슬라이드는 최대 {max_slides}장입니다")
+    for i, slide in enumerate(deck["slides"], 1):
+        if not isinstance(slide, dict):
+            raise ValueError(f"{i}번 슬라이드가 객체가 아닙니다")
+        layout = slide.get("layout", "list")
+        if layout not in LAYOUTS:
+            raise ValueError(f"{i}번 슬라이드: 알 수 없는 layout '{layout}' ({', '.join(LAYOUTS)})")
+        check_text(slide, SLIDE_TEXT, f"{i}번 슬라이드")
+        for key in ("items", "sections"):
+            if not isinstance(slide.get(key, []), list) or not all(isinstance(x, dict) for x in slide.get(key, [])):
+                raise ValueError(f"{i}번 슬라이드: {key}는 객체 목록이어야 합니다")
+        for j, item in enumerate(slide.get("items", []), 1):
+            check_text(item, ITEM_TEXT, f"{i}번 슬라이드 items[{j}]")
+        for j, section in enumerate(slide.get("sections", []), 1):
+            where = f"{i}번 슬라이드 sections[{j}]"
+            check_text(section, ("heading",), where)
+            lines = section.get("lines", [])
+            if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+                raise ValueError(f"{where}: lines는 문자열 목록이어야 합니다")
+            height = section.get("height", 2.2)
+            # bool은 int의 하위 클래스라 따로 거른다
+            if isinstance(height, bool) or not isinstance(height, (int, float)) or not 0 < height <= SLIDE_HEIGHT:
+                raise ValueError(f"{where}: height는 0보다 크고 {SLIDE_HEIGHT} 이하인 숫자여야 합니다")
+
+
+def check_text(obj: Dict, keys: Tuple[str, ...], where: str):
+    """텍스트 상자에 들어갈 값은 문자열이어야 한다"""
+    for key in keys:
+        if not isinstance(obj.get(key, ""), str):
+            raise ValueError(f"{where}: {key}는 문자열이어야 합니다")
+
+
+def deck_filename(deck: Dict, index: int = 0) -> str:
+    """내려받을 파일 이름 (name이 없으면 deck-<번호>)"""
+    name = re.sub(r'[\\/:*?"<>|\r\n]+', "_", str(deck.get("name") or f"deck-{index + 1}")).strip() or "deck"
+    return name[:100] + ".pptx"
+
+
+class DeckRenderer:
+    """템플릿 1개로 덱을 만드는 렌더러
+
+    템플릿은 한 번만 파싱해 두고 덱마다 복사하며, 문단 스타일과 텍스트 상자도
+    python-pptx로 한 번 만든 XML을 복사해 내용만 바꾼다 (서식 속성을 매번 설정하지 않는다).
+    """
+    def __init__(self, template: Optional[str] = None):
+        if Presentation is None:
+            raise RuntimeError("python-pptx가 필요합니다 (pip install python-pptx)")
+        self._base = Presentation(template or None)
+        self._blank = self._blank_layout()
+        scratch = copy.deepcopy(self._base)
+        slide = scratch.slides.add_slide(scratch.slide_layouts[self._blank])
+        # 줄바꿈 여부 -> 빈 텍스트 상자
+        self._boxes = {}
+        for wrap in (False, True):
+            box = slide.shapes.add_textbox(0, 0, 0, 0)
+            if wrap:
+                box.text_frame.word_wrap = True
+            element = copy.deepcopy(box._element)
+            for p in element.txBody.p_lst:
+                element.txBody.remove(p)
+            self._boxes[wrap] = element
+        # 스타일 이름 -> 서식만 들어간 빈 문단
+        self._paragraphs = {}
+        for name, style in STYLES.items():
+            p = slide.shapes.add_textbox(0, 0, 0, 0).text_frame.paragraphs[0]
+            p.font.size = Pt(style["size"])
+            if style.get("bold"):
+                p.font.bold = True
+            if style.get("color"):
+                p.font.color.rgb = RGBColor.from_string(style["color"])
+            if style.get("font"):
+                p.font.name = style["font"]
+            if style.get("align") == "center":
+                p.alignment = PP_ALIGN.CENTER
+            if style.get("line_spacing"):
+                p.line_spacing = style["line_spacing"]
+            if style.get("space_before"):
+                p.space_before = Pt(style["space_before"])
+            self._paragraphs[name] = copy.deepcopy(p._p)
+
+    def _blank_layout(self) -> int:
+        """빈 슬라이드 레이아웃 위치 (없으면 개체 틀이 가장 적은 레이아웃)"""
+        layouts = list(self._base.slide_layouts)
+        for i, layout in enumerate(layouts):
+            if layout.name.lower() in ("blank", "빈 화면"):
+                return i
+        return min(range(len(layouts)), key=lambda i: len(layouts[i].placeholders))
+
+    def render(self, deck: Dict) -> bytes:
+        """덱 -> .pptx 바이트"""
+        prs = copy.deepcopy(self._base)
+        layout = prs.slide_layouts[self._blank]
+        for spec in deck["slides"]:
+            slide = prs.slides.add_slide(layout)
+            tree = slide.shapes._spTree
+            shape_id = slide.shapes._next_shape_id
+            for x, y, width, height, wrap, paragraphs in LAYOUTS[spec.get("layout", "list")](spec):
+                if not any(text for _, text in paragraphs):
+                    continue
+                sp = copy.deepcopy(self._boxes[wrap])
+                sp.nvSpPr.cNvPr.id = shape_id
+                sp.nvSpPr.cNvPr.name = f"TextBox {shape_id - 1}"
+                # python-pptx 속성 설정자를 거치지 않고 프로토타입의 a:off/a:ext 값만 바꾼다
+                xfrm = sp.spPr.xfrm
+                xfrm.off.set("x", str(Inches(x)))
+                xfrm.off.set("y", str(Inches(y)))
+                xfrm.ext.set("cx", str(Inches(width)))
+                xfrm.ext.set("cy", str(Inches(height)))
+                for style, text in paragraphs:
+                    p = copy.deepcopy(self._paragraphs[style])
+                    sp.txBody.append(p)
+                    _Paragraph(p, None).text = str(text)
+                tree.insert_element_before(sp, "p:extLst")
+                shape_id += 1
+        out = io.BytesIO()
+        prs.save(out)
+        return out.getvalue()
+
+
+# 템플릿 경로 -> 렌더러 (프로세스마다 한 번만 생성)
+_renderers: Dict[Optional[str], DeckRenderer] = {}
+
+
+def get_renderer(template: Optional[str] = None) -> DeckRenderer:
+    renderer = _renderers.get(template)
+    if renderer is None:
+        renderer = _renderers[template] = DeckRenderer(template)
+    return renderer
+
+
+def render_deck(deck: Dict, template: Optional[str] = None) -> bytes:
+    """덱 1개 -> .pptx 바이트 (프로세스 풀 작업 함수)"""
+    return get_renderer(template).render(deck)
+
+
+class DeckPool:
+    """render_deck()을 프로세스 풀에서 실행
+
+    python-pptx는 순수 파이썬(lxml 조작 + zip 압축)이라 스레드로는 병렬이 안 된다.
+    풀은 처음 사용할 때 만들고, 각 프로세스는 시작할 때 템플릿을 미리 읽는다.
+    workers가 0이면 풀 없이 스레드 하나에서 렌더링한다.
+    """
+    def __init__(self, workers: int = 0, template: Optional[str] = None):
+        self.workers = workers
+        self.template = template or None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.rendered = 0
+        self.failed = 0
+
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers and self._executor is None:
+            # fork는 이벤트 루프와 스레드가 도는 서버 프로세스를 복제하므로 spawn
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=get_renderer, initargs=(self.template,)
+            )
+        return self._executor
+
+    async def render(self, deck: Dict) -> bytes:
+        loop = asyncio.get_running_loop()
+        try:
+            data = await loop.run_in_executor(self.executor(), render_deck, deck, self.template)
+        except Exception:
+            self.failed += 1
+            raise
+        self.rendered += 1
+        return data
+
+    async def render_many(self, decks: List[Dict]) -> AsyncIterator[Tuple[int, Optional[bytes], Optional[str]]]:
+        """(순번, .pptx 바이트, 오류) - 끝나는 순서대로"""
+        async def one(index: int, deck: Dict):
+            try:
+                return index, await self.render(deck), None
+            except Exception as e:
+                return index, None, str(e)
+
+        tasks = [asyncio.ensure_future(one(i, deck)) for i, deck in enumerate(decks)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "started": self._executor is not None,
+                "rendered": self.rendered, "failed": self.failed}
+
+
+class _ChunkWriter:
+    """zipfile이 쓴 바이트를 모아 두었다가 조각으로 내보내는 쓰기 전용 스트림 (임시 파일 없음)"""
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def zip_decks(pool: DeckPool, decks: List[Dict]) -> AsyncIterator[bytes]:
+    """덱 여러 개를 렌더링되는 대로 zip으로 스트리밍 (pptx는 이미 압축돼 있어 저장만)"""
+    writer = _ChunkWriter()
+    names = set()
+    with zipfile.ZipFile(writer, "w", zipfile.ZIP_STORED) as archive:
+        async for index, data, error in pool.render_many(decks):
+            name = deck_filename(decks[index], index)
+            if name in names:
+                name = f"{name[:-5]}-{index + 1}.pptx"
+            names.add(name)
+            if error is not None:
+                archive.writestr(name[:-5] + ".error.txt", error)
+            else:
+                archive.writestr(name, data)
+            yield writer.drain()
+    yield writer.drain()
+
+
+def create_shimplex_ppt(deck: Optional[Dict] = None, output_file: Optional[str] = None):
+    deck = deck or INTRO_DECK
+    validate_deck(deck)
+    output_file = output_file or deck_filename(deck)
+    with open(output_file, "wb") as f:
+        f.write(render_deck(deck))
     print(f"✅ PPT 생성 완료: {output_file}")
-    print(f"📊 총 {len(prs.slides)}개 슬라이드")
+    print(f"📊 총 {len(deck['slides'])}개 슬라이드")
     print("\n슬라이드 목록:")
-    print("  1. 타이틀 - Shimplex 소개")
-    print("  2. 문제 제기 - 왜 Shimplex인가?")
-    print("  3. 특징 - 4가지 핵심 기능")
-    print("  4. 구조 및 시작하기 - 아키텍처와 설치법")
+    for i, slide in enumerate(deck["slides"], 1):
+        print(f"  {i}. {slide.get('title', '')}")
+
 
 if __name__ == "__main__":
-    create_shimplex_ppt()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shimplex PPT 생성")
+    parser.add_argument("deck", nargs="?", help="슬라이드 내용 JSON 파일 (없으면 기본 소개 자료)")
+    parser.add_argument("--output", default=None, help="출력 파일 (기본: 덱 name.pptx)")
+    args = parser.parse_args()
+
+    if Presentation is None:
+        print("❌ python-pptx 라이브러리 필요")
+        print("설치: pip install python-pptx")
+        sys.exit(1)
+    deck = None
+    if args.deck:
+        with open(args.deck, "r", encoding="utf-8") as f:
+            deck = json.load(f)
+    create_shimplex_ppt(deck, args.output)
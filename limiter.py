@@ -0,0 +1,161 @@
+# Shimplex - 프로바이더별 동시 요청 제한 + 대기열
+# 세션 간 라운드로빈으로 공정하게 순서를 배분한다
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+
+class QueueFullError(Exception):
+    """대기열이 가득 참"""
+
+
+class QueueTimeoutError(Exception):
+    """대기 시간 초과"""
+
+
+class FairLimiter:
+    """동시 실행 수 제한 + 세션별 공정 대기열
+
+    실행 슬롯이 비면 대기 중인 세션을 차례로 돌며 한 요청씩 깨운다.
+    한 세션이 요청을 몰아 보내도 다른 세션이 뒤로 밀리지 않고, 한 세션은 대기열에
+    max_session_queue개까지만 넣을 수 있어 대기열을 혼자 채워 다른 세션을 거절시키지 못한다 (0이면 제한 없음).
+    """
+    def __init__(self, max_concurrency: int = 8, max_queue: int = 100, timeout: float = 30.0,
+                 session_queues: Optional[Dict[str, int]] = None, max_session_queue: int = 20):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_session_queue = max_session_queue
+        # 대기열 한도를 따로 두는 세션 (배치 등) -> 한도. 이 세션의 대기는 max_queue를 차지하지 않는다
+        self.session_queues = session_queues or {}
+        self.active = 0
+        self.queued = 0
+        # session_id -> 대기 중인 future (순서가 곧 라운드로빈 순서)
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self.total = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, session_id: str = "default") -> float:
+        """슬롯 획득, 대기한 시간(초) 반환"""
+        self.total += 1
+        if self.active < self.max_concurrency and not self.queued:
+            self.active += 1
+            return 0.0
+        limit = self.session_queues.get(session_id)
+        if limit is not None:
+            if len(self._queues.get(session_id, ())) >= limit:
+                self.rejected += 1
+                raise QueueFullError(f"{session_id} 대기열이 가득 찼습니다 ({limit})")
+        elif self.queued - self._separately_queued() >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(f"대기열이 가득 찼습니다 ({self.max_queue})")
+        elif self.max_session_queue and len(self._queues.get(session_id, ())) >= self.max_session_queue:
+            self.rejected += 1
+            raise QueueFullError(f"{session_id} 세션의 대기 요청이 너무 많습니다 ({self.max_session_queue})")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session_id, deque()).append(future)
+        self.queued += 1
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # 타임아웃과 동시에 슬롯을 넘겨받은 경우
+                if isinstance(e, asyncio.CancelledError):
+                    self.release()
+                    raise
+            else:
+                future.cancel()
+                self._remove(session_id, future)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                self.timeouts += 1
+                raise QueueTimeoutError(f"대기 시간 초과 ({self.timeout}초)")
+        wait = time.monotonic() - start
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def _separately_queued(self) -> int:
+        return sum(len(self._queues.get(session_id, ())) for session_id in self.session_queues)
+
+    def _remove(self, session_id: str, future: asyncio.Future):
+        queue = self._queues.get(session_id)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self.queued -= 1
+            if not queue:
+                del self._queues[session_id]
+
+    def release(self):
+        """슬롯 반환 - 대기 중인 다음 세션에 바로 넘긴다"""
+        while self._queues:
+            session_id, queue = self._queues.popitem(last=False)
+            future = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._queues[session_id] = queue
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, session_id: str = "default"):
+        """async with limiter.slot(session_id) as wait: ... (wait: 대기한 시간)"""
+        wait = await self.acquire(session_id)
+        try:
+            yield wait
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        waited = self.total - self.rejected
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "max_session_queue": self.max_session_queue,
+            "requests": self.total,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_wait": round(self.total_wait / waited, 4) if waited else 0.0,
+            "max_wait": round(self.max_wait, 4)
+        }
+
+
+class ProviderLimiters:
+    """프로바이더별 FairLimiter (config.json의 limits)
+
+    session_queues: 대기열 한도를 따로 두는 세션 -> limits 설정 키 (예: {"batch": "batch_max_queue"})
+    """
+    def __init__(self, settings: Optional[dict] = None, session_queues: Optional[Dict[str, str]] = None):
+        self.settings = settings or {}
+        self.session_queues = session_queues or {}
+        self._limiters: Dict[str, FairLimiter] = {}
+
+    def get(self, provider: str) -> FairLimiter:
+        limiter = self._limiters.get(provider)
+        if limiter is None:
+            options = dict(self.settings)
+            options.update(self.settings.get("providers", {}).get(provider, {}))
+            limiter = FairLimiter(
+                max_concurrency=options.get("max_concurrency", 8),
+                max_queue=options.get("max_queue", 100),
+                timeout=options.get("queue_timeout", 30.0),
+                max_session_queue=options.get("max_session_queue", 20),
+                session_queues={session_id: options.get(key, 100) for session_id, key in self.session_queues.items()}
+            )
+            self._limiters[provider] = limiter
+        return limiter
+
+    def stats(self) -> dict:
+        return {provider: limiter.stats() for provider, limiter in self._limiters.items()}
@@ -0,0 +1,197 @@
+# Shimplex - Prometheus 메트릭
+# 외부 의존성 없이 카운터/게이지/히스토그램을 텍스트 형식(/metrics)으로 내보낸다
+
+import bisect
+import threading
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _labels(names: Sequence[str], values: Tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [버킷별 개수..., 합계, 전체 개수]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = [0] * len(self.buckets) + [0.0, 0]
+                self._values[labels] = state
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        names = self.labelnames + ("le",)
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(names, labels + ('+Inf',))} {state[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """메트릭 모음 + 수집 시점에 값을 채우는 콜백"""
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """/metrics 요청 때마다 호출되어 게이지 등을 갱신"""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            fn()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    "shimplex_http_request_duration_seconds", "HTTP 요청 처리 시간", ("method", "path", "status"))
+REQUEST_BYTES = registry.histogram(
+    "shimplex_http_request_bytes", "HTTP 요청 본문 크기", ("path",), BYTES_BUCKETS)
+RESPONSE_BYTES = registry.histogram(
+    "shimplex_http_response_bytes", "HTTP 응답 본문 크기", ("path",), BYTES_BUCKETS)
+UPSTREAM_LATENCY = registry.histogram(
+    "shimplex_upstream_duration_seconds", "LLM 업스트림 호출 시간", ("provider", "model", "outcome"))
+UPSTREAM_REQUEST_BYTES = registry.histogram(
+    "shimplex_upstream_request_bytes", "LLM 업스트림 요청 크기", ("provider",), BYTES_BUCKETS)
+TIME_TO_FIRST_TOKEN = registry.histogram(
+    "shimplex_time_to_first_token_seconds", "스트리밍 첫 토큰까지 걸린 시간", ("provider", "model"))
+QUEUE_WAIT = registry.histogram(
+    "shimplex_queue_wait_seconds", "프로바이더 대기열 대기 시간", ("provider",))
+TOKENS = registry.counter(
+    "shimplex_tokens_total", "프로바이더가 보고한 토큰 사용량 (type: prompt/completion/cache_read/cache_write)",
+    ("provider", "model", "type"))
+QUOTA = registry.counter(
+    "shimplex_quota_requests_total", "세션 할당량 초과로 거절/대기한 요청 수 (reason: tokens/rate)",
+    ("reason", "action"))
+CACHE_REQUESTS = registry.counter(
+    "shimplex_response_cache_requests_total", "응답 캐시 조회 결과 (result: memory_hit/disk_hit/miss)", ("result",))
+COALESCED = registry.counter(
+    "shimplex_coalesced_requests_total", "진행 중인 동일 요청에 합류해 생략된 업스트림 호출 수", ("mode",))
+SEMANTIC_SIMILARITY = registry.histogram(
+    "shimplex_semantic_cache_similarity", "의미 캐시 조회별 최고 유사도 (threshold 조정용)", ("outcome",),
+    (0.5, 0.6, 0.7, 0.8, 0.85, 0.88, 0.9, 0.92, 0.94, 0.96, 0.98, 0.99, 1.0))
+OLLAMA_LOAD = registry.histogram(
+    "shimplex_ollama_load_seconds", "Ollama 모델 미리 로드/keep-warm 요청 시간", ("model", "instance"),
+    (0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+
+
+# 요청별 구간 시간 (Server-Timing 헤더용)
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("shimplex_timings", default=None)
+
+
+def start_timing() -> Dict[str, float]:
+    """현재 요청의 구간 시간 기록 시작"""
+    timings: Dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+def record_timing(name: str, seconds: float):
+    """현재 요청에 구간 시간 누적 (기록 중이 아니면 무시)"""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+벤치마크/테스트용 가짜 LLM 서버 (OpenAI/Anthropic/Ollama 호환, 스트리밍과 네이티브 배치 지원)
+실행: python mock_llm.py --port 9100 --latency 0.05 --token-rate 200 --error-rate 0.01
+      python mock_llm.py --port 11434 --load-time 3   # Ollama 모델 로드 지연 흉내
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+REPLY = "안녕하세요! Shimplex 벤치마크용 가짜 응답입니다. 요청하신 내용을 확인했습니다."
+
+
+def keep_alive_seconds(value) -> float:
+    """Ollama keep_alive ("30m", "1h", 300, -1) -> 초 (음수면 계속 유지)"""
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        units = {"s": 1, "m": 60, "h": 3600}
+        text = str(value).strip()
+        seconds = float(text[:-1]) * units[text[-1]] if text and text[-1] in units else float(text)
+    return float("inf") if seconds < 0 else seconds
+
+
+def mock_embedding(text: str, dim: int = 64) -> list:
+    """단어 해시 기반 가짜 임베딩 - 단어가 많이 겹치는 문장일수록 유사도가 높다"""
+    vector = [0.0] * dim
+    for word in re.findall(r"\w+", text.lower()):
+        vector[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % dim] += 1.0
+    return vector
+
+
+def create_mock_app(latency: float = 0.0, token_rate: float = 0.0, error_rate: float = 0.0,
+                    load_time: float = 0.0) -> FastAPI:
+    """latency: 첫 토큰까지 지연(초), token_rate: 초당 토큰 수(0이면 즉시), error_rate: 오류 응답 비율,
+    load_time: Ollama 모델이 메모리에 없을 때 로드 시간(초, keep_alive가 지나면 내려감)"""
+    mock = FastAPI(title="Shimplex Mock LLM")
+    tokens = [word + " " for word in REPLY.split(" ")]
+    stats = {"requests": 0, "errors": 0, "connections": set(), "loads": 0}
+    # Ollama 모델 -> 메모리에서 내려갈 시각
+    loaded = {}
+
+    async def ensure_loaded(model: str, keep_alive) -> float:
+        """모델이 없으면 load_time만큼 기다려 올리고, keep_alive 연장. 로드에 걸린 시간 반환"""
+        now = time.monotonic()
+        spent = 0.0
+        if loaded.get(model, 0) <= now:
+            stats["loads"] += 1
+            await asyncio.sleep(load_time)
+            spent = load_time
+        loaded[model] = time.monotonic() + keep_alive_seconds(keep_alive)
+        return spent
+
+    async def begin(request: Request):
+        """요청 집계 후 지연, 오류로 응답해야 하면 JSONResponse 반환"""
+        stats["requests"] += 1
+        client = request.scope.get("client")
+        if client:
+            stats["connections"].add(tuple(client))
+        await asyncio.sleep(latency)
+        if error_rate and random.random() < error_rate:
+            stats["errors"] += 1
+            status = random.choice((429, 500, 503))
+            return JSONResponse({"error": {"message": f"mock error {status}"}}, status_code=status)
+        return None
+
+    async def pace():
+        if token_rate:
+            await asyncio.sleep(1.0 / token_rate)
+
+    async def full_reply() -> str:
+        if token_rate:
+            await asyncio.sleep(len(tokens) / token_rate)
+        return "".join(tokens)
+
+    def sse(data: dict, event: str = None) -> str:
+        prefix = f"event: {event}\n" if event else ""
+        return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    def openai_usage(body: dict) -> dict:
+        prompt_tokens = len(body.get("messages", [])) * 10
+        # 새 메시지를 뺀 앞부분은 프롬프트 캐시에서 읽은 것으로 본다
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                "prompt_tokens_details": {"cached_tokens": max(0, prompt_tokens - 10)}}
+
+    @mock.post("/v1/chat/completions")
+    async def openai_chat(request: Request):
+        body = await request.json()
+        error = await begin(request)
+        if error is not None:
+            return error
+        usage = openai_usage(body)
+        if not body.get("stream"):
+            return {
+                "choices": [{"message": {"role": "assistant", "content": await full_reply()}}],
+                "usage": usage
+            }
+
+        async def events():
+            for token in tokens:
+                await pace()
+                yield sse({"choices": [{"delta": {"content": token}}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield sse({"choices": [], "usage": usage})
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @mock.post("/v1/messages")
+    async def anthropic_messages(request: Request):
+        body = await request.json()
+        error = await begin(request)
+        if error is not None:
+            return error
+        input_tokens = len(body.get("messages", [])) * 10
+        if not body.get("stream"):
+            return {
+                "content": [{"type": "text", "text": await full_reply()}],
+                "usage": {"input_tokens": input_tokens, "output_tokens": len(tokens)}
+            }
+
+        async def events():
+            yield sse({"type": "message_start", "message": {"usage": {"input_tokens": input_tokens}}}, "message_start")
+            for token in tokens:
+                await pace()
+                yield sse({"type": "content_block_delta", "delta": {"type": "text_delta", "text": token}},
+                          "content_block_delta")
+            yield sse({"type": "message_delta", "usage": {"output_tokens": len(tokens)}}, "message_delta")
+            yield sse({"type": "message_stop"}, "message_stop")
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @mock.post("/api/chat")
+    async def ollama_chat(request: Request):
+        body = await request.json()
+        error = await begin(request)
+        if error is not None:
+            return error
+        await ensure_loaded(body.get("model", ""), body.get("keep_alive"))
+        prompt_tokens = len(body.get("messages", [])) * 10
+        if not body.get("stream", True):
+            return {
+                "message": {"role": "assistant", "content": await full_reply()},
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": len(tokens)
+            }
+
+        async def chunks():
+            for token in tokens:
+                await pace()
+                yield json.dumps({"message": {"role": "assistant", "content": token}, "done": False},
+                                 ensure_ascii=False) + "\n"
+            yield json.dumps({"message": {"role": "assistant", "content": ""}, "done": True,
+                              "prompt_eval_count": prompt_tokens, "eval_count": len(tokens)}) + "\n"
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    # 네이티브 Batch API - 만들 때 결과를 바로 준비하고, 첫 상태 조회부터 완료로 알린다
+    files = {}
+    batches = {}
+
+    @mock.post("/v1/files")
+    async def openai_upload(request: Request):
+        form = await request.form()
+        file_id = f"file-{len(files) + 1}"
+        files[file_id] = (await form["file"].read()).decode("utf-8")
+        return {"id": file_id, "object": "file", "purpose": form.get("purpose")}
+
+    @mock.post("/v1/batches")
+    async def openai_create_batch(request: Request):
+        body = await request.json()
+        if body.get("input_file_id") not in files:
+            return JSONResponse({"error": {"message": "no such file"}}, status_code=404)
+        output = []
+        for line in files[body["input_file_id"]].splitlines():
+            item = json.loads(line)
+            completion = {"choices": [{"message": {"role": "assistant", "content": "".join(tokens)}}],
+                          "usage": openai_usage(item["body"])}
+            output.append(json.dumps({"custom_id": item["custom_id"], "error": None,
+                                      "response": {"status_code": 200, "body": completion}}, ensure_ascii=False))
+        batch_id = f"batch-{len(batches) + 1}"
+        output_file_id = f"file-{len(files) + 1}"
+        files[output_file_id] = "\n".join(output)
+        batches[batch_id] = {"id": batch_id, "object": "batch", "status": "completed",
+                             "input_file_id": body["input_file_id"], "output_file_id": output_file_id}
+        return dict(batches[batch_id], status="validating", output_file_id=None)
+
+    @mock.get("/v1/batches/{batch_id}")
+    async def openai_get_batch(batch_id: str):
+        if batch_id not in batches:
+            return JSONResponse({"error": {"message": "no such batch"}}, status_code=404)
+        return batches[batch_id]
+
+    @mock.get("/v1/files/{file_id}/content")
+    async def openai_file_content(file_id: str):
+        if file_id not in files:
+            return JSONResponse({"error": {"message": "no such file"}}, status_code=404)
+        return PlainTextResponse(files[file_id], media_type="application/jsonl")
+
+    @mock.post("/v1/messages/batches")
+    async def anthropic_create_batch(request: Request):
+        body = await request.json()
+        batch_id = f"msgbatch_{len(batches) + 1}"
+        results = [json.dumps({"custom_id": item["custom_id"], "result": {"type": "succeeded", "message": {
+            "content": [{"type": "text", "text": "".join(tokens)}],
+            "usage": {"input_tokens": len(item["params"].get("messages", [])) * 10, "output_tokens": len(tokens)}
+        }}}, ensure_ascii=False) for item in body.get("requests", [])]
+        batches[batch_id] = {"id": batch_id, "type": "message_batch", "processing_status": "ended",
+                             "results_url": f"{request.base_url}v1/messages/batches/{batch_id}/results",
+                             "results": "\n".join(results)}
+        return {"id": batch_id, "type": "message_batch", "processing_status": "in_progress", "results_url": None}
+
+    @mock.get("/v1/messages/batches/{batch_id}")
+    async def anthropic_get_batch(batch_id: str):
+        if batch_id not in batches:
+            return JSONResponse({"error": {"message": "no such batch"}}, status_code=404)
+        return {k: v for k, v in batches[batch_id].items() if k != "results"}
+
+    @mock.get("/v1/messages/batches/{batch_id}/results")
+    async def anthropic_batch_results(batch_id: str):
+        if batch_id not in batches:
+            return JSONResponse({"error": {"message": "no such batch"}}, status_code=404)
+        return PlainTextResponse(batches[batch_id]["results"], media_type="application/x-jsonl")
+
+    @mock.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "mock", "object": "model"}]}
+
+    @mock.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "mock"}]}
+
+    @mock.post("/api/generate")
+    async def ollama_generate(request: Request):
+        """프롬프트 없이 호출하면 모델만 올린다 (미리 로드/keep-warm)"""
+        body = await request.json()
+        spent = await ensure_loaded(body.get("model", ""), body.get("keep_alive"))
+        response = "" if not body.get("prompt") else await full_reply()
+        return {"model": body.get("model"), "response": response, "done": True,
+                "done_reason": "load" if not body.get("prompt") else "stop",
+                "load_duration": int(spent * 1e9)}
+
+    @mock.post("/api/embed")
+    async def ollama_embed(request: Request):
+        body = await request.json()
+        inputs = body.get("input", "")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        return {"model": body.get("model"), "embeddings": [mock_embedding(text) for text in inputs]}
+
+    @mock.post("/v1/embeddings")
+    async def openai_embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", "")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        return {"object": "list", "data": [{"object": "embedding", "index": i, "embedding": mock_embedding(text)}
+                                           for i, text in enumerate(inputs)]}
+
+    @mock.get("/api/ps")
+    async def ollama_ps():
+        now = time.monotonic()
+        return {"models": [{"name": m, "model": m} for m, until in loaded.items() if until > now]}
+
+    @mock.get("/_stats")
+    async def mock_stats():
+        """받은 요청 수, 오류 응답 수, 클라이언트 TCP 연결 수"""
+        return {
+            "requests": stats["requests"],
+            "errors": stats["errors"],
+            "connections": len(stats["connections"]),
+            "loads": stats["loads"],
+            "loaded": sorted(m for m, until in loaded.items() if until > time.monotonic())
+        }
+
+    @mock.post("/_reset")
+    async def mock_reset():
+        stats.update(requests=0, errors=0, connections=set(), loads=0)
+        loaded.clear()
+        return {"status": "ok"}
+
+    return mock
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Shimplex 가짜 LLM 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.0, help="첫 토큰까지 지연(초)")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="초당 생성 토큰 수 (0이면 즉시)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429/5xx 오류 응답 비율 (0~1)")
+    parser.add_argument("--load-time", type=float, default=0.0, help="Ollama 모델 로드 시간(초)")
+    args = parser.parse_args()
+
+    uvicorn.run(create_mock_app(args.latency, args.token_rate, args.error_rate, args.load_time),
+                host=args.host, port=args.port, log_level="warning")
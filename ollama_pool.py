@@ -0,0 +1,207 @@
+# Shimplex - 로컬 Ollama 모델 관리
+# 설정된 모델을 미리 메모리에 올리고(keep_alive 유지), 여러 Ollama 인스턴스 중
+# 모델이 이미 올라가 있고 덜 바쁜 곳으로 요청을 보낸다
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+import httpx
+
+import metrics
+
+KeepAlive = Optional[Union[str, int, float]]
+
+
+class OllamaInstance:
+    """Ollama 서버 1대의 상태"""
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.active = 0
+        # 메모리에 올라가 있는 모델 (/api/ps 또는 성공한 요청 기준)
+        self.loaded: set = set()
+        self.healthy = True
+        # 미리 올려 두기로 배정된 모델 수
+        self.assigned = 0
+
+
+class OllamaPool:
+    """여러 Ollama 인스턴스에 모델 배치, 미리 로드, 주기적 keep-warm, 부하 기준 라우팅
+
+    요청은 (진행 중 요청 수 + 모델을 새로 올려야 하면 load_penalty)가 가장 작은 인스턴스로 보낸다.
+    같은 모델은 이미 올라가 있는 인스턴스로 모이므로, 인스턴스마다 모델이 번갈아
+    올라갔다 내려가는(thrashing) 일이 줄어든다.
+    """
+    def __init__(self, get_http: Callable[[str], httpx.AsyncClient], keep_warm_interval: float = 240.0,
+                 load_penalty: float = 2.0, load_timeout: float = 120.0):
+        self.get_http = get_http
+        self.keep_warm_interval = keep_warm_interval
+        self.load_penalty = load_penalty
+        self.load_timeout = load_timeout
+        self.instances: Dict[str, OllamaInstance] = {}
+        # 계속 올려 둘 (인스턴스 주소, 모델) -> keep_alive
+        self._warm: Dict[Tuple[str, str], KeepAlive] = {}
+        # preload()로 받은 (인스턴스 주소들, 모델, keep_alive) - 재배치할 때 후보로 쓴다
+        self._targets: List[Tuple[List[str], str, KeepAlive]] = []
+        self._preload_task: Optional[asyncio.Task] = None
+        self._keep_warm_task: Optional[asyncio.Task] = None
+
+    def instance(self, base_url: str) -> OllamaInstance:
+        base_url = base_url.rstrip("/")
+        instance = self.instances.get(base_url)
+        if instance is None:
+            instance = self.instances[base_url] = OllamaInstance(base_url)
+        return instance
+
+    def pick(self, base_urls: List[str], model: str) -> OllamaInstance:
+        candidates = [self.instance(url) for url in base_urls]
+        # 모두 장애면 그래도 하나는 시도
+        healthy = [i for i in candidates if i.healthy] or candidates
+        return min(healthy, key=lambda i: (i.active + (0 if model in i.loaded else self.load_penalty), i.active))
+
+    @asynccontextmanager
+    async def acquire(self, base_urls: List[str], model: str) -> AsyncIterator[str]:
+        """요청을 보낼 인스턴스 주소 (사용하는 동안 진행 중 요청으로 집계)"""
+        instance = self.pick(base_urls, model)
+        instance.active += 1
+        try:
+            yield instance.base_url
+        except httpx.TransportError:
+            # 연결 실패 - keep-warm 확인에서 살아나기 전까지 다른 인스턴스 우선
+            instance.healthy = False
+            raise
+        else:
+            instance.healthy = True
+            instance.loaded.add(model)
+        finally:
+            instance.active -= 1
+
+    async def load(self, base_url: str, model: str, keep_alive: KeepAlive = None) -> dict:
+        """모델을 메모리에 올리고 keep_alive를 연장 (프롬프트 없는 generate - 이미 올라가 있으면 즉시 응답)"""
+        instance = self.instance(base_url)
+        payload = {"model": model, "prompt": ""}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        start = time.perf_counter()
+        try:
+            response = await self.get_http(instance.base_url).post(
+                instance.base_url + "/api/generate", json=payload, timeout=self.load_timeout)
+            response.raise_for_status()
+            body = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            if isinstance(e, httpx.TransportError):
+                instance.healthy = False
+            return {"instance": instance.base_url, "model": model, "status": f"error: {type(e).__name__}"}
+        seconds = time.perf_counter() - start
+        instance.healthy = True
+        instance.loaded.add(model)
+        # load_duration은 실제로 모델을 올린 경우에만 의미 있는 값(ns)이 온다
+        load_seconds = (body.get("load_duration") or 0) / 1e9
+        metrics.OLLAMA_LOAD.observe(seconds, model, instance.base_url)
+        return {"instance": instance.base_url, "model": model, "status": "ok",
+                "seconds": round(seconds, 3), "load_seconds": round(load_seconds, 3)}
+
+    async def refresh(self, instance: OllamaInstance):
+        """/api/ps로 올라가 있는 모델과 상태 확인 (keep_alive가 지나 내려간 모델 반영)"""
+        try:
+            response = await self.get_http(instance.base_url).get(instance.base_url + "/api/ps", timeout=5.0)
+            response.raise_for_status()
+            models = response.json().get("models") or []
+        except (httpx.HTTPError, ValueError):
+            instance.healthy = False
+            return
+        instance.healthy = True
+        instance.loaded = {name for m in models for name in (m.get("name"), m.get("model")) if name}
+
+    def _candidates(self, base_urls: List[str]) -> List[OllamaInstance]:
+        """모델을 올릴 인스턴스 순서 - 정상인 곳 먼저, 그중 배정받은 모델이 적은 곳부터"""
+        return sorted((self.instance(url) for url in base_urls), key=lambda i: (not i.healthy, i.assigned))
+
+    def _placement(self, base_urls: List[str], model: str) -> Optional[OllamaInstance]:
+        """모델이 배치된 인스턴스 (없으면 None)"""
+        for url in base_urls:
+            instance = self.instance(url)
+            if (instance.base_url, model) in self._warm:
+                return instance
+        return None
+
+    def _unplace(self, instance: OllamaInstance, model: str):
+        if (instance.base_url, model) in self._warm:
+            del self._warm[(instance.base_url, model)]
+            instance.assigned = max(0, instance.assigned - 1)
+
+    async def _place(self, base_urls: List[str], model: str, keep_alive: KeepAlive) -> dict:
+        """정상 인스턴스 중 덜 배정된 곳에 올리고, 로드가 실패하면 다음 인스턴스로 넘어간다"""
+        result = {"instance": None, "model": model, "status": "error: no instance"}
+        for instance in self._candidates(base_urls):
+            result = await self.load(instance.base_url, model, keep_alive)
+            if result["status"] == "ok":
+                instance.assigned += 1
+                self._warm[(instance.base_url, model)] = keep_alive
+                return result
+        return result
+
+    async def preload(self, targets: List[Tuple[List[str], str, KeepAlive]]) -> List[dict]:
+        """(인스턴스 주소들, 모델, keep_alive) 목록을 미리 올리고 keep-warm 대상으로 교체
+
+        모든 인스턴스에서 로드가 실패한 모델은 keep-warm 때 다시 배치를 시도한다.
+        """
+        for instance in self.instances.values():
+            instance.assigned = 0
+        self._warm = {}
+        self._targets = []
+        results = []
+        for base_urls, model, keep_alive in targets:
+            if any(urls == base_urls and m == model for urls, m, _ in self._targets):
+                continue
+            self._targets.append((base_urls, model, keep_alive))
+            # 모델 로드는 인스턴스 GPU/메모리를 두고 경쟁하므로 하나씩
+            results.append(await self._place(base_urls, model, keep_alive))
+        return results
+
+    def schedule_preload(self, targets: List[Tuple[List[str], str, KeepAlive]]):
+        """설정 변경 시 백그라운드로 다시 미리 로드"""
+        if self._preload_task is not None:
+            self._preload_task.cancel()
+        self._preload_task = asyncio.create_task(self.preload(targets))
+
+    def start(self):
+        """주기적 keep-warm 시작 (keep_warm_interval이 0이면 안 함)"""
+        if self.keep_warm_interval and self._keep_warm_task is None:
+            self._keep_warm_task = asyncio.create_task(self._keep_warm())
+
+    async def _keep_warm(self):
+        while True:
+            await asyncio.sleep(self.keep_warm_interval)
+            await self.keep_warm()
+
+    async def keep_warm(self) -> List[dict]:
+        """상태 확인 후 keep_alive 연장 - Ollama가 재시작돼 내려간 모델은 다시 올리고,
+        배치된 인스턴스가 장애이거나 로드에 실패하면 다른 정상 인스턴스로 옮긴다"""
+        await asyncio.gather(*(self.refresh(i) for i in list(self.instances.values())))
+        results = []
+        for base_urls, model, keep_alive in list(self._targets):
+            instance = self._placement(base_urls, model)
+            if instance is not None and instance.healthy:
+                result = await self.load(instance.base_url, model, keep_alive)
+                if result["status"] == "ok":
+                    results.append(result)
+                    continue
+            if instance is not None:
+                self._unplace(instance, model)
+            results.append(await self._place(base_urls, model, keep_alive))
+        return results
+
+    async def aclose(self):
+        tasks = [t for t in (self._preload_task, self._keep_warm_task) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._preload_task = self._keep_warm_task = None
+
+    def stats(self) -> dict:
+        return {
+            url: {"active": i.active, "healthy": i.healthy, "loaded": sorted(i.loaded)}
+            for url, i in self.instances.items()
+        }
@@ -0,0 +1,286 @@
+# Shimplex - LLM 프로바이더 어댑터
+# 프로바이더마다 다른 URL/헤더/본문 형식과 응답 파싱만 정의하고,
+# 대화 기록 준비/직렬화/호출/재시도는 LLMClient가 공통으로 처리한다
+
+import json
+from typing import Dict, List, Optional, Tuple
+
+# (텍스트, 토큰 사용량)
+# 사용량 키: prompt(캐시분 포함 전체 입력), completion, cache_read(캐시에서 읽은 입력), cache_write(캐시에 새로 쓴 입력)
+Parsed = Tuple[Optional[str], Dict[str, int]]
+
+OPENAI_API_BASE = "https://api.openai.com"
+ANTHROPIC_API_BASE = "https://api.anthropic.com"
+ANTHROPIC_VERSION = "2023-06-01"
+
+# Anthropic 프롬프트 캐시 구간 표시
+EPHEMERAL = {"type": "ephemeral"}
+
+
+def usage(prompt: Optional[int] = None, completion: Optional[int] = None,
+          cache_read: Optional[int] = None, cache_write: Optional[int] = None) -> Dict[str, int]:
+    """보고된 값만 담은 사용량"""
+    values = {"prompt": prompt, "completion": completion, "cache_read": cache_read, "cache_write": cache_write}
+    return {k: v for k, v in values.items() if v}
+
+
+class MessageEncoder:
+    """요청 본문 직렬화
+
+    대화 기록은 턴마다 뒤에 메시지가 붙을 뿐 앞부분은 그대로이고 세션 캐시는 같은 메시지 객체를 돌려주므로,
+    저장된 메시지(session_store.StoredMessage)는 한 번 직렬화한 JSON 조각을 객체에 붙여 두고
+    다음 턴에는 내용을 다시 해시하거나 직렬화하지 않고 이어 붙이기만 한다.
+    조각은 메시지와 함께 사라지므로 따로 크기를 제한하지 않는다.
+    """
+    def fragment(self, message: Dict) -> str:
+        fragment = getattr(message, "fragment", None)
+        if fragment is None:
+            fragment = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+            if hasattr(message, "fragment"):
+                message.fragment = fragment
+        return fragment
+
+    def encode(self, data: Dict) -> bytes:
+        """요청 본문 직렬화 (messages는 캐시된 조각으로 조립)"""
+        messages = data.get("messages")
+        if not messages:
+            return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        head = json.dumps({k: v for k, v in data.items() if k != "messages"},
+                          ensure_ascii=False, separators=(",", ":"))
+        body = ",".join(self.fragment(m) for m in messages)
+        separator = "," if len(head) > 2 else ""
+        return f'{head[:-1]}{separator}"messages":[{body}]}}'.encode("utf-8")
+
+
+class ProviderAdapter:
+    """프로바이더 요청/응답 형식
+
+    messages는 역할이 user/assistant로 정규화된 대화 기록 + 새 메시지이며,
+    어댑터는 이를 복사하거나 다시 매핑하지 않고 그대로 본문에 넣는다.
+    프롬프트 캐시를 쓰려면 시스템 프롬프트 → 이전 기록 → 새 메시지 순서를 유지해
+    턴마다 앞부분이 같게 만든다.
+    """
+    default_base_url = ""
+    default_model = ""
+    timeout = 60.0
+    # 스트리밍 형식: "sse" 또는 "ndjson"
+    stream_format = "sse"
+
+    def base_url(self, client) -> str:
+        return (client.base_url or self.default_base_url).rstrip("/")
+
+    def url(self, client) -> str:
+        raise NotImplementedError
+
+    def headers(self, client) -> Dict[str, str]:
+        return {"Content-Type": "application/json"}
+
+    def payload(self, client, system_prompt: str, messages: List[Dict], stream: bool) -> Dict:
+        raise NotImplementedError
+
+    def request(self, client, system_prompt: str, messages: List[Dict], stream: bool = False) -> tuple:
+        """(url, headers, data, timeout)"""
+        return (self.url(client), self.headers(client),
+                self.payload(client, system_prompt, messages, stream), self.timeout)
+
+    def warmup_url(self, client) -> Optional[str]:
+        """시작 시 미리 연결할 가벼운 GET 주소 (없으면 None)"""
+        return None
+
+    def parse(self, result: Dict) -> Parsed:
+        raise NotImplementedError
+
+    def parse_event(self, event: Dict) -> Parsed:
+        """스트리밍 이벤트 1개 파싱 (오류 이벤트면 RuntimeError)"""
+        raise NotImplementedError
+
+
+class OpenAICompatibleAdapter(ProviderAdapter):
+    """OpenAI Chat Completions 형식 (OpenAI, vLLM 등 호환 서버)"""
+    path = "/v1/chat/completions"
+
+    def __init__(self, default_base_url: str = "", stream_usage: bool = True):
+        self.default_base_url = default_base_url
+        # 마지막 청크에 usage 포함 요청 (stream_options를 모르는 서버도 있어 선택)
+        self.stream_usage = stream_usage
+
+    def url(self, client) -> str:
+        return self.base_url(client) + self.path
+
+    def warmup_url(self, client) -> Optional[str]:
+        return self.base_url(client) + "/v1/models"
+
+    def headers(self, client) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {client.api_key}", "Content-Type": "application/json"}
+
+    def payload(self, client, system_prompt: str, messages: List[Dict], stream: bool) -> Dict:
+        data = {
+            "model": client.model,
+            "messages": [{"role": "system", "content": system_prompt}] + messages,
+            "temperature": client.temperature
+        }
+        if stream:
+            data["stream"] = True
+            if self.stream_usage:
+                data["stream_options"] = {"include_usage": True}
+        return data
+
+    @staticmethod
+    def _usage(reported: Optional[Dict]) -> Dict[str, int]:
+        # OpenAI는 1024토큰 이상 같은 앞부분을 자동으로 캐시하고 cached_tokens로 알려준다
+        reported = reported or {}
+        details = reported.get("prompt_tokens_details") or {}
+        return usage(reported.get("prompt_tokens"), reported.get("completion_tokens"),
+                     details.get("cached_tokens"))
+
+    def parse(self, result: Dict) -> Parsed:
+        return result["choices"][0]["message"]["content"], self._usage(result.get("usage"))
+
+    def parse_event(self, event: Dict) -> Parsed:
+        if event.get("error"):
+            raise RuntimeError((event["error"] or {}).get("message", "stream error"))
+        choices = event.get("choices") or []
+        text = choices[0].get("delta", {}).get("content") if choices else None
+        return text, self._usage(event.get("usage"))
+
+
+class OpenAIAdapter(OpenAICompatibleAdapter):
+    """OpenAI 공식 API (base_url 무시)"""
+    def base_url(self, client) -> str:
+        return self.default_base_url
+
+
+class AzureOpenAIAdapter(OpenAICompatibleAdapter):
+    """Azure OpenAI (model = 배포 이름, llm.api_version)"""
+    def url(self, client) -> str:
+        api_version = client.settings.get("api_version", "2024-06-01")
+        return f"{self.base_url(client)}/openai/deployments/{client.model}/chat/completions?api-version={api_version}"
+
+    def warmup_url(self, client) -> Optional[str]:
+        return f"{self.base_url(client)}/openai/models?api-version={client.settings.get('api_version', '2024-06-01')}"
+
+    def headers(self, client) -> Dict[str, str]:
+        return {"api-key": client.api_key, "Content-Type": "application/json"}
+
+
+class AnthropicAdapter(ProviderAdapter):
+    """Anthropic Messages API"""
+    default_model = "claude-3-haiku-20240307"
+    version = ANTHROPIC_VERSION
+
+    def url(self, client) -> str:
+        return ANTHROPIC_API_BASE + "/v1/messages"
+
+    def warmup_url(self, client) -> Optional[str]:
+        return ANTHROPIC_API_BASE + "/v1/models"
+
+    def headers(self, client) -> Dict[str, str]:
+        return {"x-api-key": client.api_key, "anthropic-version": self.version,
+                "Content-Type": "application/json"}
+
+    def payload(self, client, system_prompt: str, messages: List[Dict], stream: bool) -> Dict:
+        # Anthropic은 시스템 프롬프트를 messages 밖에 둔다
+        system = system_prompt
+        if client.prompt_cache:
+            # 시스템 프롬프트와 이전 기록 끝에 캐시 구간을 표시해 다음 턴에 그 앞부분을 재사용
+            system = [{"type": "text", "text": system_prompt, "cache_control": EPHEMERAL}]
+            if len(messages) > 1:
+                last = messages[-2]
+                messages = messages[:-2] + [{
+                    "role": last["role"],
+                    "content": [{"type": "text", "text": last["content"], "cache_control": EPHEMERAL}]
+                }, messages[-1]]
+        data = {
+            "model": client.model or self.default_model,
+            "max_tokens": 4096,
+            "system": system,
+            "messages": messages,
+            "temperature": client.temperature
+        }
+        if stream:
+            data["stream"] = True
+        return data
+
+    @staticmethod
+    def _usage(reported: Optional[Dict], output: bool = True) -> Dict[str, int]:
+        # input_tokens에는 캐시에서 읽거나 캐시에 쓴 입력이 빠져 있으므로 더해서 전체 입력으로 맞춘다
+        reported = reported or {}
+        cache_read = reported.get("cache_read_input_tokens") or 0
+        cache_write = reported.get("cache_creation_input_tokens") or 0
+        prompt = (reported.get("input_tokens") or 0) + cache_read + cache_write
+        return usage(prompt, reported.get("output_tokens") if output else None, cache_read, cache_write)
+
+    def parse(self, result: Dict) -> Parsed:
+        return result["content"][0]["text"], self._usage(result.get("usage"))
+
+    def parse_event(self, event: Dict) -> Parsed:
+        kind = event.get("type")
+        if kind == "content_block_delta":
+            return event.get("delta", {}).get("text"), {}
+        if kind == "message_start":
+            # 출력 토큰은 message_delta에서 최종값이 온다
+            return None, self._usage(event.get("message", {}).get("usage"), output=False)
+        if kind == "message_delta":
+            return None, usage(completion=(event.get("usage") or {}).get("output_tokens"))
+        if kind == "error":
+            raise RuntimeError(event.get("error", {}).get("message", "stream error"))
+        return None, {}
+
+
+class OllamaAdapter(ProviderAdapter):
+    """Ollama /api/chat (스트리밍은 줄 단위 JSON)"""
+    default_base_url = "http://localhost:11434"
+    default_model = "llama3.1:8b"
+    timeout = 120.0
+    stream_format = "ndjson"
+
+    def url(self, client) -> str:
+        return self.base_url(client) + "/api/chat"
+
+    def warmup_url(self, client) -> Optional[str]:
+        return self.base_url(client) + "/api/tags"
+
+    def payload(self, client, system_prompt: str, messages: List[Dict], stream: bool) -> Dict:
+        data = {
+            "model": client.model or self.default_model,
+            "messages": [{"role": "system", "content": system_prompt}] + messages,
+            "stream": stream
+        }
+        # 없으면 Ollama 기본값(5분) 뒤에 모델이 내려가 다음 요청이 로드 시간을 기다린다
+        if client.keep_alive is not None:
+            data["keep_alive"] = client.keep_alive
+        return data
+
+    def parse(self, result: Dict) -> Parsed:
+        return result["message"]["content"], usage(result.get("prompt_eval_count"), result.get("eval_count"))
+
+    def parse_event(self, event: Dict) -> Parsed:
+        if event.get("error"):
+            raise RuntimeError(event["error"])
+        text = event.get("message", {}).get("content")
+        if event.get("done"):
+            return text, usage(event.get("prompt_eval_count"), event.get("eval_count"))
+        return text, {}
+
+
+# provider 이름 -> 어댑터 (목록에 없는 이름은 custom으로 처리)
+ADAPTERS: Dict[str, ProviderAdapter] = {}
+
+
+def register_adapter(name: str, adapter: ProviderAdapter) -> ProviderAdapter:
+    ADAPTERS[name] = adapter
+    return adapter
+
+
+def get_adapter(provider: str) -> ProviderAdapter:
+    return ADAPTERS.get(provider) or ADAPTERS["custom"]
+
+
+register_adapter("openai", OpenAIAdapter(OPENAI_API_BASE))
+register_adapter("anthropic", AnthropicAdapter())
+register_adapter("ollama", OllamaAdapter())
+register_adapter("azure", AzureOpenAIAdapter())
+register_adapter("vllm", OpenAICompatibleAdapter("http://localhost:8000"))
+register_adapter("custom", OpenAICompatibleAdapter(stream_usage=False))
+
+message_encoder = MessageEncoder()
@@ -0,0 +1,139 @@
+# Shimplex - 업스트림 장애 대응
+# 지수 백오프 재시도(Retry-After 준수) + 프로바이더별 서킷 브레이커
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import httpx
+
+# 재시도할 HTTP 상태 코드
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 요청을 보내지 않음"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """일시적인 오류인지 (429/5xx/타임아웃/연결 오류)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError))
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 초 단위로 변환"""
+    if not isinstance(error, httpx.HTTPStatusError):
+        return None
+    value = error.response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """지수 백오프 (full jitter)"""
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """attempt번째(0부터) 재시도 전 대기 시간"""
+        hinted = retry_after(error)
+        if hinted is not None:
+            return min(hinted, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """연속 실패가 failure_threshold번 쌓이면 reset_timeout 동안 차단
+
+    차단 시간이 지나면 요청 하나만 시험 삼아 통과시키고(half-open),
+    성공하면 닫고 실패하면 다시 연다.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    @property
+    def blocked(self) -> bool:
+        """지금 요청하면 allow()가 거절할지 (대기열에 들어가기 전 확인용, 시험 요청을 잡지 않는다)"""
+        state = self.state
+        return state == "open" or (state == "half-open" and self.trial)
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial:
+            self.trial = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.trial or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.trial = False
+
+    def release_trial(self):
+        """시험 요청이 성공/실패 기록 없이 끝났을 때(취소, 대기열 오류) 다음 요청이 다시 시험하게 한다"""
+        self.trial = False
+
+    def stats(self) -> dict:
+        return {"state": self.state, "failures": self.failures}
+
+
+class CircuitBreakers:
+    """프로바이더별 서킷 브레이커 (config.json의 resilience)"""
+    def __init__(self, settings: Optional[dict] = None):
+        self.settings = settings or {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                failure_threshold=self.settings.get("failure_threshold", 5),
+                reset_timeout=self.settings.get("reset_timeout", 30.0)
+            )
+            self._breakers[provider] = breaker
+        return breaker
+
+    def stats(self) -> dict:
+        return {provider: breaker.stats() for provider, breaker in self._breakers.items()}
+
+
+def create_retry_policy(settings: Optional[dict] = None) -> RetryPolicy:
+    settings = settings or {}
+    return RetryPolicy(
+        max_retries=settings.get("max_retries", 2),
+        base_delay=settings.get("backoff_base", 0.5),
+        max_delay=settings.get("backoff_max", 8.0)
+    )
@@ -0,0 +1,231 @@
+# Shimplex - LLM 응답 캐시
+# 동일한 프롬프트(프로바이더/모델/온도/시스템 프롬프트/메시지)의 응답을 재사용
+# 메모리(LRU/TTL) + 디스크(SQLite) 2단계
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+
+def make_cache_key(provider: str, model: str, temperature: float,
+                   system_prompt: str, messages: List[Dict]) -> str:
+    """요청 내용을 정규화해 SHA-256 키 생성"""
+    payload = json.dumps(
+        [provider, model, temperature, system_prompt,
+         [[m.get("role", "user"), m.get("content", "")] for m in messages]],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """SQLite 기반 디스크 캐시 (크기 초과 시 오래된 항목부터 삭제)
+
+    전체 크기는 totals 테이블에 트리거로 유지해 저장할 때마다 SUM을 다시 계산하지 않는다.
+    파일에 있으므로 같은 캐시를 쓰는 다른 워커의 저장/삭제도 반영된다.
+    """
+    def __init__(self, path: str, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        # 트리거가 없던 기존 파일은 트리거를 만드는 트랜잭션 안에서 한 번만 합계를 센다
+        self._conn.executescript("""
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+            CREATE TABLE IF NOT EXISTS totals (name TEXT PRIMARY KEY, bytes INTEGER NOT NULL);
+            INSERT OR IGNORE INTO totals (name, bytes) SELECT 'responses', COALESCE(SUM(size), 0) FROM responses;
+            CREATE TRIGGER IF NOT EXISTS responses_inserted AFTER INSERT ON responses BEGIN
+                UPDATE totals SET bytes = bytes + new.size WHERE name = 'responses';
+            END;
+            CREATE TRIGGER IF NOT EXISTS responses_deleted AFTER DELETE ON responses BEGIN
+                UPDATE totals SET bytes = bytes - old.size WHERE name = 'responses';
+            END;
+            CREATE TRIGGER IF NOT EXISTS responses_resized AFTER UPDATE OF size ON responses BEGIN
+                UPDATE totals SET bytes = bytes + new.size - old.size WHERE name = 'responses';
+            END;
+            COMMIT;
+        """)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """(값, 저장 시각 time.time()) 또는 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0], row[1]
+
+    def set(self, key: str, value: str, size: int):
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            # REPLACE는 삭제 트리거를 부르지 않으므로 UPSERT로 크기 변경을 트리거에 알린다
+            self._conn.execute(
+                "INSERT INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (key, value, size, now, now)
+            )
+            if self._total() > self.max_bytes:
+                self._trim()
+
+    def _total(self) -> int:
+        return self._conn.execute("SELECT bytes FROM totals WHERE name = 'responses'").fetchone()[0]
+
+    def _trim(self):
+        # 만료 항목 먼저, 그다음 가장 오래 쓰지 않은 항목부터 삭제
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+        total = self._total()
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """LLM 응답 캐시
+
+    temperature가 0인 요청은 기본으로 캐시하고,
+    그 외에는 cache_nondeterministic 설정이 켜진 경우에만 캐시한다.
+    """
+    def __init__(self, enabled: bool = False, cache_nondeterministic: bool = False,
+                 max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024,
+                 ttl: float = 3600.0, disk: Optional[DiskCache] = None):
+        self.enabled = enabled
+        self.cache_nondeterministic = cache_nondeterministic
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk = disk
+        self._lock = threading.Lock()
+        # key -> (value, size, created_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def cacheable(self, temperature: float) -> bool:
+        if not self.enabled:
+            return False
+        return temperature == 0 or self.cache_nondeterministic
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[2] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    metrics.CACHE_REQUESTS.inc(1, "memory_hit")
+                    return entry[0]
+                self._drop(key)
+        if self.disk is not None:
+            row = self.disk.get(key)
+            if row is not None:
+                value, created_at = row
+                with self._lock:
+                    # 디스크에 저장된 시각부터 ttl을 센다 (메모리로 옮길 때 다시 늘어나지 않도록)
+                    self._put(key, value, now - max(0.0, time.time() - created_at))
+                    self.hits += 1
+                    self.disk_hits += 1
+                metrics.CACHE_REQUESTS.inc(1, "disk_hit")
+                return value
+        with self._lock:
+            self.misses += 1
+        metrics.CACHE_REQUESTS.inc(1, "miss")
+        return None
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            size = self._put(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value, size)
+
+    def _put(self, key: str, value: str, created_at: Optional[float] = None) -> int:
+        """created_at: time.monotonic() 기준 저장 시각 (없으면 지금)"""
+        size = len(value.encode("utf-8"))
+        self._drop(key)
+        if size > self.max_bytes:
+            return size
+        self._entries[key] = (value, size, time.monotonic() if created_at is None else created_at)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+        return size
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._bytes
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+def create_response_cache(settings: Optional[dict] = None) -> ResponseCache:
+    """설정(config.json의 cache)으로 캐시 생성"""
+    settings = settings or {}
+    enabled = bool(settings.get("enabled", False))
+    ttl = settings.get("ttl", 3600.0)
+    disk = None
+    if enabled and settings.get("disk_path"):
+        disk = DiskCache(
+            settings["disk_path"],
+            max_bytes=settings.get("disk_max_bytes", 256 * 1024 * 1024),
+            ttl=ttl
+        )
+    return ResponseCache(
+        enabled=enabled,
+        cache_nondeterministic=bool(settings.get("cache_nondeterministic", False)),
+        max_entries=settings.get("max_entries", 1000),
+        max_bytes=settings.get("max_bytes", 32 * 1024 * 1024),
+        ttl=ttl,
+        disk=disk
+    )
@@ -0,0 +1,369 @@
+# Shimplex - 의미 기반 응답 캐시
+# 표현만 다른 같은 질문을 임베딩 유사도로 찾아 이전 응답을 재사용
+# 벡터는 NumPy 메모리 맵 파일(<path>.npy), 질문/응답/슬롯 정보는 SQLite(<path>.db)에 두고 여러 워커가 공유한다
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+import metrics
+
+# 선택 의존성 (pip install numpy) - 가져오는 데 시간이 걸려 캐시를 켰을 때만 create_semantic_cache()에서 불러온다
+np = None
+
+
+def load_numpy() -> bool:
+    """NumPy를 불러오고 사용 가능 여부 반환"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+        np = numpy
+    return True
+
+
+class Embedder:
+    """텍스트 -> 벡터"""
+    # 색인 파일에 기록해 임베딩 모델이 바뀌면 색인을 새로 만든다
+    name = ""
+
+    async def embed(self, text: str) -> List[float]:
+        raise NotImplementedError
+
+
+class OllamaEmbedder(Embedder):
+    """Ollama /api/embed (nomic-embed-text, bge-m3 등 로컬 임베딩 모델)"""
+    def __init__(self, http: Callable[[str], httpx.AsyncClient], base_url: str = "http://localhost:11434",
+                 model: str = "nomic-embed-text", timeout: float = 5.0):
+        self.http = http
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.name = f"ollama:{model}"
+
+    async def embed(self, text: str) -> List[float]:
+        response = await self.http(self.base_url).post(
+            self.base_url + "/api/embed", json={"model": self.model, "input": text}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["embeddings"][0]
+
+
+class OpenAIEmbedder(Embedder):
+    """OpenAI 호환 /v1/embeddings (OpenAI, vLLM, TEI 등)"""
+    def __init__(self, http: Callable[[str], httpx.AsyncClient], base_url: str = "https://api.openai.com",
+                 api_key: str = "", model: str = "text-embedding-3-small", timeout: float = 5.0):
+        self.http = http
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.name = f"openai:{model}"
+
+    async def embed(self, text: str) -> List[float]:
+        response = await self.http(self.base_url).post(
+            self.base_url + "/v1/embeddings",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={"model": self.model, "input": text},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()["data"][0]["embedding"]
+
+
+# provider 이름 -> 임베더 생성 함수 (settings, http)
+EMBEDDERS: Dict[str, Callable[[dict, Callable[[str], httpx.AsyncClient]], Embedder]] = {}
+
+
+def register_embedder(name: str, factory: Callable[[dict, Callable[[str], httpx.AsyncClient]], Embedder]):
+    EMBEDDERS[name] = factory
+    return factory
+
+
+register_embedder("ollama", lambda settings, http: OllamaEmbedder(
+    http, settings.get("base_url") or "http://localhost:11434",
+    settings.get("model", "nomic-embed-text"), settings.get("timeout", 5.0)))
+register_embedder("openai", lambda settings, http: OpenAIEmbedder(
+    http, settings.get("base_url") or "https://api.openai.com", settings.get("api_key", ""),
+    settings.get("model", "text-embedding-3-small"), settings.get("timeout", 5.0)))
+
+
+def vector_hash(vector) -> str:
+    return hashlib.blake2b(vector.tobytes(), digest_size=8).hexdigest()
+
+
+class VectorIndex:
+    """고정 크기 벡터 색인 (슬롯 = 행 번호)
+
+    벡터는 정규화해 메모리 맵에 쓰므로 유사도는 내적 한 번이고, 파일 전체를 메모리에 올리지 않는다.
+    가득 차면 가장 오래 쓰지 않은 슬롯을 재사용한다. 다른 워커가 바꾼 슬롯은
+    generation 변화로 감지해 슬롯 정보를 다시 읽고, 적중 시 벡터 해시로 한 번 더 확인한다.
+    path가 비어 있으면 메모리에만 둔다.
+    """
+    def __init__(self, path: str, name: str, dim: int, capacity: int, ttl: float):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(f"{path}.db" if path else ":memory:",
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS entries (
+                slot INTEGER PRIMARY KEY,
+                scope TEXT NOT NULL,
+                question TEXT NOT NULL,
+                response TEXT NOT NULL,
+                vector_hash TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at);
+        """)
+        layout = f"{name}:{dim}:{capacity}"
+        vectors_path = f"{path}.npy"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = 'layout'").fetchone()
+                fresh = row is None or row[0] != layout or (path and not os.path.exists(vectors_path))
+                if fresh:
+                    # 임베딩 모델/차원/크기가 바뀌면 기존 벡터는 쓸 수 없다
+                    self._conn.execute("DELETE FROM entries")
+                    self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('layout', ?)", (layout,))
+                    self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('generation', '0')")
+                if not path:
+                    self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+                else:
+                    self._vectors = np.lib.format.open_memmap(
+                        vectors_path, mode="w+" if fresh else "r+", dtype=np.float32, shape=(capacity, dim))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        # 슬롯별 scope 번호 (-1이면 빈 슬롯), 살아 있는 scope -> 번호/슬롯 수
+        self._scope_of = np.full(capacity, -1, dtype=np.int32)
+        self._scope_ids: Dict[str, int] = {}
+        self._scope_slots: Dict[str, int] = {}
+        self._next_scope_id = 0
+        self._generation = -1
+
+    def _sync(self):
+        """다른 워커가 항목을 추가/삭제했으면 슬롯 정보를 다시 읽는다"""
+        with self._lock:
+            generation = int(self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+            if generation == self._generation:
+                return
+            rows = self._conn.execute("SELECT slot, scope FROM entries").fetchall()
+            # 지워진 scope가 남지 않도록 살아 있는 슬롯으로 새로 만든다
+            self._scope_of.fill(-1)
+            self._scope_ids, self._scope_slots, self._next_scope_id = {}, {}, 0
+            for slot, scope in rows:
+                self._assign(slot, scope)
+            self._generation = generation
+
+    def _assign(self, slot: int, scope: str):
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None:
+            scope_id = self._scope_ids[scope] = self._next_scope_id
+            self._next_scope_id += 1
+        self._scope_slots[scope] = self._scope_slots.get(scope, 0) + 1
+        self._scope_of[slot] = scope_id
+
+    def _unassign(self, slot: int, scope: str):
+        self._scope_of[slot] = -1
+        remaining = self._scope_slots.get(scope, 0) - 1
+        if remaining > 0:
+            self._scope_slots[scope] = remaining
+        else:
+            self._scope_slots.pop(scope, None)
+            self._scope_ids.pop(scope, None)
+
+    def search(self, scope: str, vector) -> Tuple[Optional[int], float]:
+        """(가장 비슷한 슬롯, 유사도) - 같은 scope 안에서만"""
+        self._sync()
+        scope_id = self._scope_ids.get(scope)
+        if scope_id is None:
+            return None, 0.0
+        candidates = np.flatnonzero(self._scope_of == scope_id)
+        if not candidates.size:
+            return None, 0.0
+        scores = self._vectors[candidates] @ vector
+        best = int(np.argmax(scores))
+        return int(candidates[best]), float(scores[best])
+
+    def get(self, slot: int, scope: str) -> Optional[Tuple[str, str]]:
+        """(질문, 응답) - 만료됐거나 그사이 다른 워커가 슬롯을 바꿨으면 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT scope, question, response, vector_hash, created_at FROM entries WHERE slot = ?", (slot,)
+            ).fetchone()
+            if row is None or row[0] != scope or row[3] != vector_hash(self._vectors[slot]):
+                return None
+            if now - row[4] > self.ttl:
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE slot = ?", (now, slot))
+        return row[1], row[2]
+
+    def add(self, scope: str, question: str, response: str, vector):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                generation = int(self._conn.execute(
+                    "SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+                removed = self._conn.execute(
+                    "SELECT slot, scope FROM entries WHERE created_at < ?", (now - self.ttl,)).fetchall()
+                self._conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl,))
+                count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                if count >= self.capacity:
+                    # 가장 오래 쓰지 않은 항목 자리를 재사용
+                    lru = self._conn.execute("SELECT slot, scope FROM entries ORDER BY accessed_at LIMIT 1").fetchone()
+                    self._conn.execute("DELETE FROM entries WHERE slot = ?", (lru[0],))
+                    removed.append(lru)
+                slot = self._free_slot()
+                self._vectors[slot] = vector
+                if isinstance(self._vectors, np.memmap):
+                    self._vectors.flush()
+                self._conn.execute(
+                    "INSERT INTO entries (slot, scope, question, response, vector_hash, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (slot, scope, question, response, vector_hash(self._vectors[slot]), now, now)
+                )
+                self._conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if generation == self._generation:
+                # 그사이 다른 워커의 변경이 없었으면 바꾼 슬롯만 반영하고 다시 읽지 않는다
+                for removed_slot, removed_scope in removed:
+                    self._unassign(removed_slot, removed_scope)
+                self._assign(slot, scope)
+                self._generation = generation + 1
+            else:
+                # 다음 검색 때 슬롯 정보를 다시 읽는다
+                self._generation = -1
+
+    def _free_slot(self) -> int:
+        """비어 있는 가장 작은 슬롯"""
+        row = self._conn.execute("SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM entries WHERE slot = 0)").fetchone()
+        if row is not None:
+            return 0
+        return self._conn.execute(
+            "SELECT e.slot + 1 FROM entries e LEFT JOIN entries n ON n.slot = e.slot + 1 "
+            "WHERE n.slot IS NULL ORDER BY e.slot LIMIT 1"
+        ).fetchone()[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SemanticCache:
+    """의미 기반 응답 캐시
+
+    새 메시지를 임베딩해 같은 scope(프로바이더/모델/시스템 프롬프트/이전 대화가 같은 요청)의
+    이전 질문 중 코사인 유사도가 threshold 이상인 것이 있으면 그 응답을 돌려준다.
+    조회마다 최고 유사도를 메트릭으로 남기고 적중은 로그로 출력해 threshold를 조정할 수 있다.
+    """
+    def __init__(self, embedder: Embedder, path: str = "", threshold: float = 0.92,
+                 max_entries: int = 10000, ttl: float = 86400.0):
+        self.embedder = embedder
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # 벡터 차원은 첫 임베딩을 받아야 알 수 있어 그때 색인을 연다
+        self._index: Optional[VectorIndex] = None
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _get_index(self, dim: int) -> VectorIndex:
+        if self._index is None:
+            self._index = VectorIndex(self.path, self.embedder.name, dim, self.max_entries, self.ttl)
+        return self._index
+
+    async def embed(self, message: str):
+        """정규화된 벡터 (임베딩 실패 시 None - 캐시 없이 진행)"""
+        try:
+            vector = np.asarray(await self.embedder.embed(message), dtype=np.float32)
+        except (httpx.HTTPError, KeyError, IndexError, TypeError, ValueError) as e:
+            self.errors += 1
+            print(f"⚠️ 임베딩 실패, 의미 캐시 건너뜀: {e}")
+            return None
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    async def lookup(self, scope: str, message: str) -> tuple:
+        """(캐시된 응답 또는 None, 저장할 때 다시 쓸 벡터 또는 None)"""
+        vector = await self.embed(message)
+        if vector is None:
+            return None, None
+        index = self._get_index(len(vector))
+        slot, similarity = index.search(scope, vector)
+        found = index.get(slot, scope) if slot is not None and similarity >= self.threshold else None
+        metrics.SEMANTIC_SIMILARITY.observe(similarity, "hit" if found else "miss")
+        if found is None:
+            self.misses += 1
+            return None, vector
+        self.hits += 1
+        question, response = found
+        print(f"🔎 의미 캐시 적중 (유사도 {similarity:.3f}): {message[:60]!r} ≈ {question[:60]!r}")
+        return response, vector
+
+    def add(self, scope: str, message: str, response: str, vector):
+        self._get_index(len(vector)).add(scope, message, response, vector)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "embedder": self.embedder.name,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "entries": self._index.count() if self._index is not None else 0
+        }
+
+    def close(self):
+        if self._index is not None:
+            self._index.close()
+
+
+def create_semantic_cache(settings: Optional[dict],
+                          http: Callable[[str], httpx.AsyncClient]) -> Optional[SemanticCache]:
+    """설정(config.json의 semantic_cache)으로 캐시 생성 (꺼져 있거나 NumPy가 없으면 None)"""
+    settings = settings or {}
+    if not settings.get("enabled", False):
+        return None
+    if not load_numpy():
+        print("⚠️ 의미 캐시를 쓰려면 numpy가 필요합니다 (pip install numpy)")
+        return None
+    embedder_settings = settings.get("embedder") or {}
+    factory = EMBEDDERS.get(embedder_settings.get("provider", "ollama"))
+    if factory is None:
+        raise ValueError(f"지원하지 않는 임베더: {embedder_settings.get('provider')}")
+    return SemanticCache(
+        factory(embedder_settings, http),
+        path=settings.get("path", "semantic_cache"),
+        threshold=settings.get("threshold", 0.92),
+        max_entries=settings.get("max_entries", 10000),
+        ttl=settings.get("ttl", 86400.0)
+    )
@@ -0,0 +1,487 @@
+# Shimplex - 세션(대화 기록) 저장소
+# 인터페이스 + 메모리/SQLite 백엔드 + 프로세스 내 LRU/TTL 캐시
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 저장된 역할 이름 -> 프로바이더 공통 역할 (user/assistant)
+ASSISTANT_ROLES = ("assistant", "ai", "bot", "model")
+
+
+def normalize_role(role: Optional[str]) -> str:
+    return "assistant" if role in ASSISTANT_ROLES else "user"
+
+
+class StoredMessage(dict):
+    """저장된 메시지 {"role", "content"} + 저장할 때 센 내용 토큰 수(tokens, 모르면 None)
+
+    dict 그대로 프로바이더 본문에 들어가므로 토큰 수는 키가 아니라 속성으로 둔다.
+    fragment는 요청 본문을 만들 때 처음 직렬화한 JSON 조각 (providers.MessageEncoder가 채움).
+    """
+    __slots__ = ("tokens", "fragment")
+
+    def __init__(self, role: str, content: str, tokens: Optional[int] = None):
+        super().__init__(role=role, content=content)
+        self.tokens = tokens
+        self.fragment: Optional[str] = None
+
+
+def normalize_messages(messages: List[Dict],
+                       count_tokens: Optional[Callable[[str], int]] = None) -> List[StoredMessage]:
+    """저장 시 한 번만 역할 정규화와 토큰 수 계산 - 이후 프로바이더 호출 때는 다시 하지 않는다"""
+    normalized = []
+    for m in messages:
+        content = m.get("content", "")
+        tokens = getattr(m, "tokens", None)
+        if tokens is None and count_tokens is not None:
+            tokens = count_tokens(content)
+        normalized.append(StoredMessage(normalize_role(m.get("role")), content, tokens))
+    return normalized
+
+
+class SessionStore:
+    """세션 저장소 인터페이스
+
+    version은 세션이 바뀔 때마다 1씩 증가하며,
+    캐시가 다른 워커의 변경을 감지하는 데 사용된다.
+    epoch는 저장소가 새로 만들어질 때마다 바뀌는 값이라, version이 처음부터 다시 세어져도
+    (epoch, version)은 겹치지 않는다 (HTTP ETag용).
+    count_tokens를 주면 append 때 메시지별 토큰 수를 한 번 세어 함께 저장한다 (StoredMessage.tokens).
+    """
+    epoch = ""
+    count_tokens: Optional[Callable[[str], int]] = None
+
+    def get(self, session_id: str) -> List[Dict]:
+        raise NotImplementedError
+
+    def version(self, session_id: str) -> int:
+        raise NotImplementedError
+
+    def append(self, session_id: str, messages: List[Dict], max_messages: int = 50) -> int:
+        """메시지 추가 후 최근 max_messages개만 유지, 새 version 반환"""
+        raise NotImplementedError
+
+    def clear(self, session_id: str) -> int:
+        raise NotImplementedError
+
+    def page(self, session_id: str, before: Optional[int] = None, since: Optional[int] = None,
+             limit: int = 50) -> Tuple[List[Dict], bool]:
+        """id가 붙은 메시지 일부 [{"id", "role", "content"}]와 더 있는지 여부
+
+        id는 세션 안에서 계속 증가하므로 정리/요약으로 앞부분이 지워져도 커서로 쓸 수 있다.
+        before: 이 id보다 앞의 최근 limit개 (없으면 가장 최근 limit개), 더 있음 = 더 오래된 메시지
+        since: 이 id 다음의 limit개 (새 메시지만 받을 때), 더 있음 = 더 새로운 메시지
+        """
+        raise NotImplementedError
+
+    def summary(self, session_id: str) -> str:
+        """요약으로 대체된 이전 대화 (없으면 빈 문자열)"""
+        raise NotImplementedError
+
+    def compact(self, session_id: str, summary: str, covered: List[Dict]) -> bool:
+        """앞쪽 메시지 covered를 요약문으로 대체
+
+        요약하는 동안 기록 앞부분이 바뀌었으면(삭제/정리) 적용하지 않고 False.
+        뒤에 새 메시지가 붙은 것은 괜찮다.
+        """
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """저장된 세션 수"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """단일 프로세스용 메모리 저장소"""
+    def __init__(self, count_tokens: Optional[Callable[[str], int]] = None):
+        self.count_tokens = count_tokens
+        self._sessions: Dict[str, List[Dict]] = {}
+        self._summaries: Dict[str, str] = {}
+        self._versions: Dict[str, int] = {}
+        # 세션별 첫 메시지의 id (메시지 id는 1부터 연속)
+        self._offsets: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # 재시작하면 기록과 version이 모두 사라지므로 프로세스마다 새 값
+        self.epoch = os.urandom(4).hex()
+
+    def get(self, session_id: str) -> List[Dict]:
+        return list(self._sessions.get(session_id, []))
+
+    def version(self, session_id: str) -> int:
+        return self._versions.get(session_id, 0)
+
+    def append(self, session_id: str, messages: List[Dict], max_messages: int = 50) -> int:
+        with self._lock:
+            history = self._sessions.get(session_id, []) + normalize_messages(messages, self.count_tokens)
+            self._sessions[session_id] = history[-max_messages:]
+            self._offsets[session_id] = self._offsets.get(session_id, 1) + max(0, len(history) - max_messages)
+            self._versions[session_id] = self._versions.get(session_id, 0) + 1
+            return self._versions[session_id]
+
+    def clear(self, session_id: str) -> int:
+        with self._lock:
+            self._offsets[session_id] = self._offsets.get(session_id, 1) + len(self._sessions.get(session_id, []))
+            self._sessions[session_id] = []
+            self._summaries.pop(session_id, None)
+            self._versions[session_id] = self._versions.get(session_id, 0) + 1
+            return self._versions[session_id]
+
+    def page(self, session_id: str, before: Optional[int] = None, since: Optional[int] = None,
+             limit: int = 50) -> Tuple[List[Dict], bool]:
+        with self._lock:
+            history = self._sessions.get(session_id, [])
+            offset = self._offsets.get(session_id, 1)
+            if since is not None:
+                start = min(max(since + 1 - offset, 0), len(history))
+                end = min(start + limit, len(history))
+                has_more = end < len(history)
+            else:
+                end = len(history) if before is None else min(max(before - offset, 0), len(history))
+                start = max(end - limit, 0)
+                has_more = start > 0
+            return [{"id": offset + i, **m} for i, m in enumerate(history[start:end], start)], has_more
+
+    def summary(self, session_id: str) -> str:
+        return self._summaries.get(session_id, "")
+
+    def compact(self, session_id: str, summary: str, covered: List[Dict]) -> bool:
+        with self._lock:
+            history = self._sessions.get(session_id, [])
+            if not covered or history[:len(covered)] != covered:
+                return False
+            self._sessions[session_id] = history[len(covered):]
+            self._offsets[session_id] = self._offsets.get(session_id, 1) + len(covered)
+            self._summaries[session_id] = summary
+            self._versions[session_id] = self._versions.get(session_id, 0) + 1
+            return True
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite(WAL) 저장소 - 재시작 후에도 유지되고 여러 워커가 공유"""
+    def __init__(self, path: str = "sessions.db", count_tokens: Optional[Callable[[str], int]] = None):
+        self.path = path
+        self.count_tokens = count_tokens
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id);
+        """)
+        self._migrate()
+        self.epoch = self._conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+
+    def _migrate(self):
+        """스키마 버전별 1회성 변환 (PRAGMA user_version)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                schema = self._conn.execute("PRAGMA user_version").fetchone()[0]
+                if schema < 1:
+                    # 예전 버전은 AI 응답을 "ai" 역할로 저장했다
+                    self._conn.execute("UPDATE messages SET role = 'assistant' WHERE role = 'ai'")
+                if schema < 2:
+                    # 요약으로 대체된 이전 대화
+                    self._conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT ''")
+                    self._conn.execute("PRAGMA user_version = 2")
+                if schema < 3:
+                    # 파일을 새로 만들면 바뀌는 값 (워커끼리 공유)
+                    self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+                    self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)",
+                                       (os.urandom(4).hex(),))
+                    self._conn.execute("PRAGMA user_version = 3")
+                if schema < 4:
+                    # 저장할 때 센 토큰 수 (이전 메시지는 NULL이라 읽을 때 센다)
+                    self._conn.execute("ALTER TABLE messages ADD COLUMN tokens INTEGER")
+                    self._conn.execute("PRAGMA user_version = 4")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, session_id: str) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content, tokens FROM messages WHERE session_id = ? ORDER BY id",
+                (session_id,)
+            ).fetchall()
+        return [StoredMessage(role, content, tokens) for role, content, tokens in rows]
+
+    def version(self, session_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, session_id: str) -> int:
+        self._conn.execute(
+            "INSERT INTO sessions (id, version, updated_at) VALUES (?, 1, ?) "
+            "ON CONFLICT(id) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at",
+            (session_id, time.time())
+        )
+        return self._conn.execute(
+            "SELECT version FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()[0]
+
+    def append(self, session_id: str, messages: List[Dict], max_messages: int = 50) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, role, content, tokens) VALUES (?, ?, ?, ?)",
+                    [(session_id, m["role"], m["content"], m.tokens)
+                     for m in normalize_messages(messages, self.count_tokens)]
+                )
+                # 최근 max_messages개만 유지
+                self._conn.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND id NOT IN "
+                    "(SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                    (session_id, session_id, max_messages)
+                )
+                version = self._bump(session_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return version
+
+    def clear(self, session_id: str) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self._conn.execute("UPDATE sessions SET summary = '' WHERE id = ?", (session_id,))
+                version = self._bump(session_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return version
+
+    def page(self, session_id: str, before: Optional[int] = None, since: Optional[int] = None,
+             limit: int = 50) -> Tuple[List[Dict], bool]:
+        # 하나 더 읽어서 다음 페이지가 있는지 확인
+        with self._lock:
+            if since is not None:
+                rows = self._conn.execute(
+                    "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ? ORDER BY id LIMIT ?",
+                    (session_id, since, limit + 1)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT id, role, content FROM messages WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                    (session_id, before if before is not None else 2 ** 63 - 1, limit + 1)
+                ).fetchall()[::-1]
+        has_more = len(rows) > limit
+        if has_more:
+            rows = rows[:limit] if since is not None else rows[1:]
+        return [{"id": id, "role": role, "content": content} for id, role, content in rows], has_more
+
+    def summary(self, session_id: str) -> str:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else ""
+
+    def compact(self, session_id: str, summary: str, covered: List[Dict]) -> bool:
+        if not covered:
+            return False
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, role, content FROM messages WHERE session_id = ? ORDER BY id LIMIT ?",
+                    (session_id, len(covered))
+                ).fetchall()
+                if [{"role": role, "content": content} for _, role, content in rows] != covered:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                self._conn.execute(
+                    "DELETE FROM messages WHERE session_id = ? AND id <= ?", (session_id, rows[-1][0])
+                )
+                self._conn.execute("UPDATE sessions SET summary = ? WHERE id = ?", (summary, session_id))
+                self._bump(session_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedSessionStore(SessionStore):
+    """백엔드 앞단의 LRU/TTL 캐시
+
+    자주 쓰는 세션은 메모리에서 바로 제공하고, 오래 쓰지 않은 세션은
+    ttl 경과 후 제거한다. 캐시 크기는 세션 수와 바이트 수로 제한된다.
+    백엔드 version은 세션마다 check_interval초에 한 번만 비교하므로(조회마다 SQLite를 읽지 않도록)
+    다른 워커의 변경은 최대 check_interval초 늦게 반영된다. 이 워커의 변경은 바로 반영된다.
+    """
+    def __init__(self, backend: SessionStore, max_sessions: int = 1000,
+                 max_bytes: int = 16 * 1024 * 1024, ttl: float = 600.0, check_interval: float = 1.0):
+        self.backend = backend
+        self.epoch = backend.epoch
+        self.count_tokens = backend.count_tokens
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # session_id -> (history, version, size, last_access, summary, checked_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def _size(history: List[Dict]) -> int:
+        # 내용 + 메시지에 붙는 JSON 조각(StoredMessage.fragment) 몫
+        return sum(2 * len(m.get("content", "").encode("utf-8")) + 64 for m in history)
+
+    def _put(self, session_id: str, history: List[Dict], version: int, summary: str = ""):
+        size = self._size(history) + len(summary.encode("utf-8"))
+        self._drop(session_id)
+        if size > self.max_bytes:
+            return
+        now = time.monotonic()
+        self._entries[session_id] = (history, version, size, now, summary, now)
+        self._bytes += size
+        self._evict()
+
+    def _drop(self, session_id: str):
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _evict(self):
+        now = time.monotonic()
+        # 오래 쓰지 않은 세션부터 (OrderedDict 앞쪽이 가장 오래됨)
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            expired = now - entry[3] > self.ttl
+            over = len(self._entries) > self.max_sessions or self._bytes > self.max_bytes
+            if not (expired or over):
+                break
+            self._drop(session_id)
+
+    def _load(self, session_id: str) -> tuple:
+        """(history, summary) - 캐시가 최신이면 캐시에서, 아니면 백엔드에서"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and now - entry[5] < self.check_interval:
+                self._entries[session_id] = entry[:3] + (now, entry[4], entry[5])
+                self._entries.move_to_end(session_id)
+                return entry[0], entry[4]
+        version = self.backend.version(session_id)
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[1] == version:
+                self._entries[session_id] = entry[:3] + (now, entry[4], now)
+                self._entries.move_to_end(session_id)
+                return entry[0], entry[4]
+        history = self.backend.get(session_id)
+        summary = self.backend.summary(session_id)
+        with self._lock:
+            self._put(session_id, history, version, summary)
+        return history, summary
+
+    def get(self, session_id: str) -> List[Dict]:
+        return list(self._load(session_id)[0])
+
+    def summary(self, session_id: str) -> str:
+        return self._load(session_id)[1]
+
+    def version(self, session_id: str) -> int:
+        return self.backend.version(session_id)
+
+    def page(self, session_id: str, before: Optional[int] = None, since: Optional[int] = None,
+             limit: int = 50) -> Tuple[List[Dict], bool]:
+        # 캐시에는 id가 없으므로 백엔드(인덱스 조회)에서 바로 읽는다
+        return self.backend.page(session_id, before, since, limit)
+
+    def append(self, session_id: str, messages: List[Dict], max_messages: int = 50) -> int:
+        # 여기서 센 토큰 수를 백엔드가 그대로 저장하고 캐시에도 넣는다
+        messages = normalize_messages(messages, self.count_tokens)
+        version = self.backend.append(session_id, messages, max_messages)
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[1] == version - 1:
+                # 중간에 다른 워커의 변경이 없었으면 캐시를 그대로 갱신
+                self._put(session_id, (entry[0] + list(messages))[-max_messages:], version, entry[4])
+            else:
+                self._drop(session_id)
+        return version
+
+    def clear(self, session_id: str) -> int:
+        version = self.backend.clear(session_id)
+        with self._lock:
+            self._put(session_id, [], version)
+        return version
+
+    def compact(self, session_id: str, summary: str, covered: List[Dict]) -> bool:
+        compacted = self.backend.compact(session_id, summary, covered)
+        if compacted:
+            with self._lock:
+                self._drop(session_id)
+        return compacted
+
+    def count(self) -> int:
+        return self.backend.count()
+
+    def cached_sessions(self) -> int:
+        return len(self._entries)
+
+    def close(self):
+        self.backend.close()
+
+
+def create_session_store(settings: Optional[dict] = None,
+                         count_tokens: Optional[Callable[[str], int]] = None) -> SessionStore:
+    """설정(config.json의 session)으로 저장소 생성 (count_tokens: 메시지 내용의 토큰 수)"""
+    settings = settings or {}
+    backend_name = settings.get("backend", "sqlite")
+    if backend_name == "memory":
+        return MemorySessionStore(count_tokens)
+    if backend_name != "sqlite":
+        raise ValueError(f"지원하지 않는 세션 저장소: {backend_name}")
+
+    path = settings.get("path", "sessions.db")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    return CachedSessionStore(
+        SQLiteSessionStore(path, count_tokens),
+        max_sessions=settings.get("cache_max_sessions", 1000),
+        max_bytes=settings.get("cache_max_bytes", 16 * 1024 * 1024),
+        ttl=settings.get("cache_ttl", 600.0),
+        check_interval=settings.get("cache_check_interval", 1.0)
+    )
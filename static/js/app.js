@@ -23,56 +23,323 @@ const messageInput = document.getElementById('message-input');
 const sendBtn = document.getElementById('send-btn');
 const clearBtn = document.getElementById('clear-btn');
 
-// 대화 기록
-let chatHistory = [];
+// 대화 기록은 서버가 보관하고 화면에는 불러온 범위만 둔다
+const SESSION_ID = 'default';
+const PAGE_SIZE = 30;
+let olderCursor = null;   // 더 오래된 페이지 커서 (null이면 더 없음)
+let newestId = 0;         // 마지막으로 받은 메시지 id
+let loadingOlder = false;
+
+// 응답 생성 중인 요청 (전송 버튼이 중지 버튼으로 바뀐다)
+let generating = false;
+let activeRequest = null;   // { cancel() }
+
+// WebSocket 채팅 채널 - 연결 하나로 전송/취소/기록 조회 (연결이 안 되면 HTTP API 사용)
+const chatSocket = {
+    ws: null,
+    handlers: new Map(),   // 요청 id -> 프레임 처리 함수
+    nextId: 1,
+    retries: 0,
+    
+    isOpen() {
+        return this.ws !== null && this.ws.readyState === WebSocket.OPEN;
+    },
+    
+    connect() {
+        if (!('WebSocket' in window)) return;
+        const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+        const ws = new WebSocket(`${scheme}://${location.host}/ws/chat?session_id=${encodeURIComponent(SESSION_ID)}`);
+        ws.onopen = () => { this.retries = 0; };
+        ws.onmessage = (event) => {
+            const frame = JSON.parse(event.data);
+            const handler = this.handlers.get(frame.id);
+            if (handler) handler(frame);
+        };
+        ws.onclose = () => {
+            this.ws = null;
+            // 진행 중이던 요청은 실패 처리
+            this.handlers.forEach(handler => handler({ type: 'error', error: '연결이 끊어졌습니다' }));
+            this.handlers.clear();
+            // 그동안은 HTTP API를 쓰고, 점점 간격을 늘려 다시 연결 (최대 30초)
+            const delay = Math.min(30000, 1000 * 2 ** this.retries++);
+            setTimeout(() => this.connect(), delay);
+        };
+        this.ws = ws;
+    },
+    
+    send(frame) {
+        this.ws.send(JSON.stringify(frame));
+    },
+    
+    request(frame, handler) {
+        const id = String(this.nextId++);
+        this.handlers.set(id, handler);
+        this.send({ ...frame, id });
+        return id;
+    },
+    
+    done(id) {
+        this.handlers.delete(id);
+    }
+};
+
+function setGenerating(on) {
+    generating = on;
+    sendBtn.textContent = on ? '중지' : '전송';
+}
 
 async function sendMessage() {
     const message = messageInput.value.trim();
-    if (!message) return;
+    if (!message || generating) return;
     
     addMessage(message, 'user');
     messageInput.value = '';
     
     const loadingId = addMessage('생각 중...', 'loading');
+    const renderer = streamRenderer(loadingId);
+    setGenerating(true);
     
     try {
-        const response = await fetch(`${API_BASE}/api/chat`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ 
-                message,
-                session_id: 'default'
-            })
+        if (chatSocket.isOpen()) {
+            await sendOverSocket(message, renderer);
+        } else {
+            await sendOverHttp(message, renderer);
+        }
+    } catch (error) {
+        if (error.name === 'AbortError') {
+            // 중지 - 받은 데까지만 남긴다
+            renderer.finish();
+        } else {
+            renderer.discard();
+            addMessage('❌ 오류가 발생했습니다: ' + error.message, 'ai');
+        }
+    } finally {
+        activeRequest = null;
+        setGenerating(false);
+    }
+    
+    // 방금 주고받은 메시지는 이미 화면에 있으므로 커서만 옮긴다
+    await fetchNewMessages(false);
+}
+
+// WebSocket으로 전송 (중지하면 서버가 업스트림 호출도 취소)
+function sendOverSocket(message, renderer) {
+    return new Promise((resolve, reject) => {
+        const id = chatSocket.request({ type: 'send', message }, frame => {
+            if (frame.type === 'token') {
+                renderer.push(frame.token);
+                return;
+            }
+            chatSocket.done(id);
+            if (frame.type === 'done') resolve(renderer.finish(frame.response));
+            else if (frame.type === 'cancelled') resolve(renderer.finish());
+            else reject(new Error(frame.error));
         });
+        activeRequest = { cancel: () => chatSocket.isOpen() && chatSocket.send({ type: 'cancel', id }) };
+    });
+}
+
+// HTTP로 전송 (중지하면 연결을 끊어 서버가 업스트림 호출을 취소)
+async function sendOverHttp(message, renderer) {
+    const controller = new AbortController();
+    activeRequest = { cancel: () => controller.abort() };
+    
+    const response = await fetch(`${API_BASE}/api/chat/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ 
+            message,
+            session_id: SESSION_ID
+        }),
+        signal: controller.signal
+    });
+    
+    if (response.ok && response.body) {
+        return readStream(response, renderer);
+    }
+    // 스트리밍 미지원 시 일반 API 사용
+    return renderer.finish(await sendMessageOnce(message));
+}
+
+async function sendMessageOnce(message) {
+    const response = await fetch(`${API_BASE}/api/chat`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ 
+            message,
+            session_id: SESSION_ID
+        })
+    });
+    
+    const data = await response.json();
+    if (!response.ok) throw new Error(data.detail);
+    return data.response;
+}
+
+// 토큰을 받는 대로 AI 메시지에 이어 붙인다
+function streamRenderer(loadingId) {
+    let div = null;
+    let text = '';
+    
+    return {
+        push(token) {
+            if (!div) {
+                this.discard();
+                addMessage('', 'ai');
+                div = chatMessages.lastElementChild;
+            }
+            text += token;
+            div.innerHTML = text.replace(/\n/g, '<br>');
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        },
+        // 전체 응답(full)을 한 번에 받은 경우 토큰 없이 바로 표시
+        finish(full) {
+            const reply = full !== undefined ? full : text;
+            if (!div) {
+                this.discard();
+                addMessage(reply, 'ai');
+            }
+            return reply;
+        },
+        discard() {
+            const loading = document.getElementById(loadingId);
+            if (loading) loading.remove();
+        }
+    };
+}
+
+// SSE 스트림을 읽으며 토큰 단위로 렌더링
+async function readStream(response, renderer) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
         
-        const data = await response.json();
-        
-        document.getElementById(loadingId).remove();
-        addMessage(data.response, 'ai');
-        
-        // 대화 기록 저장
-        chatHistory.push({role: 'user', content: message});
-        chatHistory.push({role: 'ai', content: data.response});
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
         
-    } catch (error) {
-        document.getElementById(loadingId).remove();
-        addMessage('❌ 오류가 발생했습니다: ' + error.message, 'ai');
+        for (const event of events) {
+            const dataLine = event.split('\n').find(line => line.startsWith('data:'));
+            if (!dataLine) continue;
+            const data = JSON.parse(dataLine.slice(5));
+            if (data.error) throw new Error(data.error);
+            if (data.token === undefined) continue;
+            renderer.push(data.token);
+        }
     }
+    
+    return renderer.finish();
 }
 
-function addMessage(text, type) {
+function createMessage(text, type) {
     const div = document.createElement('div');
     div.className = `message ${type}`;
     if (type === 'loading') {
         div.id = 'loading-' + Date.now();
     }
     div.innerHTML = text.replace(/\n/g, '<br>');
+    return div;
+}
+
+function addMessage(text, type) {
+    const div = createMessage(text, type);
     chatMessages.appendChild(div);
     chatMessages.scrollTop = chatMessages.scrollHeight;
     return div.id || null;
 }
 
-sendBtn.addEventListener('click', sendMessage);
+function messageType(role) {
+    return role === 'user' ? 'user' : 'ai';
+}
+
+// 대화 기록 페이지 조회 - WebSocket이 열려 있으면 그쪽으로,
+// 아니면 HTTP (ETag가 있어 바뀌지 않았으면 브라우저 캐시로 304 처리)
+async function fetchHistory(params) {
+    if (chatSocket.isOpen()) {
+        return new Promise((resolve, reject) => {
+            const id = chatSocket.request({ type: 'history', limit: PAGE_SIZE, ...params }, frame => {
+                chatSocket.done(id);
+                if (frame.type === 'history') resolve(frame);
+                else reject(new Error(frame.error));
+            });
+        });
+    }
+    const query = new URLSearchParams({ limit: PAGE_SIZE, ...params });
+    const response = await fetch(`${API_BASE}/api/history/${SESSION_ID}?${query}`);
+    if (!response.ok) throw new Error(`history ${response.status}`);
+    return response.json();
+}
+
+// 처음에는 최근 대화만 불러온다
+async function loadHistory() {
+    try {
+        const page = await fetchHistory({});
+        page.messages.forEach(m => chatMessages.appendChild(createMessage(m.content, messageType(m.role))));
+        olderCursor = page.next_before;
+        newestId = page.next_since;
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    } catch (error) {
+        console.warn('대화 기록 불러오기 실패:', error);
+    }
+}
+
+// 맨 위로 스크롤하면 이전 대화를 한 페이지씩 앞에 붙인다
+async function loadOlderMessages() {
+    if (loadingOlder || olderCursor === null) return;
+    loadingOlder = true;
+    try {
+        const page = await fetchHistory({ before: olderCursor });
+        const anchor = chatMessages.querySelector('.message.system').nextSibling;
+        const previousHeight = chatMessages.scrollHeight;
+        const fragment = document.createDocumentFragment();
+        page.messages.forEach(m => fragment.appendChild(createMessage(m.content, messageType(m.role))));
+        chatMessages.insertBefore(fragment, anchor);
+        // 보고 있던 위치 유지
+        chatMessages.scrollTop += chatMessages.scrollHeight - previousHeight;
+        olderCursor = page.next_before;
+    } catch (error) {
+        console.warn('이전 대화 불러오기 실패:', error);
+    } finally {
+        loadingOlder = false;
+    }
+}
+
+// 마지막으로 받은 이후의 메시지만 조회 (render가 false면 커서만 이동)
+async function fetchNewMessages(render) {
+    try {
+        let page;
+        do {
+            page = await fetchHistory({ since: newestId });
+            if (render) {
+                page.messages.forEach(m => addMessage(m.content, messageType(m.role)));
+            }
+            newestId = page.next_since;
+        } while (page.has_more);
+    } catch (error) {
+        console.warn('새 메시지 확인 실패:', error);
+    }
+}
+
+chatMessages.addEventListener('scroll', () => {
+    if (chatMessages.scrollTop < 40) loadOlderMessages();
+});
+
+// 다른 탭/기기에서 이어진 대화 반영
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'visible') fetchNewMessages(true);
+});
+
+sendBtn.addEventListener('click', () => {
+    if (generating) {
+        if (activeRequest) activeRequest.cancel();
+    } else {
+        sendMessage();
+    }
+});
 messageInput.addEventListener('keypress', (e) => {
     if (e.key === 'Enter') sendMessage();
 });
@@ -82,14 +349,14 @@ clearBtn.addEventListener('click', async () => {
     if (!confirm('대화를 모두 지우시겠습니까?')) return;
     
     try {
-        await fetch(`${API_BASE}/api/history/default`, { method: 'DELETE' });
+        await fetch(`${API_BASE}/api/history/${SESSION_ID}`, { method: 'DELETE' });
         chatMessages.innerHTML = `
             <div class="message system">
                 👋 안녕하세요! Shimplex AI입니다.<br>
                 외부 LLM(OpenAI/Claude/Ollama)에 연결하여 사용하세요.
             </div>
         `;
-        chatHistory = [];
+        olderCursor = null;
     } catch (error) {
         alert('❌ 초기화 실패: ' + error.message);
     }
@@ -164,5 +431,7 @@ document.getElementById('settings-form').addEventListener('submit', async (e) =>
 
 // 초기화
 document.addEventListener('DOMContentLoaded', () => {
+    loadHistory();
     loadSettings();
+    chatSocket.connect();
 });
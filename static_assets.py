@@ -0,0 +1,146 @@
+# Shimplex - 정적 파일 / 메인 페이지 제공
+# 시작 시 파일을 읽어 해시와 압축본(gzip, brotli)을 미리 만들어 두고,
+# 해시가 붙은 주소는 오래 캐시하게 하며 ETag로 304 응답한다
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli  # 선택 의존성 (pip install brotli)
+except ImportError:
+    brotli = None
+
+# 해시가 붙은 주소는 내용이 바뀌면 주소도 바뀌므로 1년 동안 다시 묻지 않는다
+IMMUTABLE = "public, max-age=31536000, immutable"
+# 해시 없는 주소와 메인 페이지는 매번 ETag로 확인 (바뀌지 않았으면 304)
+REVALIDATE = "no-cache"
+# 이보다 작은 파일은 압축 이득이 헤더 비용보다 작다
+MIN_COMPRESS_BYTES = 256
+
+# 선호 순서대로
+COMPRESSORS = {"gzip": lambda body: gzip.compress(body, 9, mtime=0)}
+if brotli is not None:
+    COMPRESSORS = {"br": lambda body: brotli.compress(body, quality=11), **COMPRESSORS}
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Accept-Encoding -> {인코딩: q}"""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+class Asset:
+    """미리 읽고 압축해 둔 응답 본문 1개"""
+    def __init__(self, body: bytes, media_type: str):
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        self.media_type = media_type
+        # 인코딩 -> 본문 (압축해도 작아지지 않으면 원본만)
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            for encoding, compress in COMPRESSORS.items():
+                compressed = compress(body)
+                if len(compressed) < len(body):
+                    self.variants[encoding] = compressed
+        # 인코딩마다 본문이 다르므로 강한 ETag도 달라야 한다
+        self.etags = {
+            encoding: f'"{self.digest}"' if encoding == "identity" else f'"{self.digest}-{encoding}"'
+            for encoding in self.variants
+        }
+
+    def choose_encoding(self, accept_encoding: str) -> str:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in self.variants:
+            if encoding != "identity" and accepted.get(encoding, accepted.get("*", 0)) > 0:
+                return encoding
+        return "identity"
+
+    def not_modified(self, if_none_match: str) -> bool:
+        # 304 판단은 약한 비교 - 어느 인코딩으로 받은 ETag든 내용이 같으면 된다
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()
+                for tag in if_none_match.split(",")}
+        return any(etag in tags for etag in self.etags.values())
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        encoding = self.choose_encoding(request.headers.get("accept-encoding", ""))
+        headers = {"ETag": self.etags[encoding], "Cache-Control": cache_control}
+        if len(self.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if self.not_modified(request.headers.get("if-none-match", "")):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], headers=headers, media_type=self.media_type)
+
+
+def hashed_path(path: str, digest: str) -> str:
+    """css/style.css -> css/style.<해시>.css"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+
+class StaticAssets:
+    """static 디렉터리 전체를 메모리에 올려 두고 제공
+
+    파일을 고치면 재시작해야 반영된다 (해시 주소도 그때 바뀐다).
+    """
+    def __init__(self, directory: str, prefix: str = "/static"):
+        self.prefix = prefix.rstrip("/")
+        self.assets: Dict[str, Asset] = {}
+        # 해시 붙은 경로 -> 원래 경로
+        self._hashed: Dict[str, str] = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                full = os.path.join(root, name)
+                path = os.path.relpath(full, directory).replace(os.sep, "/")
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                with open(full, "rb") as f:
+                    asset = Asset(f.read(), media_type)
+                self.assets[path] = asset
+                self._hashed[hashed_path(path, asset.digest)] = path
+
+    def url(self, path: str) -> str:
+        """템플릿용 해시 주소 (없는 파일이면 원래 주소)"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return f"{self.prefix}/{path}"
+        return f"{self.prefix}/{hashed_path(path, asset.digest)}"
+
+    def lookup(self, path: str) -> Tuple[Optional[Asset], str]:
+        """(Asset, Cache-Control) - 해시 주소면 immutable"""
+        if path in self._hashed:
+            return self.assets[self._hashed[path]], IMMUTABLE
+        return self.assets.get(path), REVALIDATE
+
+    def response(self, request: Request, path: str) -> Response:
+        asset, cache_control = self.lookup(path)
+        if asset is None:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+        return asset.response(request, cache_control)
+
+
+def render_page(template_dir: str, name: str, assets: StaticAssets) -> Asset:
+    """요청마다 달라지는 내용이 없는 템플릿을 한 번만 렌더링 (asset_url()로 해시 주소 사용)"""
+    from jinja2 import Environment, FileSystemLoader
+
+    environment = Environment(loader=FileSystemLoader(template_dir), autoescape=True)
+    html = environment.get_template(name).render(asset_url=assets.url)
+    return Asset(html.encode("utf-8"), "text/html")
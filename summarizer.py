@@ -0,0 +1,93 @@
+# Shimplex - 긴 대화 요약(압축)
+# 세션 기록이 토큰 기준을 넘으면 오래된 대화를 백그라운드에서 요약해 요약문으로 대체한다
+
+import asyncio
+from typing import Callable, Dict, List, Optional
+
+# 요약 요청은 한 세션으로 묶어 사용자 요청과 공정하게 대기열을 나눈다 (토큰 사용량은 요약한 세션에 기록)
+SUMMARY_SESSION_ID = "summary"
+
+SUMMARY_INSTRUCTION = """다음은 사용자와 AI 어시스턴트의 이전 대화입니다.
+이후 대화를 이어가는 데 필요한 사실, 결정 사항, 사용자의 요청과 선호를 빠짐없이 담아 간결하게 요약해주세요.
+요약문만 출력하세요."""
+
+
+def build_summary_prompt(summary: str, messages: List[Dict]) -> str:
+    """기존 요약 + 요약할 대화로 요약 요청문 생성"""
+    parts = [SUMMARY_INSTRUCTION]
+    if summary:
+        parts.append(f"[기존 요약]\n{summary}")
+    lines = "\n".join(
+        f"{'사용자' if m['role'] == 'user' else 'AI'}: {m['content']}" for m in messages
+    )
+    parts.append(f"[대화]\n{lines}")
+    return "\n\n".join(parts)
+
+
+class Compactor:
+    """세션별 백그라운드 요약
+
+    턴 저장 직후 schedule()을 부르면 백그라운드 태스크가 기록을 읽어 threshold_tokens를 넘을 때만
+    요약한다. 사용자 응답은 이미 끝난 뒤라 지연이 늘지 않고, 저장소 읽기/쓰기는 스레드 풀에서 한다.
+    최근 keep_messages개는 원문 그대로 남긴다 (user/assistant 짝이 깨지지 않게 짝수로 맞춤).
+    """
+    def __init__(self, store, count_tokens: Callable[[Dict], int],
+                 threshold_tokens: int = 3000, keep_messages: int = 6):
+        self.store = store
+        self.count_tokens = count_tokens
+        self.threshold_tokens = threshold_tokens
+        self.keep_messages = keep_messages + keep_messages % 2
+        self._running: Dict[str, asyncio.Task] = {}
+        self.compacted = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def needs_compaction(self, history: List[Dict]) -> bool:
+        if len(history) <= self.keep_messages:
+            return False
+        return sum(self.count_tokens(m) for m in history) > self.threshold_tokens
+
+    def schedule(self, session_id: str, client) -> Optional[asyncio.Task]:
+        """요약 태스크 시작 (세션당 하나씩만, 요약할 만큼 길지 않으면 태스크는 False로 끝난다)"""
+        if session_id in self._running:
+            return None
+        task = asyncio.create_task(self._compact(session_id, client))
+        self._running[session_id] = task
+        task.add_done_callback(lambda _: self._running.pop(session_id, None))
+        return task
+
+    async def _compact(self, session_id: str, client) -> bool:
+        loop = asyncio.get_running_loop()
+        history, previous = await loop.run_in_executor(
+            None, lambda: (self.store.get(session_id), self.store.summary(session_id)))
+        if not self.needs_compaction(history):
+            return False
+        # keep_messages가 0이면 [:-0]이 빈 목록이 되므로 길이로 자른다
+        covered = history[:len(history) - self.keep_messages]
+        try:
+            prompt = build_summary_prompt(previous, covered)
+            summary = (await client.chat(prompt, None, SUMMARY_SESSION_ID, usage_session=session_id)).strip()
+        except Exception as e:
+            self.failed += 1
+            print(f"⚠️ 대화 요약 실패 ({session_id}): {e}")
+            return False
+        if not summary or not await loop.run_in_executor(None, self.store.compact, session_id, summary, covered):
+            # 요약하는 동안 기록이 지워졌거나 다른 워커가 먼저 요약함
+            self.skipped += 1
+            return False
+        self.compacted += 1
+        return True
+
+    async def aclose(self):
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._running),
+            "compacted": self.compacted,
+            "skipped": self.skipped,
+            "failed": self.failed
+        }
@@ -19,7 +19,7 @@ run_test() {
     local endpoint=$2
     
     echo -n "테스트: $name ... "
-    if curl -s "$BASE_URL$endpoint" > /dev/null 2>&1; then
+    if curl -sf "$BASE_URL$endpoint" > /dev/null 2>&1; then
         echo -e "${GREEN}✅ PASS${NC}"
         ((TEST_PASSED++))
     else
@@ -32,18 +32,19 @@ echo "1️⃣ 서버 상태 확인"
 echo "─────────────────────"
 run_test "Health Check" "/api/health"
 run_test "Config API" "/api/config"
+run_test "Metrics" "/metrics"
 
 echo ""
-echo "2️⃣ 데이터 API 테스트"
+echo "2️⃣ 대화 기록 API 테스트"
 echo "─────────────────────"
-run_test "Units API" "/api/units"
-run_test "Unit Detail" "/api/units/PINE-201"
-run_test "Summary API" "/api/summary/2026-01"
+run_test "History API" "/api/history/default"
 
 echo ""
 echo "3️⃣ 웹 UI 테스트"
 echo "─────────────────────"
 run_test "Main Page" "/"
+run_test "Static JS" "/static/js/app.js"
+run_test "Static CSS" "/static/css/style.css"
 
 echo ""
 echo "══════════════════════════"
@@ -59,5 +60,6 @@ if [ $TEST_FAILED -eq 0 ]; then
 else
     echo -e "${RED}⚠️ 일부 테스트 실패${NC}"
     echo "   서버가 실행 중인지 확인: python app.py"
+    echo "   처리량/지연 측정: python benchmark.py"
     exit 1
 fi
@@ -0,0 +1,86 @@
+# Shimplex 테스트 공통 준비
+# 가짜 LLM 서버(mock_llm.py)를 별도 프로세스로 띄우고, 임시 디렉터리의 설정으로 앱을 만든다
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def start_mock():
+    """start_mock(latency=..., token_rate=..., error_rate=...) -> 가짜 LLM 서버 주소 (프로세스는 start_mock.procs)"""
+    procs = []
+
+    def start(**options) -> str:
+        port = free_port()
+        args = [sys.executable, os.path.join(ROOT, "mock_llm.py"), "--port", str(port)]
+        for name, value in options.items():
+            args += ["--" + name.replace("_", "-"), str(value)]
+        procs.append(subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                httpx.get(url + "/v1/models", timeout=1.0)
+                return url
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    start.procs = procs
+    yield start
+    for proc in procs:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+@pytest.fixture
+def make_client(tmp_path, monkeypatch):
+    """make_client(설정) -> TestClient (저장소/캐시 파일은 tmp_path에)"""
+    from fastapi.testclient import TestClient
+
+    import app as appmod
+
+    clients = []
+
+    def make(settings: dict) -> TestClient:
+        data = {
+            "app": {"warmup": False, "config_watch_interval": 0},
+            "session": {"path": str(tmp_path / "sessions.db")},
+            "cache": {"disk_path": str(tmp_path / "cache.db")},
+            "usage": {"path": str(tmp_path / "usage.db")},
+            "semantic_cache": {"path": str(tmp_path / "semantic_cache")},
+            "resilience": {"max_retries": 0}
+        }
+        for section, values in settings.items():
+            if isinstance(values, dict):
+                data.setdefault(section, {}).update(values)
+            else:
+                data[section] = values
+        path = tmp_path / "config.json"
+        path.write_text(json.dumps(data), encoding="utf-8")
+        monkeypatch.setattr(appmod, "CONFIG_FILE", str(path))
+        client = TestClient(appmod.create_app())
+        client.__enter__()
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.__exit__(None, None, None)
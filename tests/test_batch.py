@@ -0,0 +1,89 @@
+import pytest
+
+import batch
+
+
+@pytest.mark.parametrize("body", [{"prompts": "abc"}, "abc", {"prompts": [{"message": 1}]}, {"prompts": [{}]}])
+def test_chat_batch_rejects_malformed_prompts(make_client, body):
+    client = make_client({})
+    assert client.post("/api/chat/batch", json=body).status_code == 400
+
+
+def test_parse_prompts_accepts_strings_objects_and_jsonl():
+    prompts = batch.parse_prompts(["hi", {"id": "x", "message": "there"}, '{"message": "json"}', '"quoted"', ""])
+    assert prompts == [{"id": "0", "message": "hi"}, {"id": "x", "message": "there"},
+                       {"id": "2", "message": "json"}, {"id": "3", "message": "quoted"}]
+    with pytest.raises(ValueError):
+        batch.parse_prompts("abc")
+
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic"])
+def test_native_batch_against_mock(start_mock, make_client, provider):
+    import app as appmod
+
+    url = start_mock()
+    client = make_client({"llm": {"provider": provider, "api_key": "x"}})
+    prompts = batch.parse_prompts(["first", "second"])
+
+    async def run():
+        llm = appmod.get_llm_client()
+        return [r async for r in batch.run_native_batch(llm, prompts, url, poll_interval=0.01)]
+
+    results = client.portal.call(run)
+    assert sorted(r["id"] for r in results) == ["0", "1"]
+    assert all(r.get("response") for r in results)
+    usage = client.get("/api/usage", params={"session_id": batch.BATCH_SESSION_ID}).json()
+    assert usage["total"]["requests"] == 2 and usage["total"]["completion"] > 0
+
+
+def test_batch_concurrency_is_capped_and_does_not_starve_interactive(start_mock, make_client):
+    import asyncio
+    import json
+
+    import app as appmod
+
+    url = start_mock(latency=0.3)
+    client = make_client({
+        "llm": {"provider": "custom", "base_url": url, "api_key": "x"},
+        "limits": {"max_concurrency": 2, "max_queue": 1, "batch_max_queue": 2, "queue_timeout": 30}
+    })
+    response = client.post("/api/chat/batch?concurrency=500", json=[f"p{i}" for i in range(12)])
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert len(results) == 12 and not [r for r in results if "error" in r]
+
+    async def batch_with_interactive():
+        llm = appmod.get_llm_client()
+        prompts = batch.parse_prompts([f"q{i}" for i in range(8)])
+
+        async def run():
+            return [r async for r in batch.run_batch(llm, prompts, appmod.batch_concurrency(llm, 500))]
+
+        running = asyncio.ensure_future(run())
+        await asyncio.sleep(0.1)
+        # 배치가 슬롯을 모두 쓰는 중에도 대화 요청은 자기 대기열 자리를 얻는다
+        reply = await llm.chat("interactive", None, "user")
+        return reply, await running
+
+    reply, results = client.portal.call(batch_with_interactive)
+    assert reply and not [r for r in results if "error" in r]
+
+
+def test_session_queue_budget_is_separate():
+    import asyncio
+
+    from limiter import FairLimiter, QueueFullError
+
+    async def scenario():
+        limiter = FairLimiter(max_concurrency=1, max_queue=1, session_queues={"batch": 1})
+        await limiter.acquire("a")
+        waiters = [asyncio.ensure_future(limiter.acquire("batch")), asyncio.ensure_future(limiter.acquire("b"))]
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await limiter.acquire("batch")
+        with pytest.raises(QueueFullError):
+            await limiter.acquire("c")
+        for _ in waiters:
+            limiter.release()
+        await asyncio.gather(*waiters)
+
+    asyncio.run(scenario())
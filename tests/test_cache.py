@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def cached_app(start_mock, make_client):
+    import app as appmod
+
+    url = start_mock()
+    client = make_client({
+        "llm": {"provider": "custom", "base_url": url, "api_key": "x", "temperature": 0},
+        "cache": {"enabled": True}
+    })
+    return client, appmod, url
+
+
+def test_cache_write_failure_still_returns_response(cached_app, monkeypatch):
+    client, appmod, _ = cached_app
+
+    def broken_set(key, value):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(appmod.response_cache, "set", broken_set)
+    response = client.post("/api/chat", json={"message": "hi", "session_id": "s"})
+    assert response.status_code == 200 and response.json()["response"]
+
+
+def test_semantic_cache_skips_internal_sessions(start_mock, make_client):
+    import httpx
+
+    import app as appmod
+    from summarizer import SUMMARY_SESSION_ID
+
+    url = start_mock()
+    client = make_client({
+        "llm": {"provider": "custom", "base_url": url, "api_key": "x"},
+        "semantic_cache": {"enabled": True, "embedder": {"provider": "ollama", "base_url": url}}
+    })
+
+    def upstream_requests() -> int:
+        return httpx.get(url + "/_stats").json()["requests"]
+
+    async def ask(session_id: str):
+        return await appmod.get_llm_client().chat("summarize this conversation", None, session_id)
+
+    for session_id in ("user", "user"):
+        client.portal.call(ask, session_id)
+    assert upstream_requests() == 1
+    # 요약은 같은 질문이라도 의미 캐시를 거치지 않는다
+    client.portal.call(ask, SUMMARY_SESSION_ID)
+    assert upstream_requests() == 2
+
+
+def test_cache_requests_exported_as_counter(cached_app):
+    client, _, _ = cached_app
+    # 기록이 없는 두 세션의 같은 질문 -> 두 번째는 캐시 적중
+    for session_id in ("s1", "s2"):
+        assert client.post("/api/chat", json={"message": "same", "session_id": session_id}).status_code == 200
+    text = client.get("/metrics").text
+    assert "# TYPE shimplex_response_cache_requests_total counter" in text
+    samples = dict(line.rsplit(" ", 1) for line in text.splitlines()
+                   if line.startswith("shimplex_response_cache_requests_total{"))
+    assert float(samples['shimplex_response_cache_requests_total{result="memory_hit"}']) >= 1
+    assert float(samples['shimplex_response_cache_requests_total{result="miss"}']) >= 1
+
+
+def test_disk_cache_keeps_running_total(tmp_path):
+    from response_cache import DiskCache
+
+    path = str(tmp_path / "cache.db")
+    disk = DiskCache(path, max_bytes=100, ttl=3600)
+    other_worker = DiskCache(path, max_bytes=100, ttl=3600)
+
+    def actual() -> int:
+        return disk._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    disk.set("a", "x" * 30, 30)
+    other_worker.set("b", "y" * 30, 30)
+    disk.set("a", "x" * 10, 10)  # 같은 키를 다시 저장하면 크기 차이만 반영
+    assert disk._total() == actual() == 40
+    disk.set("c", "z" * 70, 70)  # 100을 넘으면 가장 오래 쓰지 않은 항목부터 삭제
+    assert disk._total() == actual() <= 100
+    assert disk.get("c")[0] == "z" * 70
+
+
+def test_disk_hit_keeps_original_created_at(tmp_path):
+    import time
+
+    from response_cache import DiskCache, ResponseCache
+
+    disk = DiskCache(str(tmp_path / "cache.db"), max_bytes=1000, ttl=10)
+    disk.set("k", "cached", 6)
+    disk._conn.execute("UPDATE responses SET created_at = ?", (time.time() - 8,))
+    cache = ResponseCache(enabled=True, ttl=10, disk=disk)
+    assert cache.get("k") == "cached"
+    # 메모리로 옮겨도 디스크에 저장된 지 8초 지난 항목이라 2초 남짓만 남는다
+    assert time.monotonic() - cache._entries["k"][2] >= 8
@@ -0,0 +1,68 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def coalescing_app(start_mock, make_client):
+    import app as appmod
+
+    url = start_mock(latency=0.5)
+    client = make_client({"llm": {"provider": "custom", "base_url": url, "api_key": "x"}})
+    return client, appmod, url
+
+
+def upstream_requests(url: str) -> int:
+    return httpx.get(url + "/_stats").json()["requests"]
+
+
+def test_concurrent_identical_prompts_share_one_upstream_call(coalescing_app):
+    client, appmod, url = coalescing_app
+
+    async def ask_together():
+        llm = appmod.get_llm_client()
+        return await asyncio.gather(*(llm.chat("same question", None, f"s{i}") for i in range(3)))
+
+    replies = client.portal.call(ask_together)
+    assert len(set(replies)) == 1 and replies[0]
+    assert upstream_requests(url) == 1
+
+    # 다른 질문은 합치지 않는다
+    async def ask_different():
+        llm = appmod.get_llm_client()
+        return await asyncio.gather(llm.chat("one", None, "a"), llm.chat("two", None, "b"))
+
+    client.portal.call(ask_different)
+    assert upstream_requests(url) == 3
+
+
+def test_concurrent_identical_streams_share_one_upstream_call(coalescing_app):
+    client, appmod, url = coalescing_app
+
+    async def stream_together():
+        llm = appmod.get_llm_client()
+
+        async def collect(session_id: str) -> str:
+            return "".join([token async for token in llm.chat_stream("same stream", None, session_id)])
+
+        return await asyncio.gather(collect("a"), collect("b"))
+
+    first, second = client.portal.call(stream_together)
+    assert first == second and first
+    assert upstream_requests(url) == 1
+
+
+def test_coalesce_can_be_disabled(start_mock, make_client):
+    import app as appmod
+
+    url = start_mock(latency=0.5)
+    client = make_client({"llm": {"provider": "custom", "base_url": url, "api_key": "x"},
+                          "cache": {"coalesce": False}})
+
+    async def ask_together():
+        llm = appmod.get_llm_client()
+        return await asyncio.gather(*(llm.chat("same question", None, f"s{i}") for i in range(2)))
+
+    client.portal.call(ask_together)
+    assert upstream_requests(url) == 2
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+import app as appmod
+
+
+@pytest.mark.parametrize("llm", ["oops", {"temperature": "hot"}, {"fallback": "x"}, {"fallback": ["x"]},
+                                 {"instances": [1]}, {"model": 3}])
+def test_invalid_llm_config_is_rejected_before_saving(make_client, llm):
+    client = make_client({})
+    with open(appmod.CONFIG_FILE, encoding="utf-8") as f:
+        before = f.read()
+    version = appmod.config.version
+
+    response = client.post("/api/config", json={"llm": llm})
+    assert response.status_code == 400
+    with open(appmod.CONFIG_FILE, encoding="utf-8") as f:
+        assert f.read() == before
+    assert appmod.config.version == version
+    # 이후 요청은 기존 설정으로 계속 처리된다
+    assert client.get("/api/config").status_code == 200
+    assert client.post("/api/chat", json={"message": "hi", "session_id": "s"}).status_code != 500
+
+
+def test_valid_llm_config_is_saved_and_applied(make_client):
+    client = make_client({})
+    response = client.post("/api/config", json={"llm": {"provider": "anthropic", "model": "claude-3-haiku-20240307",
+                                                         "fallback": [{"provider": "openai"}]}})
+    assert response.status_code == 200
+    with open(appmod.CONFIG_FILE, encoding="utf-8") as f:
+        assert json.load(f)["llm"]["provider"] == "anthropic"
+    assert appmod.get_llm_client().provider == "anthropic"
+    assert [c.provider for c in appmod.get_llm_client().fallbacks] == ["openai"]
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+from context_window import ContextBuilder, TokenCounter
+from providers import AnthropicAdapter, EPHEMERAL
+
+
+def test_trimmed_prefix_stays_stable_and_is_marked_for_anthropic_cache():
+    builder = ContextBuilder(TokenCounter(lambda text: len(text)), max_tokens=200, reserve_tokens=0, trim_chunk=4)
+    client = SimpleNamespace(prompt_cache=True, model="claude", temperature=0)
+    adapter = AnthropicAdapter()
+    history = []
+    bodies = []
+    for turn in range(12):
+        message = f"질문 {turn:02d} " + "x" * 10
+        window = builder.window("claude", "system", message, history)
+        bodies.append(adapter.payload(client, "system", window + [{"role": "user", "content": message}], False))
+        history += [{"role": "user", "content": message}, {"role": "assistant", "content": f"답 {turn:02d} " + "y" * 10}]
+
+    starts = [body["messages"][0]["content"] for body in bodies]
+    trimmed = [turn for turn in range(1, 12) if starts[turn] != starts[turn - 1]]
+    # 예산을 넘은 뒤에도 턴마다가 아니라 4개(2턴) 단위로만 앞부분이 바뀐다
+    assert trimmed and all(b - a >= 2 for a, b in zip(trimmed, trimmed[1:]))
+    for body in bodies:
+        assert body["messages"][0]["role"] == "user"
+        assert body["system"][0]["cache_control"] == EPHEMERAL
+        if len(body["messages"]) > 1:
+            assert body["messages"][-2]["content"][0]["cache_control"] == EPHEMERAL
+    # 시작점이 그대로인 다음 턴 요청은 이전 턴에 표시한 구간까지 앞부분이 같다
+    for turn in range(1, 12):
+        if turn in trimmed:
+            continue
+        previous, current = bodies[turn - 1]["messages"], bodies[turn]["messages"]
+        cached = [m["content"] if isinstance(m["content"], str) else m["content"][0]["text"] for m in previous[:-1]]
+        assert [m["content"] for m in current[:len(cached)]] == cached
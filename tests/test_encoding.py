@@ -0,0 +1,54 @@
+import json
+
+from providers import MessageEncoder
+
+
+def test_encoder_reuses_fragments_of_stored_messages():
+    from session_store import normalize_messages
+
+    encoder = MessageEncoder()
+    history = normalize_messages([{"role": "user", "content": "안녕" * 10}, {"role": "ai", "content": "x" * 40}])
+    messages = history + [{"role": "user", "content": "새 질문"}]
+    data = {"model": "m", "messages": messages}
+    assert json.loads(encoder.encode(data)) == data
+    assert all(m.fragment is not None for m in history)
+    # 다음 턴에는 저장된 메시지의 조각을 다시 만들지 않는다
+    history[0].fragment = '{"role":"user","content":"cached"}'
+    assert json.loads(encoder.encode(data))["messages"][0]["content"] == "cached"
+    assert json.loads(encoder.encode({"messages": []})) == {"messages": []}
+
+
+def test_token_counter_caches_by_hash():
+    from context_window import TokenCounter, approx_tokens
+
+    calls = []
+    counter = TokenCounter(lambda text: calls.append(text) or len(text), max_entries=2)
+    assert counter.count("a" * 10) == 10 and counter.count("a" * 10) == 10
+    assert len(calls) == 1 and all(len(key) == 16 for key in counter._counts)
+    counter.count("b")
+    counter.count("c")
+    assert len(counter._counts) == 2
+    assert TokenCounter().count("hello world") == approx_tokens("hello world")
+
+
+def test_window_sums_token_counts_stored_at_append(tmp_path):
+    from context_window import ContextBuilder, TokenCounter
+    from session_store import CachedSessionStore, SQLiteSessionStore
+
+    calls = []
+    counter = TokenCounter(lambda text: calls.append(text) or len(text))
+    store = CachedSessionStore(SQLiteSessionStore(str(tmp_path / "sessions.db"), counter.count))
+    store.append("s", [{"role": "user", "content": "a" * 10}, {"role": "ai", "content": "b" * 20}])
+    assert len(calls) == 2
+
+    history = store.get("s")
+    assert [m.tokens for m in history] == [10, 20]
+    # 프로바이더 본문에는 role/content만 들어간다
+    assert json.loads(json.dumps(history)) == [{"role": "user", "content": "a" * 10},
+                                              {"role": "assistant", "content": "b" * 20}]
+    builder = ContextBuilder(counter, max_tokens=100, reserve_tokens=0)
+    assert builder.window("m", "", "", history) == history
+    # 캐시를 거치지 않고 백엔드에서 읽어도 저장된 값을 쓴다
+    assert [m.tokens for m in store.backend.get("s")] == [10, 20]
+    assert builder.window("m", "", "", store.backend.get("s")) == history
+    assert calls.count("a" * 10) == 1 and calls.count("b" * 20) == 1
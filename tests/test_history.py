@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from session_store import CachedSessionStore, MemorySessionStore, SQLiteSessionStore
+
+
+def test_history_etag_includes_store_epoch(make_client):
+    import app as appmod
+
+    client = make_client({"session": {"backend": "memory"}})
+    first = client.get("/api/history/s")
+    assert first.headers["etag"] == f'W/"{appmod.session_store.epoch}-0"'
+    assert client.get("/api/history/s", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+    appmod.session_store.append("s", [{"role": "user", "content": "hi"}])
+    assert client.get("/api/history/s", headers={"If-None-Match": first.headers["etag"]}).status_code == 200
+
+
+def test_store_epoch(tmp_path):
+    # 메모리 저장소는 재시작하면 version이 0부터 다시 세어지므로 epoch가 달라야 한다
+    assert MemorySessionStore().epoch != MemorySessionStore().epoch
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path)
+    epoch = store.epoch
+    store.close()
+    # 같은 파일은 재시작/다른 워커에서도 같은 epoch
+    assert SQLiteSessionStore(path).epoch == epoch
+    assert SQLiteSessionStore(str(tmp_path / "other.db")).epoch != epoch
+
+
+def test_cached_store_checks_backend_version_at_most_once_per_interval(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = CachedSessionStore(SQLiteSessionStore(path), check_interval=0.2)
+    other_worker = SQLiteSessionStore(path)
+    checks = []
+    version = store.backend.version
+    store.backend.version = lambda session_id: checks.append(session_id) or version(session_id)
+
+    store.append("s", [{"role": "user", "content": "hi"}])
+    store.get("s")
+    checks.clear()
+    for _ in range(5):
+        assert len(store.get("s")) == 1 and store.summary("s") == ""
+    assert checks == []
+
+    other_worker.append("s", [{"role": "assistant", "content": "hello"}])
+    assert len(store.get("s")) == 1
+    time.sleep(0.25)
+    # 간격이 지나면 version을 한 번 확인해 다른 워커의 변경을 반영
+    assert len(store.get("s")) == 2 and checks == ["s"]
+
+
+def test_store_io_runs_off_the_event_loop(start_mock, make_client):
+    import app as appmod
+
+    url = start_mock()
+    client = make_client({"llm": {"provider": "custom", "base_url": url, "api_key": "x"}})
+    loop_thread = client.portal.call(threading.get_ident)
+    store = appmod.session_store.backend
+    threads = []
+    for name in ("get", "summary", "version", "append", "page", "clear"):
+        def spy(*args, _method=getattr(store, name), **kwargs):
+            threads.append(threading.get_ident())
+            return _method(*args, **kwargs)
+        setattr(store, name, spy)
+
+    assert client.post("/api/chat", json={"message": "hi", "session_id": "s"}).status_code == 200
+    assert len(client.get("/api/history/s").json()["messages"]) == 2
+    assert client.delete("/api/history/s").status_code == 200
+    assert threads and loop_thread not in threads
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_history_cursor_paging(make_client, backend):
+    import app as appmod
+
+    client = make_client({"session": {"backend": backend, "max_messages": 8}})
+    # 10개를 넣으면 max_messages로 앞의 2개가 지워지지만 id는 이어진다
+    appmod.session_store.append("s", [{"role": "user", "content": f"m{i}"} for i in range(10)], max_messages=8)
+
+    latest = client.get("/api/history/s", params={"limit": 3}).json()
+    assert [m["content"] for m in latest["messages"]] == ["m7", "m8", "m9"]
+    assert latest["has_more"] and latest["next_since"] == latest["messages"][-1]["id"]
+
+    pages = [latest["messages"]]
+    page = latest
+    while page["has_more"]:
+        page = client.get("/api/history/s", params={"before": page["next_before"], "limit": 3}).json()
+        pages.insert(0, page["messages"])
+    contents = [m["content"] for messages in pages for m in messages]
+    ids = [m["id"] for messages in pages for m in messages]
+    assert contents == [f"m{i}" for i in range(2, 10)]
+    assert ids == sorted(ids) and len(set(ids)) == 8 and page["next_before"] is None
+
+    # since는 새 메시지만, 더 없으면 커서를 그대로 돌려준다
+    appmod.session_store.append("s", [{"role": "assistant", "content": "new"}], max_messages=8)
+    newer = client.get("/api/history/s", params={"since": latest["next_since"]}).json()
+    assert [m["content"] for m in newer["messages"]] == ["new"] and not newer["has_more"]
+    empty = client.get("/api/history/s", params={"since": newer["next_since"]}).json()
+    assert empty["messages"] == [] and empty["next_since"] == newer["next_since"]
+
+
+def test_history_etag_changes_with_each_write(make_client):
+    import app as appmod
+
+    client = make_client({"session": {"backend": "sqlite"}})
+    first = client.get("/api/history/s").headers["etag"]
+    assert first.startswith(f'W/"{appmod.session_store.epoch}-')
+    # 여러 태그 중 하나라도 맞으면 304
+    assert client.get("/api/history/s", headers={"If-None-Match": f'W/"other", {first}'}).status_code == 304
+    appmod.session_store.append("s", [{"role": "user", "content": "hi"}])
+    second = client.get("/api/history/s")
+    assert second.status_code == 200 and second.headers["etag"] != first
+    assert client.delete("/api/history/s").status_code == 200
+    third = client.get("/api/history/s", headers={"If-None-Match": second.headers["etag"]})
+    assert third.status_code == 200 and third.json()["messages"] == []
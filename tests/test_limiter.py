@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from limiter import FairLimiter, QueueFullError
+
+
+def test_light_session_is_not_starved_by_busy_session():
+    async def scenario():
+        limiter = FairLimiter(max_concurrency=1, max_queue=100, max_session_queue=5)
+        order = []
+
+        async def request(session_id: str, name: str):
+            async with limiter.slot(session_id):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        tasks = [asyncio.ensure_future(request("busy", f"busy{i}")) for i in range(6)]
+        await asyncio.sleep(0)
+        # busy0이 실행 중이고 5개가 대기 -> 세션 한도에 걸려 더 넣을 수 없다
+        with pytest.raises(QueueFullError):
+            await limiter.acquire("busy")
+        tasks.append(asyncio.ensure_future(request("light", "light")))
+        await asyncio.gather(*tasks)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(scenario())
+    # 나중에 온 가벼운 세션도 busy 대기열 전체를 기다리지 않고 다음 차례에 실행된다
+    assert order.index("light") <= 2
+    assert stats["rejected"] == 1 and stats["active"] == 0 and stats["queued"] == 0
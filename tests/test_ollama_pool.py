@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+
+from conftest import free_port
+from ollama_pool import OllamaPool
+
+
+def run_with_pool(coro_fn):
+    async def main():
+        async with httpx.AsyncClient() as http:
+            pool = OllamaPool(lambda url: http, keep_warm_interval=0, load_timeout=5.0)
+            try:
+                return await coro_fn(pool)
+            finally:
+                await pool.aclose()
+    return asyncio.run(main())
+
+
+def test_preload_falls_back_to_next_instance(start_mock):
+    live = start_mock()
+    dead = f"http://127.0.0.1:{free_port()}"
+
+    async def scenario(pool):
+        results = await pool.preload([([dead, live], "mock", "10m")])
+        assert results[0]["status"] == "ok" and results[0]["instance"] == live
+        assert not pool.instance(dead).healthy
+        # 장애 인스턴스는 다음 배치에서 뒤로 밀린다
+        results = await pool.preload([([dead, live], "mock", "10m"), ([dead, live], "other", "10m")])
+        assert [r["instance"] for r in results] == [live, live]
+    run_with_pool(scenario)
+
+
+def test_keep_warm_replaces_model_from_unhealthy_instance(start_mock):
+    first, second = start_mock(), start_mock()
+
+    async def scenario(pool):
+        results = await pool.preload([([first, second], "mock", "10m")])
+        assert results[0]["instance"] == first
+        # 배치된 인스턴스가 죽으면 keep-warm이 다른 인스턴스로 옮긴다
+        start_mock.procs[0].terminate()
+        start_mock.procs[0].wait(timeout=10)
+        results = await pool.keep_warm()
+        assert results[0]["status"] == "ok" and results[0]["instance"] == second
+        assert not pool.instance(first).healthy
+        assert pool.instance(first).assigned == 0 and pool.instance(second).assigned == 1
+    run_with_pool(scenario)
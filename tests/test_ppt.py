@@ -0,0 +1,49 @@
+import pytest
+
+import create_ppt
+from create_ppt import INTRO_DECK, validate_deck
+
+
+def section_deck(**section) -> dict:
+    return {"slides": [{"layout": "sections", "sections": [dict({"heading": "h"}, **section)]}]}
+
+
+@pytest.mark.parametrize("deck", [
+    section_deck(height="2"),
+    section_deck(height=True),
+    section_deck(height=0),
+    section_deck(height=100),
+    section_deck(lines="one line"),
+    section_deck(lines=["ok", 3]),
+    {"slides": [{"layout": "list", "title": 1}]},
+    {"slides": [{"layout": "grid", "items": [{"heading": ["x"]}]}]},
+    {"slides": [{"layout": "list", "items": ["x"]}]},
+    {"slides": [{"layout": "nope"}]},
+    {"slides": []},
+])
+def test_validate_deck_rejects(deck):
+    with pytest.raises(ValueError):
+        validate_deck(deck)
+
+
+def test_validate_deck_accepts_intro_and_numbers():
+    validate_deck(INTRO_DECK)
+    validate_deck(section_deck(height=3, lines=["a", "b"], code=True))
+    validate_deck(section_deck(height=1.5))
+
+
+@pytest.fixture
+def ppt_client(make_client):
+    if create_ppt.Presentation is None:
+        pytest.skip("python-pptx가 없습니다")
+    return make_client({"ppt": {"workers": 1}})
+
+
+def test_api_ppt_returns_400_for_bad_deck(ppt_client):
+    assert ppt_client.post("/api/ppt", json=section_deck(height="2")).status_code == 400
+    assert ppt_client.post("/api/ppt", json={"decks": [INTRO_DECK, section_deck(lines="x")]}).status_code == 400
+
+
+def test_api_ppt_renders_deck(ppt_client):
+    response = ppt_client.post("/api/ppt", json=INTRO_DECK)
+    assert response.status_code == 200 and response.content[:2] == b"PK"
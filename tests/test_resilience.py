@@ -0,0 +1,150 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from resilience import CircuitBreaker
+
+
+def half_open(breaker: CircuitBreaker):
+    breaker.failures = breaker.failure_threshold
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+
+
+def test_breaker_opens_after_threshold_and_closes_on_trial_success():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    half_open(breaker)
+    assert breaker.allow()
+    assert breaker.blocked and not breaker.allow()  # 시험 요청은 하나만
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    half_open(breaker)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.trial
+
+
+@pytest.fixture
+def slow_app(start_mock, make_client):
+    import app as appmod
+
+    url = start_mock(latency=1)
+    client = make_client({
+        "llm": {"provider": "custom", "base_url": url, "api_key": "x"},
+        "limits": {"max_concurrency": 1, "max_queue": 0}
+    })
+    return client, appmod, appmod.circuit_breakers.get("custom")
+
+
+def test_cancelled_half_open_trial_is_released(slow_app):
+    client, appmod, breaker = slow_app
+    half_open(breaker)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(appmod.get_llm_client().chat("hi", None, "s"))
+        await asyncio.sleep(0.3)
+        assert breaker.trial
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # 업스트림 호출은 합치기(coalesce) 태스크에서 돌므로 그 태스크의 취소 처리를 기다린다
+        await asyncio.sleep(0.1)
+
+    client.portal.call(cancel_trial)
+    assert not breaker.trial
+    assert client.post("/api/chat", json={"message": "again", "session_id": "s"}).status_code == 200
+    assert breaker.state == "closed"
+
+
+def test_closed_stream_trial_is_released(slow_app):
+    client, appmod, breaker = slow_app
+    half_open(breaker)
+
+    async def abandon_stream():
+        stream = appmod.get_llm_client().chat_stream("hi", None, "s")
+        task = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.3)
+        assert breaker.trial
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # 업스트림 호출은 합치기(coalesce) 태스크에서 돌므로 그 태스크의 취소 처리를 기다린다
+        await asyncio.sleep(0.1)
+        await stream.aclose()
+
+    client.portal.call(abandon_stream)
+    assert not breaker.trial
+
+
+def test_queue_full_does_not_take_trial(slow_app):
+    client, appmod, breaker = slow_app
+
+    async def scenario():
+        # 슬롯을 차지한 느린 요청 (브레이커가 닫혀 있을 때 시작)
+        busy = asyncio.ensure_future(appmod.get_llm_client().chat("busy", None, "a"))
+        await asyncio.sleep(0.3)
+        half_open(breaker)
+        with pytest.raises(appmod.QueueFullError):
+            await appmod.get_llm_client().chat("queued", None, "b")
+        assert not breaker.trial
+        await busy
+
+    client.portal.call(scenario)
+    assert breaker.allow()
+
+
+def status_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://upstream/v1/chat/completions")
+    return httpx.HTTPStatusError(f"{status}", request=request, response=httpx.Response(status, request=request))
+
+
+def test_only_provider_errors_count_as_breaker_failures(slow_app, monkeypatch):
+    client, appmod, breaker = slow_app
+    errors = [status_error(400), status_error(413), KeyError("choices"), status_error(503)]
+
+    async def failing_dispatch(self, prompt, session_id="default"):
+        raise errors.pop(0)
+
+    monkeypatch.setattr(appmod.LLMClient, "_dispatch", failing_dispatch)
+    for i in range(3):
+        with pytest.raises(appmod.LLMError):
+            client.portal.call(appmod.get_llm_client().chat, f"bad {i}", None, "s")
+    # 잘못된 요청/응답 파싱 오류는 프로바이더 장애가 아니다
+    assert breaker.failures == 0
+    with pytest.raises(appmod.LLMError):
+        client.portal.call(appmod.get_llm_client().chat, "down", None, "s")
+    assert breaker.failures == 1
+
+
+def test_backoff_sleeps_outside_the_limiter_slot(slow_app, monkeypatch):
+    client, appmod, breaker = slow_app
+    limiter = appmod.provider_limiters.get("custom")
+    monkeypatch.setattr(appmod.retry_policy, "max_retries", 1)
+    monkeypatch.setattr(appmod.retry_policy, "delay", lambda attempt, error: 0.5)
+    calls = []
+
+    async def flaky_dispatch(self, prompt, session_id="default"):
+        calls.append(limiter.active)
+        if len(calls) == 1:
+            raise status_error(503)
+        return "ok"
+
+    monkeypatch.setattr(appmod.LLMClient, "_dispatch", flaky_dispatch)
+
+    async def scenario():
+        task = asyncio.ensure_future(appmod.get_llm_client().chat("retry", None, "s"))
+        await asyncio.sleep(0.2)
+        # 백오프 중에는 슬롯이 비어 다른 요청이 쓸 수 있다
+        assert calls == [1] and limiter.active == 0
+        return await task
+
+    assert client.portal.call(scenario) == "ok"
+    assert calls == [1, 1] and breaker.failures == 0
@@ -0,0 +1,42 @@
+import pytest
+
+import semantic_cache
+
+if not semantic_cache.load_numpy():
+    pytest.skip("numpy가 없습니다", allow_module_level=True)
+
+np = semantic_cache.np
+
+
+def unit(seed: int, dim: int = 8):
+    vector = np.random.default_rng(seed).random(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_scope_map_stays_bounded_and_adds_do_not_resync(tmp_path):
+    index = semantic_cache.VectorIndex(str(tmp_path / "sc"), "test", 8, capacity=5, ttl=3600)
+    index.search("none", unit(0))
+    for i in range(50):
+        vector = unit(i)
+        index.add(f"scope-{i}", f"q{i}", f"a{i}", vector)
+        # 이 워커의 추가는 바꾼 슬롯만 반영하므로 다음 검색이 전체를 다시 읽지 않는다
+        assert index._generation != -1
+        slot, score = index.search(f"scope-{i}", vector)
+        assert slot is not None and score > 0.99
+        assert index.get(slot, f"scope-{i}") == (f"q{i}", f"a{i}")
+    assert len(index._scope_ids) == 5 and len(index._scope_slots) == 5
+    assert index.search("scope-0", unit(0)) == (None, 0.0)
+
+
+def test_changes_from_another_worker_trigger_resync(tmp_path):
+    path = str(tmp_path / "sc")
+    first = semantic_cache.VectorIndex(path, "test", 8, capacity=4, ttl=3600)
+    second = semantic_cache.VectorIndex(path, "test", 8, capacity=4, ttl=3600)
+    first.add("a", "q", "r", unit(1))
+    assert first.search("a", unit(1))[0] is not None
+    second.add("b", "q2", "r2", unit(2))
+    first.add("c", "q3", "r3", unit(3))
+    # 다른 워커가 넣은 항목도 보인다
+    slot, _ = first.search("b", unit(2))
+    assert first.get(slot, "b") == ("q2", "r2")
+    assert set(first._scope_ids) == {"a", "b", "c"}
@@ -0,0 +1,15 @@
+def test_index_has_single_charset(make_client):
+    client = make_client({})
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.headers["content-type"].lower().count("charset") == 1
+
+
+def test_static_supports_head(make_client):
+    client = make_client({})
+    html = client.get("/").text
+    path = html.split('href="/static/', 1)[1].split('"', 1)[0]
+    get = client.get("/static/" + path)
+    head = client.head("/static/" + path)
+    assert get.status_code == head.status_code == 200
+    assert head.headers["etag"] == get.headers["etag"] and head.content == b""
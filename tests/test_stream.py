@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+
+from mock_llm import REPLY as MOCK_REPLY
+
+
+def sse_events(text: str) -> list:
+    """SSE 본문 -> [(이벤트 이름, 데이터)]"""
+    events = []
+    for block in text.strip().split("\n\n"):
+        name, data = "message", None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                name = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((name, data))
+    return events
+
+
+def test_stream_sends_tokens_then_done_and_saves_turn(start_mock, make_client):
+    url = start_mock()
+    client = make_client({"llm": {"provider": "custom", "base_url": url, "api_key": "x"}})
+    response = client.post("/api/chat/stream", json={"message": "안녕", "session_id": "sse"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    tokens = [data["token"] for name, data in events if name == "message"]
+    name, done = events[-1]
+    assert name == "done" and tokens and done["response"] == "".join(tokens) == MOCK_REPLY + " "
+    messages = client.get("/api/history/sse").json()["messages"]
+    assert [m["content"] for m in messages] == ["안녕", done["response"]]
+
+
+def test_stream_error_event_is_not_saved(start_mock, make_client):
+    url = start_mock(error_rate=1)
+    client = make_client({"llm": {"provider": "custom", "base_url": url, "api_key": "x"}})
+    response = client.post("/api/chat/stream", json={"message": "안녕", "session_id": "sse"})
+    name, data = sse_events(response.text)[-1]
+    assert name == "error" and data["error"]
+    assert client.get("/api/history/sse").json()["messages"] == []
+
+
+def test_client_disconnect_cancels_upstream_and_saves_partial_reply(start_mock, make_client):
+    import app as appmod
+
+    url = start_mock(token_rate=10)
+    client = make_client({"llm": {"provider": "custom", "base_url": url, "api_key": "x"}})
+    limiter = appmod.provider_limiters.get("custom")
+    body = json.dumps({"message": "길게", "session_id": "gone"}).encode("utf-8")
+
+    async def disconnect_after_first_token():
+        first_token = asyncio.Event()
+        chunks = []
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await first_token.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                chunks.append(message["body"].decode("utf-8"))
+                first_token.set()
+
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+                 "scheme": "http", "path": "/api/chat/stream", "raw_path": b"/api/chat/stream",
+                 "query_string": b"", "root_path": "", "server": ("testserver", 80), "client": ("test", 1),
+                 "headers": [(b"content-type", b"application/json"),
+                             (b"content-length", str(len(body)).encode())]}
+        start = time.monotonic()
+        await client.app(scope, receive, send)
+        # 업스트림 스트림도 닫혀 슬롯이 비어야 한다 (전체 응답은 약 1.2초)
+        while limiter.active and time.monotonic() - start < 5:
+            await asyncio.sleep(0.02)
+        return chunks, limiter.active, time.monotonic() - start
+
+    chunks, active, elapsed = client.portal.call(disconnect_after_first_token)
+    assert chunks and active == 0 and elapsed < 1.0
+    assert appmod.stream_flights.stats()["in_flight"] == 0
+    messages = client.get("/api/history/gone").json()["messages"]
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert messages[0]["content"] == "길게"
+    assert 0 < len(messages[1]["content"]) < len(MOCK_REPLY)
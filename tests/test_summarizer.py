@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from session_store import MemorySessionStore
+from summarizer import Compactor
+
+
+class FakeClient:
+    def __init__(self):
+        self.prompts = []
+
+    async def chat(self, message, history, session_id, usage_session=None):
+        self.prompts.append(message)
+        return "요약"
+
+
+def turns(n: int):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"메시지 {i}"} for i in range(n)]
+
+
+@pytest.mark.parametrize("keep, left", [(0, 0), (2, 2), (3, 4)])
+def test_compact_keeps_recent_messages(keep, left):
+    store = MemorySessionStore()
+    store.append("s", turns(6))
+    compactor = Compactor(store, lambda m: 100, threshold_tokens=10, keep_messages=keep)
+
+    async def run():
+        return await compactor.schedule("s", FakeClient())
+
+    assert asyncio.run(run()) is True
+    assert store.get("s") == turns(6)[6 - left:]
+    assert store.summary("s") == "요약"
+    assert compactor.stats()["compacted"] == 1
@@ -0,0 +1,114 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def chat(client, message: str, session_id: str):
+    return client.post("/api/chat", json={"message": message, "session_id": session_id})
+
+
+def test_requests_per_minute_rejects_with_retry_after(start_mock, make_client):
+    url = start_mock()
+    client = make_client({
+        "llm": {"provider": "custom", "base_url": url, "api_key": "x"},
+        "quota": {"enabled": True, "requests_per_minute": 2, "exempt": ["admin"]}
+    })
+    assert [chat(client, f"q{i}", "s").status_code for i in range(2)] == [200, 200]
+    response = chat(client, "q2", "s")
+    assert response.status_code == 429 and 0 < int(response.headers["Retry-After"]) <= 60
+    # 다른 세션과 예외 세션은 영향 없음
+    assert chat(client, "q3", "other").status_code == 200
+    assert all(chat(client, f"a{i}", "admin").status_code == 200 for i in range(3))
+
+
+def test_tokens_per_day_counts_recorded_usage(start_mock, make_client):
+    url = start_mock()
+    client = make_client({
+        "llm": {"provider": "custom", "base_url": url, "api_key": "x"},
+        "quota": {"enabled": True, "tokens_per_day": 1000, "sessions": {"small": {"tokens_per_day": 1}}}
+    })
+    assert chat(client, "hello", "small").status_code == 200
+    response = chat(client, "hello again", "small")
+    assert response.status_code == 429 and int(response.headers["Retry-After"]) > 0
+    assert chat(client, "hello", "big").status_code == 200
+
+    usage = client.get("/api/usage", params={"session_id": "small"}).json()
+    assert usage["total"]["requests"] == 1 and usage["total"]["completion"] > 0
+    assert usage["quota"]["tokens_per_day"] == 1 and usage["quota"]["tokens_today"] >= 1
+
+
+def test_batch_cli_flushes_usage(start_mock, tmp_path):
+    url = start_mock()
+    config_file = tmp_path / "config.json"
+    usage_db = tmp_path / "usage.db"
+    config_file.write_text(json.dumps({
+        "llm": {"provider": "custom", "base_url": url, "api_key": "x"},
+        "session": {"path": str(tmp_path / "sessions.db")},
+        "cache": {"disk_path": str(tmp_path / "cache.db")},
+        "usage": {"path": str(usage_db), "flush_interval": 3600}
+    }), encoding="utf-8")
+    prompts = tmp_path / "prompts.jsonl"
+    prompts.write_text('"first"\n"second"\n', encoding="utf-8")
+
+    subprocess.run([sys.executable, os.path.join(ROOT, "app.py"), "batch", str(prompts)],
+                   cwd=str(tmp_path), env=dict(os.environ, SHIMPLEX_CONFIG=str(config_file)),
+                   check=True, capture_output=True, timeout=60)
+    with sqlite3.connect(str(usage_db)) as conn:
+        assert conn.execute("SELECT SUM(requests) FROM usage WHERE session_id = 'batch'").fetchone()[0] == 2
+
+
+def test_summary_usage_is_billed_to_compacted_session(start_mock, make_client):
+    import time
+
+    import app as appmod
+
+    url = start_mock()
+    client = make_client({
+        "llm": {"provider": "custom", "base_url": url, "api_key": "x"},
+        "summary": {"enabled": True, "threshold_tokens": 10, "keep_messages": 2}
+    })
+    for i in range(2):
+        assert chat(client, f"long question {i} " * 20, "long").status_code == 200
+    deadline = time.monotonic() + 10
+    while appmod.compactor.compacted == 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert appmod.compactor.compacted >= 1
+
+    rows = client.get("/api/usage", params={"group_by": "session_id"}).json()["rows"]
+    requests = {row["session_id"]: row["requests"] for row in rows}
+    assert "summary" not in requests and requests["long"] >= 3
+
+
+def test_tokens_today_is_cached_and_updated_on_record(tmp_path):
+    import time
+
+    from usage_meter import UsageMeter
+
+    path = str(tmp_path / "usage.db")
+    meter = UsageMeter(path, flush_interval=0.3)
+    other_worker = UsageMeter(path, flush_interval=0.3)
+    queries = []
+    conn = meter._conn
+
+    class CountingConnection:
+        def execute(self, sql, *args):
+            queries.append(sql)
+            return conn.execute(sql, *args)
+
+    meter._conn = CountingConnection()
+    assert meter.tokens_today("s") == 0 and len(queries) == 1
+    meter.record("s", "custom", "m", {"prompt": 10, "completion": 5})
+    meter.record("s", "custom", "m", {"prompt": 1, "completion": 1})
+    assert meter.tokens_today("s") == 17 and len(queries) == 1
+
+    other_worker.record("s", "custom", "m", {"prompt": 100})
+    other_worker.flush()
+    assert meter.tokens_today("s") == 17
+    time.sleep(0.35)
+    # flush_interval이 지나면 한 번 다시 읽어 다른 워커 사용량을 반영
+    assert meter.tokens_today("s") == 117 and len(queries) == 2
+    meter._conn = conn
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from mock_llm import REPLY as MOCK_REPLY
+
+
+@pytest.fixture
+def ws_app(start_mock, make_client):
+    url = start_mock()
+    return make_client({"llm": {"provider": "custom", "base_url": url, "api_key": "x"}})
+
+
+def receive(ws) -> dict:
+    return json.loads(ws.receive_text())
+
+
+def test_send_streams_tokens_and_saves_history(ws_app):
+    with ws_app.websocket_connect("/ws/chat?session_id=ws") as ws:
+        ws.send_text(json.dumps({"type": "send", "id": "1", "message": "안녕"}))
+        tokens = []
+        while True:
+            frame = receive(ws)
+            assert frame["id"] == "1"
+            if frame["type"] != "token":
+                break
+            tokens.append(frame["token"])
+        assert frame["type"] == "done" and tokens and frame["response"] == "".join(tokens)
+
+        ws.send_text(json.dumps({"type": "history", "id": "2", "limit": 10}))
+        history = receive(ws)
+        assert history["type"] == "history" and history["id"] == "2"
+        assert [(m["role"], m["content"]) for m in history["messages"]] == [
+            ("user", "안녕"), ("assistant", frame["response"])]
+        assert not history["has_more"] and history["next_since"] == history["messages"][-1]["id"]
+
+        ws.send_text(json.dumps({"type": "ping", "id": "3"}))
+        assert receive(ws) == {"type": "pong", "id": "3"}
+    # HTTP API에서도 같은 기록이 보인다
+    assert len(ws_app.get("/api/history/ws").json()["messages"]) == 2
+
+
+@pytest.mark.parametrize("frame, error", [
+    ("not json", "잘못된 프레임"),
+    ("[1, 2]", "잘못된 프레임"),
+    (json.dumps({"type": "send", "id": "1", "message": "  "}), "message가 필요합니다"),
+    (json.dumps({"type": "history", "id": "1", "before": "abc"}), "잘못된 history 요청"),
+    (json.dumps({"type": "launch", "id": "1"}), "알 수 없는 type: launch"),
+])
+def test_invalid_frames_get_error_reply_and_connection_stays_open(ws_app, frame, error):
+    with ws_app.websocket_connect("/ws/chat?session_id=bad") as ws:
+        ws.send_text(frame)
+        reply = receive(ws)
+        assert reply["type"] == "error" and reply["error"] == error
+        ws.send_text(json.dumps({"type": "ping", "id": "after"}))
+        assert receive(ws) == {"type": "pong", "id": "after"}
+
+
+def test_cancel_stops_generation_and_keeps_partial_reply(start_mock, make_client):
+    url = start_mock(token_rate=10)
+    client = make_client({"llm": {"provider": "custom", "base_url": url, "api_key": "x"}})
+    with client.websocket_connect("/ws/chat?session_id=cancel") as ws:
+        ws.send_text(json.dumps({"type": "send", "id": "1", "message": "길게"}))
+        first = receive(ws)
+        assert first["type"] == "token"
+        ws.send_text(json.dumps({"type": "cancel", "id": "1"}))
+        frames = [receive(ws)]
+        while frames[-1]["type"] == "token":
+            frames.append(receive(ws))
+        assert frames[-1] == {"type": "cancelled", "id": "1"}
+    messages = client.get("/api/history/cancel").json()["messages"]
+    assert messages[0]["content"] == "길게"
+    assert messages[1]["content"].startswith(first["token"]) and len(messages[1]["content"]) < len(MOCK_REPLY)
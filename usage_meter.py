@@ -0,0 +1,288 @@
+# Shimplex - 토큰 사용량 집계 + 세션별 할당량
+# 요청 경로에서는 메모리 카운터만 올리고, 주기적으로 SQLite에 합산해 기록한다
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+# 집계 항목 (SQLite 컬럼 순서와 같음)
+FIELDS = ("requests", "prompt", "completion", "cache_read", "cache_write")
+# /api/usage에서 묶을 수 있는 기준
+GROUP_KEYS = ("day", "session_id", "provider", "model")
+
+
+class QuotaExceededError(Exception):
+    """세션 할당량 초과"""
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def today() -> str:
+    """집계/하루 한도 기준 날짜 (UTC)"""
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def seconds_until_tomorrow() -> float:
+    return 86400 - time.time() % 86400
+
+
+class UsageMeter:
+    """(날짜, 세션, 프로바이더, 모델)별 요청 수와 토큰 사용량
+
+    record()는 dict에 더하기만 하고, flush()가 쌓인 값을 기존 행에 더하므로
+    여러 워커가 같은 파일을 써도 된다. 프로세스가 비정상 종료되면 마지막 flush 이후 집계는 잃는다.
+    세션별 오늘 토큰 합계는 메모리에 두고 record() 때 더하며, 다른 워커 집계를 반영하려고
+    flush_interval초마다 한 번만 SQLite에서 다시 읽는다.
+    """
+    def __init__(self, path: str = "usage.db", flush_interval: float = 10.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        # (날짜, 세션) -> (프로바이더, 모델) -> FIELDS 순서의 카운터
+        self._pending: Dict[Tuple[str, str], Dict[Tuple[str, str], List[int]]] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS usage (
+                session_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                prompt INTEGER NOT NULL DEFAULT 0,
+                completion INTEGER NOT NULL DEFAULT 0,
+                cache_read INTEGER NOT NULL DEFAULT 0,
+                cache_write INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (session_id, day, provider, model)
+            )
+        """)
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        # (날짜, 세션) -> [오늘 입력+출력 토큰, SQLite에서 읽은 시각]
+        self._totals: Dict[Tuple[str, str], list] = {}
+
+    def record(self, session_id: str, provider: str, model: str, usage: Dict[str, int]):
+        """업스트림 호출 1건과 보고된 토큰 사용량 (prompt/completion/cache_read/cache_write)"""
+        models = self._pending.setdefault((today(), session_id), {})
+        counts = models.get((provider, model))
+        if counts is None:
+            counts = models[(provider, model)] = [0] * len(FIELDS)
+        counts[0] += 1
+        for i, field in enumerate(FIELDS[1:], 1):
+            counts[i] += usage.get(field, 0)
+        total = self._totals.get((today(), session_id))
+        if total is not None:
+            total[0] += usage.get("prompt", 0) + usage.get("completion", 0)
+
+    def tokens_today(self, session_id: str) -> int:
+        """오늘 세션이 쓴 입력+출력 토큰 (다른 워커 집계는 그 워커의 flush와 이 워커의 재조회 이후 반영)"""
+        key = (today(), session_id)
+        now = time.monotonic()
+        total = self._totals.get(key)
+        if total is not None and now - total[1] < self.flush_interval:
+            return total[0]
+        pending = sum(c[1] + c[2] for c in self._pending.get(key, {}).values())
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(prompt + completion), 0) FROM usage WHERE session_id = ? AND day = ?",
+                (session_id, key[0])
+            ).fetchone()
+        if len(self._totals) > 10000:
+            # 재조회할 때가 지난 세션(어제 것 포함) 정리
+            self._totals = {k: v for k, v in self._totals.items() if now - v[1] < self.flush_interval}
+        self._totals[key] = [row[0] + pending, now]
+        return row[0] + pending
+
+    def flush(self) -> int:
+        """쌓인 집계를 SQLite에 더하고 반영한 행 수 반환"""
+        pending, self._pending = self._pending, {}
+        rows = [(session_id, day, provider, model, *counts)
+                for (day, session_id), models in pending.items()
+                for (provider, model), counts in models.items()]
+        if not rows:
+            return 0
+        updates = ", ".join(f"{field} = {field} + excluded.{field}" for field in FIELDS)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT INTO usage (session_id, day, provider, model, {', '.join(FIELDS)}) "
+                    f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    f"ON CONFLICT(session_id, day, provider, model) DO UPDATE SET {updates}",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                # 다음 flush 때 다시 시도
+                for key, models in pending.items():
+                    for model_key, counts in models.items():
+                        merged = self._pending.setdefault(key, {}).setdefault(model_key, [0] * len(FIELDS))
+                        for i, value in enumerate(counts):
+                            merged[i] += value
+                raise
+        self.flushes += 1
+        return len(rows)
+
+    def report(self, since: str, session_id: Optional[str] = None, provider: Optional[str] = None,
+               model: Optional[str] = None, group_by: Tuple[str, ...] = ("session_id", "provider", "model")) -> List[Dict]:
+        """since(YYYY-MM-DD) 이후 사용량을 group_by 기준으로 합산 (조회 전에 flush)"""
+        self.flush()
+        where, params = ["day >= ?"], [since]
+        for column, value in (("session_id", session_id), ("provider", provider), ("model", model)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        columns = ", ".join(group_by)
+        sums = ", ".join(f"SUM({field})" for field in FIELDS)
+        query = f"SELECT {columns + ', ' if columns else ''}{sums} FROM usage WHERE {' AND '.join(where)}"
+        if columns:
+            query += f" GROUP BY {columns} ORDER BY SUM(prompt + completion) DESC"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(zip(group_by + FIELDS, (value or 0 for value in row))) for row in rows
+                if row[len(group_by)] is not None]
+
+    def start(self):
+        """주기적 flush 시작"""
+        if self.flush_interval and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"⚠️ 사용량 기록 실패: {e}")
+
+    async def aclose(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        try:
+            self.flush()
+        finally:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "pending_sessions": len(self._pending),
+            "cached_totals": len(self._totals),
+            "flushes": self.flushes
+        }
+
+
+class SessionQuotas:
+    """세션별 하루 토큰 한도(tokens_per_day)와 분당 요청 수 한도(requests_per_minute)
+
+    업스트림을 부르기 전에 확인해 넘으면 QuotaExceededError. mode가 queue면 분당 요청 한도는
+    max_wait초 안에 자리가 나는 경우 기다렸다가 보낸다 (하루 토큰 한도는 기다려도 풀리지 않아 항상 거절).
+    분당 요청 수는 워커 메모리에서 세므로 워커가 N개면 세션당 최대 N배까지 통과한다
+    (정확한 할당량이 아니라 한 세션의 과도한 요청을 늦추는 용도). 하루 토큰 한도는 usage.db로 워커끼리 공유한다.
+    """
+    def __init__(self, meter: UsageMeter, settings: dict):
+        self.meter = meter
+        self.tokens_per_day = settings.get('tokens_per_day', 0)
+        self.requests_per_minute = settings.get('requests_per_minute', 0)
+        self.mode = settings.get('mode', 'reject')
+        self.max_wait = settings.get('max_wait', 10)
+        self.exempt = set(settings.get('exempt', []))
+        # 세션별로 한도를 다르게 (session_id -> {"tokens_per_day", "requests_per_minute"})
+        self.sessions = settings.get('sessions', {})
+        # session_id -> 최근 1분간 허용한 요청 시각
+        self._recent: Dict[str, deque] = {}
+        self.rejected = 0
+        self.queued = 0
+
+    def limits(self, session_id: str) -> Tuple[int, int]:
+        override = self.sessions.get(session_id, {})
+        return (override.get('tokens_per_day', self.tokens_per_day),
+                override.get('requests_per_minute', self.requests_per_minute))
+
+    def _reject(self, reason: str, message: str, retry_after: float):
+        self.rejected += 1
+        metrics.QUOTA.inc(1, reason, "rejected")
+        raise QuotaExceededError(message, retry_after)
+
+    async def admit(self, session_id: str):
+        """한도 안이면 요청 1건으로 집계, 넘으면 대기(queue) 또는 QuotaExceededError"""
+        if session_id in self.exempt:
+            return
+        tokens_per_day, requests_per_minute = self.limits(session_id)
+        if tokens_per_day and self.meter.tokens_today(session_id) >= tokens_per_day:
+            self._reject("tokens", f"오늘 사용할 수 있는 토큰({tokens_per_day})을 모두 사용했습니다",
+                         seconds_until_tomorrow())
+        if not requests_per_minute:
+            return
+        if len(self._recent) > 10000:
+            self._prune()
+        window = self._recent.setdefault(session_id, deque())
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            now = time.monotonic()
+            while window and window[0] <= now - 60:
+                window.popleft()
+            if len(window) < requests_per_minute:
+                window.append(now)
+                return
+            wait = window[0] + 60 - now
+            if self.mode != 'queue' or now + wait > deadline:
+                self._reject("rate", f"분당 요청 한도({requests_per_minute})를 넘었습니다", wait)
+            self.queued += 1
+            metrics.QUOTA.inc(1, "rate", "queued")
+            await asyncio.sleep(wait)
+
+    def _prune(self):
+        """1분 넘게 요청이 없던 세션 정리"""
+        cutoff = time.monotonic() - 60
+        for session_id in [s for s, window in self._recent.items() if not window or window[-1] <= cutoff]:
+            del self._recent[session_id]
+
+    def status(self, session_id: str) -> dict:
+        tokens_per_day, requests_per_minute = self.limits(session_id)
+        cutoff = time.monotonic() - 60
+        window = self._recent.get(session_id, ())
+        return {
+            "exempt": session_id in self.exempt,
+            "tokens_per_day": tokens_per_day,
+            "tokens_today": self.meter.tokens_today(session_id),
+            "requests_per_minute": requests_per_minute,
+            "requests_last_minute": sum(1 for t in window if t > cutoff)
+        }
+
+    def stats(self) -> dict:
+        return {
+            "tokens_per_day": self.tokens_per_day,
+            "requests_per_minute": self.requests_per_minute,
+            "mode": self.mode,
+            "rejected": self.rejected,
+            "queued": self.queued
+        }
+
+
+def create_usage_meter(settings: dict) -> Optional[UsageMeter]:
+    """usage.enabled가 꺼져 있으면 None"""
+    if not settings.get('enabled', True):
+        return None
+    return UsageMeter(settings.get('path', 'usage.db'), settings.get('flush_interval', 10))
+
+
+def create_session_quotas(meter: Optional[UsageMeter], settings: dict) -> Optional[SessionQuotas]:
+    """quota.enabled가 꺼져 있으면 None (하루 토큰 한도는 사용량 집계가 필요)"""
+    if not settings.get('enabled', False):
+        return None
+    if meter is None:
+        print("⚠️ usage.enabled가 꺼져 있어 세션 할당량을 적용하지 않습니다")
+        return None
+    return SessionQuotas(meter, settings)